@@ -0,0 +1,30 @@
+"""
+Bloomberg API の実装の切り替え
+BBG_BACKEND=emulator で blpapi の代わりにエミュレータ（blpapi_emulator.py）を、
+BBG_BACKEND=replay で記録したセッションの再生（blpapi_replay.py）を使う
+"""
+
+import sys
+
+import config
+
+
+BACKENDS = ("blpapi", "emulator", "replay")
+
+
+def install_backend(name: str = config.BACKEND) -> None:
+    """
+    import blpapi で読み込まれるモジュールを設定（blpapi を使うモジュールより先に呼ぶこと）
+
+    Args:
+        name: blpapi（本番）/ emulator（合成データ）/ replay（キャプチャの再生）
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"BBG_BACKEND は {' / '.join(BACKENDS)} のいずれかを指定してください: {name}")
+    if name == "blpapi":
+        return
+    if name == "emulator":
+        import blpapi_emulator as module
+    else:
+        import blpapi_replay as module
+    sys.modules["blpapi"] = module
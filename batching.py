@@ -0,0 +1,158 @@
+"""
+参照データ（BDP）リクエストのマイクロバッチ
+短い時間窓内に届いた複数の呼び出しを1つのReferenceDataRequestにまとめて送信する
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from cache import overrides_key
+from chunking import ChunkError, errors_for, timed_out_outcome
+from deadlines import (
+    SETTLE_SECONDS, DeadlineExceeded, PartialResults, SharedDeadline, collect_partial, current_deadline,
+    shared_deadline, wait_within_deadline,
+)
+
+
+ReferenceFetcher = Callable[
+    [List[str], List[str], Optional[Dict[str, Any]]],
+    Awaitable[Tuple[Dict[str, Dict[str, Any]], List[ChunkError]]],
+]
+
+
+class _Batch:
+    """送信待ちのバッチ（同じオーバーライド指定の呼び出しをまとめる）"""
+
+    def __init__(self, overrides: Optional[Dict[str, Any]]):
+        self.overrides = overrides
+        self.securities: Dict[str, None] = {}
+        self.fields: Dict[str, None] = {}
+        self.callers: List[Tuple[List[str], List[str], asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.task: Optional["asyncio.Task"] = None
+        self.waiters = 0
+        self.deadline = SharedDeadline()
+        self.partial = PartialResults()
+
+
+class ReferenceDataBatcher:
+    """
+    参照データ取得のマイクロバッチ
+
+    最初の呼び出しから window 秒以内に届いた呼び出しの証券・フィールドの和集合を
+    1回のリクエストで取得し、各呼び出し元には要求した部分だけを返す。
+    証券数が max_securities に達した時点で時間窓を待たずに送信する。
+
+    バッチの取得は呼び出し元のうち最も遅い期限（deadlines.SharedDeadline）で実行する。
+    それより先に期限が来た呼び出しには、バッチがそれまでに受信した証券の結果を返す
+    （受信できなかった証券は "timed_out": True の失敗情報にする）。待機者が全員キャンセル・
+    期限切れでいなくなった場合はバッチ（送信前なら送信自体）を取りやめる。
+    """
+
+    def __init__(self, fetch: ReferenceFetcher, window: float, max_securities: int):
+        self.fetch = fetch
+        self.window = window
+        self.max_securities = max_securities
+        self._batches: Dict[Tuple[Tuple[str, str], ...], _Batch] = {}
+
+    async def get(
+        self,
+        securities: List[str],
+        fields: List[str],
+        overrides: Optional[Mapping[str, Any]] = None,
+    ) -> Tuple[Dict[str, Dict[str, Any]], List[ChunkError]]:
+        """
+        バッチ経由で参照データを取得
+
+        Returns:
+            ({証券: {フィールド: 値}}, 失敗したチャンクの情報のリスト)
+            いずれも要求した証券・フィールドのみ
+        """
+        loop = asyncio.get_running_loop()
+        key = overrides_key(overrides)
+        batch = self._batches.get(key)
+        if batch is not None and len(batch.securities.keys() | set(securities)) > self.max_securities:
+            # 上限を超える場合は現在のバッチを先に送信
+            self._flush(key)
+            batch = None
+        if batch is None:
+            batch = _Batch(dict(overrides) if overrides else None)
+            self._batches[key] = batch
+            batch.timer = loop.call_later(self.window, self._flush, key)
+
+        future = loop.create_future()
+        batch.callers.append((securities, fields, future))
+        batch.securities.update(dict.fromkeys(securities))
+        batch.fields.update(dict.fromkeys(fields))
+        batch.deadline.join(current_deadline())
+        batch.waiters += 1
+        if len(batch.securities) >= self.max_securities:
+            self._flush(key)
+
+        try:
+            if not await wait_within_deadline(future):
+                if batch.task is not None and batch.deadline.expired:
+                    # バッチも同じ期限で打ち切られ、受信済みの部分結果を返すのを待つ
+                    await asyncio.wait((future,), timeout=SETTLE_SECONDS)
+                if not future.done():
+                    return self._partial_outcome(batch, securities, fields)
+            return future.result()
+        finally:
+            batch.waiters -= 1
+            if batch.waiters == 0:
+                self._abandon(key, batch)
+
+    def _flush(self, key: Tuple[Tuple[str, str], ...]) -> None:
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        # タイマー・最初の呼び出し元のコンテキストの期限ではなく、呼び出し元全員の期限で実行する
+        with shared_deadline(batch.deadline), collect_partial(batch.partial):
+            batch.task = asyncio.ensure_future(self._run(batch))
+
+    @staticmethod
+    def _partial_outcome(
+        batch: _Batch, securities: List[str], fields: List[str]
+    ) -> Tuple[Dict[str, Dict[str, Any]], List[ChunkError]]:
+        """期限切れの呼び出しへ、バッチが受信済みの結果のうち要求した部分を返す（1件もなければ例外）"""
+        partial = batch.partial.snapshot()
+        error = DeadlineExceeded()
+        error.partial = {
+            security: {field: partial[security].get(field) for field in fields}
+            for security in securities
+            if security in partial
+        }
+        return timed_out_outcome(error, securities)
+
+    def _abandon(self, key: Tuple[Tuple[str, str], ...], batch: _Batch) -> None:
+        """待機者がいなくなったバッチを取りやめる"""
+        if batch.task is None:
+            if self._batches.get(key) is batch:
+                del self._batches[key]
+            if batch.timer is not None:
+                batch.timer.cancel()
+        elif not batch.task.done():
+            batch.task.cancel()
+
+    async def _run(self, batch: _Batch) -> None:
+        try:
+            data, errors = await self.fetch(list(batch.securities), list(batch.fields), batch.overrides)
+        except Exception as e:
+            for _, _, future in batch.callers:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for securities, fields, future in batch.callers:
+            if future.done():
+                continue
+            future.set_result((
+                {
+                    security: {field: data[security].get(field) for field in fields}
+                    for security in securities
+                    if security in data
+                },
+                errors_for(errors, securities),
+            ))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+キャプチャした応答のデコード時間のベンチマーク
+BBG_CAPTURE で記録したキャプチャ（capture.py）の応答メッセージを、リクエスト種別に対応する
+デコーダ（decoders.py）で繰り返しデコードし、リクエスト種別ごとの処理時間を測定する
+
+本番の応答の形（大きな INDX_MEMBERS、長期間の過去データ等）のままデコードの経路を
+Terminalなしで比較するためのもの。メッセージはエミュレータ（blpapi_emulator.py）の要素として復元する。
+
+使い方:
+    BBG_CAPTURE=capture.bin python server.py   # 記録
+    python benchmarks/decode.py capture.bin --repeat 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend import install_backend  # noqa: E402
+
+install_backend("emulator")
+
+import decoders  # noqa: E402
+from blpapi_emulator import Element, Message  # noqa: E402
+from capture import CapturedEvent, CapturedRequest, read_capture  # noqa: E402
+
+
+_RESPONSE_EVENTS = (5, 6)  # blpapi.Event.RESPONSE / PARTIAL_RESPONSE
+
+_FIELD_OPERATIONS = ("FieldSearchRequest", "CategorizedFieldSearchRequest", "FieldInfoRequest", "FieldListRequest")
+
+
+def _has_bulk_fields(message: Message) -> bool:
+    """参照データの応答にバルクフィールド（配列の要素）が含まれるか"""
+    for security_data in message.getElement("securityData").values():
+        if security_data.hasElement("fieldData"):
+            return any(element.isArray() for element in security_data.getElement("fieldData").elements())
+    return False
+
+
+def decoder_for(operation: str, request: Dict[str, Any], message: Message) -> Optional[Callable[[Message], Any]]:
+    """リクエスト種別に対応するデコード関数（対象外ならNone）"""
+    fields = tuple(request.get("fields", ()))
+    if operation == "ReferenceDataRequest":
+        if _has_bulk_fields(message):
+            return decoders.bulk_data_decoder(fields).decode
+        return decoders.reference_data_decoder(fields).decode
+    if operation == "HistoricalDataRequest":
+        return decoders.historical_data_decoder(fields).decode
+    if operation in _FIELD_OPERATIONS:
+        return decoders.field_search_decoder.decode
+    if operation == "instrumentListRequest":
+        return decoders.instrument_list_decoder.decode
+    if operation == "IntradayBarRequest":
+        return decoders.intraday_bar_decoder.decode
+    if operation == "IntradayTickRequest":
+        return decoders.intraday_tick_decoder.decode
+    return None
+
+
+def load(path: str) -> Dict[str, List[Tuple[Callable[[Message], Any], Message]]]:
+    """キャプチャを読み込み、リクエスト種別ごとの (デコード関数, メッセージ) を返す"""
+    requests: Dict[Tuple[int, Any], CapturedRequest] = {}
+    events: List[CapturedEvent] = []
+    for record in read_capture(path):
+        if isinstance(record, CapturedRequest):
+            requests[(record.session, record.correlation_id)] = record
+        elif record.event_type in _RESPONSE_EVENTS:
+            events.append(record)
+
+    work: Dict[str, List[Tuple[Callable[[Message], Any], Message]]] = defaultdict(list)
+    for event in events:
+        for captured in event.messages:
+            for correlation_id in captured.correlation_ids:
+                request = requests.get((event.session, correlation_id))
+                if request is None:
+                    continue
+                message = Message(captured.message_type, Element.from_node(captured.body))
+                decode = decoder_for(request.operation, json.loads(request.key), message)
+                if decode is not None:
+                    work[request.operation].append((decode, message))
+    return work
+
+
+def run(messages: List[Tuple[Callable[[Message], Any], Message]], repeat: int) -> float:
+    """全メッセージを repeat 回デコードした秒数"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for decode, message in messages:
+            result = decode(message)
+            if result is not None and not isinstance(result, (list, tuple)):
+                # ジェネレータを返すデコーダは最後まで読む
+                list(result)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="キャプチャした応答のデコード時間のベンチマーク")
+    parser.add_argument("capture", help="キャプチャファイル（BBG_CAPTURE で記録したもの）")
+    parser.add_argument("--repeat", type=int, default=10, help="デコードを繰り返す回数")
+    args = parser.parse_args()
+
+    work = load(args.capture)
+    if not work:
+        print("デコードできる応答がキャプチャにありません")
+        return 1
+
+    print(f"{'リクエスト種別':<26}{'メッセージ数':>12}{'合計(ms)':>12}{'1件(us)':>12}")
+    for operation, messages in sorted(work.items()):
+        run(messages, 1)
+        elapsed = run(messages, args.repeat)
+        per_message = elapsed / (len(messages) * args.repeat) * 1e6
+        print(f"{operation:<33}{len(messages):>12}{elapsed * 1000:>12.1f}{per_message:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+サーバー起動時間のベンチマーク
+stdioで server.py を起動し、MCPの initialize 応答が返るまでの時間を測定する
+
+MCPクライアントはチャットのセッションごとにサーバーを起動するため、この時間が
+すべての新しいセッションの待ち時間になる。中央値が閾値を超えた場合は終了コード1で終了する。
+stdout にJSON-RPC以外の出力があった場合（クライアントの受信が壊れる）や、
+--timeout 秒以内に応答がない場合も失敗とする。
+
+使い方:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --threshold 2.5
+    python benchmarks/startup.py --server server_http.py --server-args=--stdio
+"""
+
+import argparse
+import json
+import os
+import queue
+import shlex
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional, Sequence
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-06-18",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-benchmark", "version": "1.0"},
+    },
+}
+
+
+def time_to_initialize(server: str, timeout: float, server_args: Sequence[str] = ()) -> float:
+    """サーバーを起動し、initialize の応答を受信するまでの秒数"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, server, *server_args],
+        cwd=ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        encoding="utf-8",
+    )
+    # 何も出力せずに止まったサーバーでも期限で打ち切れるよう、stdout は別スレッドで読む
+    lines: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def read_stdout() -> None:
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    threading.Thread(target=read_stdout, name="startup-benchmark-stdout", daemon=True).start()
+    try:
+        process.stdin.write(json.dumps(INITIALIZE) + "\n")
+        process.stdin.flush()
+        while True:
+            try:
+                line = lines.get(timeout=max(started + timeout - time.perf_counter(), 0))
+            except queue.Empty:
+                raise RuntimeError(f"initialize の応答が {timeout:.0f} 秒以内にありませんでした") from None
+            if line is None:
+                raise RuntimeError("initialize の応答前にサーバーが終了しました")
+            try:
+                message = json.loads(line)
+            except ValueError:
+                raise RuntimeError(f"stdout にJSON-RPC以外の出力があります: {line.rstrip()!r}") from None
+            if isinstance(message, dict) and message.get("id") == INITIALIZE["id"]:
+                elapsed = time.perf_counter() - started
+                if "error" in message:
+                    raise RuntimeError(f"initialize が失敗しました: {message['error']}")
+                return elapsed
+    finally:
+        process.kill()
+        process.wait()
+
+
+def time_to_import(module: str) -> float:
+    """新しいインタープリタでモジュールを読み込むまでの秒数（インタープリタ起動を除く）"""
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - started)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def summarize(name: str, samples: List[float]) -> float:
+    median = statistics.median(samples)
+    print(f"{name}: 中央値 {median * 1000:.0f}ms  最小 {min(samples) * 1000:.0f}ms  最大 {max(samples) * 1000:.0f}ms")
+    return median
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="サーバー起動時間のベンチマーク")
+    parser.add_argument("--server", default="server.py", help="起動するサーバー（リポジトリからの相対パス）")
+    parser.add_argument("--server-args", default="", help="サーバーに渡す引数（例: --server-args=--stdio）")
+    parser.add_argument("--runs", type=int, default=5, help="測定回数")
+    parser.add_argument("--threshold", type=float, default=float(os.environ.get("BBG_STARTUP_THRESHOLD", 3.0)),
+                        help="initialize 応答までの時間の閾値（秒、中央値で判定）")
+    parser.add_argument("--timeout", type=float, default=60, help="1回あたりの待機上限（秒）")
+    args = parser.parse_args()
+
+    imports = [time_to_import(os.path.splitext(os.path.basename(args.server))[0]) for _ in range(args.runs)]
+    server_args = shlex.split(args.server_args)
+    initializes = [time_to_initialize(args.server, args.timeout, server_args) for _ in range(args.runs)]
+
+    summarize("モジュール読み込み", imports)
+    median = summarize("initialize 応答まで", initializes)
+
+    if median > args.threshold:
+        print(f"NG: 閾値 {args.threshold:.2f}s を超えています")
+        return 1
+    print(f"OK: 閾値 {args.threshold:.2f}s 以内")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+ツールごとのマイクロベンチマーク
+エミュレータ（blpapi_emulator.py）を相手に各ツールを呼び出し、スループット・レイテンシの
+パーセンタイル・1回あたりのメモリ確保量を測定する
+
+Bloomberg Terminalなしで実行できるため、server.py の性能に関わる変更をCIで確認できる。
+呼び出しごとに異なる証券を指定し、キャッシュ・ローカルストアは無効にする（取得・デコードの
+経路を測定するため）。--baseline で以前の結果（--json の出力）と比較し、
+--max-regression を超えて遅くなったシナリオがあれば終了コード1で終了する。
+
+使い方:
+    python benchmarks/tools.py
+    python benchmarks/tools.py --iterations 200 --concurrency 16 --latency-ms 0
+    python benchmarks/tools.py --only get_reference_data --json result.json
+    python benchmarks/tools.py --baseline result.json --max-regression 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# server.py の読み込み前に設定する（明示的に指定された環境変数は上書きしない）
+_TICK_DIR = tempfile.mkdtemp(prefix="bbg-bench-ticks-")
+for _name, _value in {
+    "BBG_BACKEND": "emulator",
+    "BBG_REFDATA_CACHE_MAX_ENTRIES": "0",
+    "BBG_BULK_CACHE_MAX_ENTRIES": "0",
+    "BBG_SECURITY_SEARCH_CACHE_MAX_ENTRIES": "0",
+    "BBG_HISTORY_STORE": "0",
+    "BBG_INTRADAY_STORE": "0",
+    "BBG_FIELD_INDEX": "0",
+    "BBG_MKTDATA": "0",
+    "BBG_TICK_CAPTURE_DIR": _TICK_DIR,
+}.items():
+    os.environ.setdefault(_name, _value)
+
+sys.path.insert(0, ROOT)
+
+import blpapi_emulator  # noqa: E402
+import server  # noqa: E402
+
+
+def _securities(i: int, count: int) -> List[str]:
+    return [f"S{i:05d}{n:04d} US Equity" for n in range(count)]
+
+
+# (シナリオ名, ツール名, 呼び出し番号 → 引数)
+SCENARIOS: List[Tuple[str, str, Callable[[int], Dict[str, Any]]]] = [
+    ("search_securities", "search_securities",
+     lambda i: {"query": f"company {i}", "max_results": 20}),
+    ("search_fields", "search_fields",
+     lambda i: {"field_query": f"px {i}", "max_results": 50}),
+    ("get_reference_data[1x2]", "get_reference_data",
+     lambda i: {"securities": _securities(i, 1), "fields": ["PX_LAST", "NAME"]}),
+    ("get_reference_data[500x5]", "get_reference_data",
+     lambda i: {"securities": _securities(i, 500),
+                "fields": ["PX_LAST", "NAME", "CUR_MKT_CAP", "VOLUME", "PE_RATIO"]}),
+    ("get_historical_data[1x1y]", "get_historical_data",
+     lambda i: {"securities": _securities(i, 1), "fields": ["PX_LAST"],
+                "start_date": "2023-01-01", "end_date": "2023-12-31"}),
+    ("get_historical_data[50x1y,columnar]", "get_historical_data",
+     lambda i: {"securities": _securities(i, 50), "fields": ["PX_LAST", "VOLUME"],
+                "start_date": "2023-01-01", "end_date": "2023-12-31", "format": "columnar"}),
+    ("get_bulk_data", "get_bulk_data",
+     lambda i: {"security": f"IDX{i:05d} Index", "field": "INDX_MEMBERS"}),
+    ("get_universe_data", "get_universe_data",
+     lambda i: {"universe": f"IDX{i:05d} Index", "fields": ["PX_LAST", "CUR_MKT_CAP"]}),
+    ("get_intraday_bars", "get_intraday_bars",
+     lambda i: {"security": _securities(i, 1)[0], "start_datetime": "2024-01-02T13:00:00",
+                "end_datetime": "2024-01-02T21:00:00", "interval": 1}),
+    ("get_intraday_ticks", "get_intraday_ticks",
+     lambda i: {"security": _securities(i, 1)[0], "start_datetime": "2024-01-02T14:00:00",
+                "end_datetime": "2024-01-02T15:00:00", "event_types": ["BID", "ASK"]}),
+]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """最近接順位法によるパーセンタイル（samples はソート済み）"""
+    if not samples:
+        return 0.0
+    rank = max(1, min(len(samples), round(q / 100 * len(samples) + 0.5)))
+    return samples[rank - 1]
+
+
+def _tool(name: str) -> Callable[..., Any]:
+    tool = getattr(server, name)
+    return getattr(tool, "fn", tool)
+
+
+async def _run(tool: Callable[..., Any], make_args: Callable[[int], Dict[str, Any]],
+               start: int, iterations: int, concurrency: int) -> Tuple[List[float], float]:
+    """iterations 回を concurrency 並列で呼び出し、(各呼び出しの秒数, 全体の秒数) を返す"""
+    latencies: List[float] = []
+    counter = iter(range(start, start + iterations))
+
+    async def worker():
+        for i in counter:
+            args = make_args(i)
+            started = time.perf_counter()
+            await tool(**args)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+async def _measure_allocations(tool: Callable[..., Any], make_args: Callable[[int], Dict[str, Any]],
+                               start: int, iterations: int) -> Tuple[float, float]:
+    """
+    1回ずつ呼び出してメモリ確保量を測定
+
+    Returns:
+        (1回あたりの確保量の最大値（ピーク - 開始時、KB）, 呼び出し後に残った量の平均（KB）)
+    """
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for i in range(start, start + iterations):
+            args = make_args(i)
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            await tool(**args)
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - before) / 1024)
+            retained.append((after - before) / 1024)
+    finally:
+        tracemalloc.stop()
+    return max(peaks), statistics.mean(retained)
+
+
+async def benchmark(scenarios, iterations: int, concurrency: int, warmup: int,
+                    allocation_iterations: int) -> Dict[str, Dict[str, float]]:
+    await server.ensure_connection_async()
+    results = {}
+    offset = 0
+    for name, tool_name, make_args in scenarios:
+        tool = _tool(tool_name)
+        # 呼び出しごとに異なる引数にするため、番号はシナリオをまたいで重ならないようにする
+        await _run(tool, make_args, offset, warmup, 1)
+        offset += warmup
+        latencies, elapsed = await _run(tool, make_args, offset, iterations, concurrency)
+        offset += iterations
+        peak_kb, retained_kb = await _measure_allocations(tool, make_args, offset, allocation_iterations)
+        offset += allocation_iterations
+
+        latencies.sort()
+        results[name] = {
+            "calls": len(latencies),
+            "throughput": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p90_ms": percentile(latencies, 90) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "max_ms": latencies[-1] * 1000,
+            "peak_alloc_kb": peak_kb,
+            "retained_kb": retained_kb,
+        }
+        print(_format_row(name, results[name]), flush=True)
+    return results
+
+
+_HEADER = f"{'シナリオ':<36}{'呼び出し/秒':>12}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'確保(KB)':>11}{'残存(KB)':>11}"
+
+
+def _format_row(name: str, result: Dict[str, float]) -> str:
+    return (
+        f"{name:<40}{result['throughput']:>12.1f}{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}"
+        f"{result['p99_ms']:>10.2f}{result['peak_alloc_kb']:>11.0f}{result['retained_kb']:>11.1f}"
+    )
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            max_regression: float) -> List[str]:
+    """
+    基準の結果と比較し、悪化したシナリオの説明を返す
+
+    スループットの低下・p50レイテンシの増加・確保量の増加が max_regression（割合）を超えたものを悪化とみなす。
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        checks = (
+            ("スループット", base["throughput"] / result["throughput"] - 1 if result["throughput"] else float("inf")),
+            ("p50", result["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0),
+            ("確保量", result["peak_alloc_kb"] / base["peak_alloc_kb"] - 1 if base["peak_alloc_kb"] else 0.0),
+        )
+        for label, change in checks:
+            if change > max_regression:
+                regressions.append(f"{name}: {label}が {change:.0%} 悪化")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ツールごとのマイクロベンチマーク（エミュレータ使用）")
+    parser.add_argument("--iterations", type=int, default=30, help="シナリオごとの呼び出し回数")
+    parser.add_argument("--concurrency", type=int, default=8, help="同時に実行する呼び出し数")
+    parser.add_argument("--warmup", type=int, default=3, help="測定前に実行する回数")
+    parser.add_argument("--allocation-iterations", type=int, default=5, help="メモリ確保量を測定する回数")
+    parser.add_argument("--latency-ms", type=float, default=1, help="エミュレータの応答遅延（ミリ秒）")
+    parser.add_argument("--message-size", type=int, default=None, help="エミュレータの1メッセージあたりの証券数")
+    parser.add_argument("--bulk-rows", type=int, default=None, help="エミュレータのバルクフィールドの行数")
+    parser.add_argument("--only", action="append", default=None, help="実行するツール名（複数指定可）")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    parser.add_argument("--baseline", help="比較する以前の結果（--json の出力）")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="許容する悪化の割合")
+    args = parser.parse_args()
+
+    settings = {"latency_ms": args.latency_ms}
+    if args.message_size is not None:
+        settings["message_size"] = args.message_size
+    if args.bulk_rows is not None:
+        settings["bulk_rows"] = args.bulk_rows
+    blpapi_emulator.configure(**settings)
+
+    scenarios = [s for s in SCENARIOS if not args.only or s[1] in args.only]
+    if not scenarios:
+        parser.error(f"該当するツールがありません: {', '.join(args.only)}")
+
+    print(_HEADER)
+    try:
+        results = asyncio.run(benchmark(
+            scenarios, args.iterations, args.concurrency, args.warmup, args.allocation_iterations
+        ))
+    finally:
+        server.bbg_api.disconnect()
+        shutil.rmtree(_TICK_DIR, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            for line in regressions:
+                print(f"NG: {line}")
+            return 1
+        print(f"OK: 基準からの悪化は {args.max_regression:.0%} 以内")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
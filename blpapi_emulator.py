@@ -0,0 +1,966 @@
+"""
+Bloomberg API (blpapi) エミュレータ
+サーバーが使用するblpapiのサブセットを純Pythonで再現し、合成データを返す
+
+Bloomberg Terminalなしでサーバーの動作確認・ベンチマークを行うためのもの。
+BBG_BACKEND=emulator で blpapi の代わりに使われる（backend.py）。
+応答サイズ・レイテンシは環境変数またはconfigure()で調整できる。
+
+    BBG_EMULATOR_LATENCY_MS       リクエストごとの応答遅延（ミリ秒、デフォルト: 5）
+    BBG_EMULATOR_MESSAGE_SIZE     1メッセージあたりの証券数（デフォルト: 10）
+    BBG_EMULATOR_BULK_ROWS        バルクフィールドの行数（デフォルト: 50）
+    BBG_EMULATOR_SEARCH_RESULTS   検索系リクエストの最大件数（デフォルト: 100）
+    BBG_EMULATOR_TICK_INTERVAL_MS ティックの間隔（ミリ秒、デフォルト: 1000）
+"""
+
+import datetime
+import hashlib
+import itertools
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+_settings = {
+    "latency_ms": float(os.environ.get("BBG_EMULATOR_LATENCY_MS", "5")),
+    "message_size": int(os.environ.get("BBG_EMULATOR_MESSAGE_SIZE", "10")),
+    "bulk_rows": int(os.environ.get("BBG_EMULATOR_BULK_ROWS", "50")),
+    "search_results": int(os.environ.get("BBG_EMULATOR_SEARCH_RESULTS", "100")),
+    "tick_interval_ms": float(os.environ.get("BBG_EMULATOR_TICK_INTERVAL_MS", "1000")),
+}
+
+
+def configure(**settings) -> None:
+    """
+    エミュレータの応答サイズ・レイテンシを変更
+
+    Args:
+        settings: latency_ms, message_size, bulk_rows, search_results, tick_interval_ms
+    """
+    for key, value in settings.items():
+        if key not in _settings:
+            raise ValueError(f"不明な設定: {key}")
+        _settings[key] = value
+
+
+class Name:
+    """blpapi.Name 相当"""
+
+    __slots__ = ("_value",)
+
+    def __init__(self, value: str):
+        self._value = str(value)
+
+    def __str__(self) -> str:
+        return self._value
+
+    def __repr__(self) -> str:
+        return f"Name({self._value!r})"
+
+    def __hash__(self) -> int:
+        return hash(self._value)
+
+    def __eq__(self, other) -> bool:
+        return str(other) == self._value
+
+    def __ne__(self, other) -> bool:
+        return not self.__eq__(other)
+
+
+class DataType:
+    """blpapi.DataType 相当"""
+
+    BOOL = 1
+    CHAR = 2
+    BYTE = 3
+    INT32 = 4
+    INT64 = 5
+    FLOAT32 = 6
+    FLOAT64 = 7
+    STRING = 8
+    BYTEARRAY = 9
+    DATE = 10
+    TIME = 11
+    DECIMAL = 12
+    DATETIME = 13
+    ENUMERATION = 14
+    SEQUENCE = 15
+    CHOICE = 16
+    CORRELATION_ID = 17
+
+
+class CorrelationId:
+    """blpapi.CorrelationId 相当"""
+
+    _auto = itertools.count(1 << 32)
+
+    def __init__(self, value: Any = None, classId: int = 0):
+        self._value = next(self._auto) if value is None else value
+        self._class_id = classId
+
+    def value(self) -> Any:
+        return self._value
+
+    def classId(self) -> int:
+        return self._class_id
+
+    def __hash__(self) -> int:
+        return hash(self._value)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CorrelationId) and other._value == self._value
+
+    def __repr__(self) -> str:
+        return f"CorrelationId({self._value!r})"
+
+
+def _infer_datatype(value: Any) -> int:
+    if isinstance(value, bool):
+        return DataType.BOOL
+    if isinstance(value, int):
+        return DataType.INT64
+    if isinstance(value, float):
+        return DataType.FLOAT64
+    if isinstance(value, datetime.datetime):
+        return DataType.DATETIME
+    if isinstance(value, datetime.date):
+        return DataType.DATE
+    if isinstance(value, datetime.time):
+        return DataType.TIME
+    if isinstance(value, dict):
+        return DataType.SEQUENCE
+    return DataType.STRING
+
+
+class Element:
+    """
+    blpapi.Element 相当（読み取り専用）
+
+    Pythonの値から構築する。dictはSEQUENCE、listは配列になる。
+    """
+
+    __slots__ = ("_name", "_datatype", "_value", "_children", "_values", "_is_array")
+
+    def __init__(self, name: str, value: Any, datatype: Optional[int] = None):
+        self._name = Name(name)
+        self._children: Optional[Dict[str, "Element"]] = None
+        self._values: Optional[List[Any]] = None
+        self._is_array = isinstance(value, list)
+        self._value = None
+
+        if self._is_array:
+            first = next((v for v in value if v is not None), None)
+            self._datatype = datatype or _infer_datatype(first)
+            if self._datatype == DataType.SEQUENCE:
+                self._values = [Element(name, v) for v in value]
+            else:
+                self._values = list(value)
+        elif isinstance(value, dict):
+            self._datatype = DataType.SEQUENCE
+            self._children = {key: Element(key, v) for key, v in value.items()}
+        else:
+            self._datatype = datatype or _infer_datatype(value)
+            self._value = value
+
+    @classmethod
+    def from_node(cls, node: tuple) -> "Element":
+        """
+        データ型付きの要素ツリー（capture.py の形式）から作成
+
+        Args:
+            node: (要素名, データ型, 配列か, 値)
+        """
+        name, datatype, is_array, value = node
+        element = cls.__new__(cls)
+        element._name = Name(name)
+        element._datatype = datatype
+        element._is_array = is_array
+        element._children = None
+        element._values = None
+        element._value = None
+        complex_type = datatype in (DataType.SEQUENCE, DataType.CHOICE)
+        if is_array:
+            if complex_type:
+                element._values = [cls.from_node((name, datatype, False, children)) for children in value]
+            else:
+                element._values = list(value)
+        elif complex_type:
+            element._children = {child[0]: cls.from_node(child) for child in value}
+        else:
+            element._value = value
+        return element
+
+    # --- 構造 ---
+    def name(self) -> Name:
+        return self._name
+
+    def datatype(self) -> int:
+        return self._datatype
+
+    def isArray(self) -> bool:
+        return self._is_array
+
+    def isComplexType(self) -> bool:
+        return self._children is not None
+
+    def isNull(self) -> bool:
+        return not self._is_array and self._children is None and self._value is None
+
+    def numValues(self) -> int:
+        if self._is_array:
+            return len(self._values)
+        return 0 if self.isNull() or self._children is not None else 1
+
+    def numElements(self) -> int:
+        return len(self._children) if self._children is not None else 0
+
+    def hasElement(self, name, excludeNullElements: bool = False) -> bool:
+        if self._children is None:
+            return False
+        child = self._children.get(str(name))
+        if child is None:
+            return False
+        return not (excludeNullElements and child.isNull())
+
+    def getElement(self, nameOrIndex) -> "Element":
+        if self._children is None:
+            raise KeyError(f"{self._name} は複合要素ではありません")
+        if isinstance(nameOrIndex, int):
+            return list(self._children.values())[nameOrIndex]
+        try:
+            return self._children[str(nameOrIndex)]
+        except KeyError:
+            raise KeyError(f"要素が存在しません: {nameOrIndex}") from None
+
+    def elements(self) -> Iterator["Element"]:
+        return iter(self._children.values() if self._children is not None else ())
+
+    def values(self) -> Iterator[Any]:
+        if self._is_array:
+            return iter(self._values)
+        return iter(() if self.isNull() else (self.getValue(),))
+
+    # --- 値 ---
+    def getValue(self, index: int = 0) -> Any:
+        if self._is_array:
+            return self._values[index]
+        if self._children is not None:
+            return self
+        if self._value is None:
+            raise ValueError(f"{self._name} はNULLです")
+        return self._value
+
+    def getValueAsString(self, index: int = 0) -> str:
+        value = self.getValue(index)
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        return str(value)
+
+    def getValueAsFloat(self, index: int = 0) -> float:
+        return float(self.getValue(index))
+
+    getValueAsFloat32 = getValueAsFloat
+    getValueAsFloat64 = getValueAsFloat
+
+    def getValueAsInteger(self, index: int = 0) -> int:
+        return int(self.getValue(index))
+
+    getValueAsInt32 = getValueAsInteger
+    getValueAsInt64 = getValueAsInteger
+
+    def getValueAsBool(self, index: int = 0) -> bool:
+        return bool(self.getValue(index))
+
+    def getValueAsDatetime(self, index: int = 0):
+        return self.getValue(index)
+
+    getValueAsDate = getValueAsDatetime
+    getValueAsTime = getValueAsDatetime
+
+    def getValueAsElement(self, index: int = 0) -> "Element":
+        value = self.getValue(index)
+        if not isinstance(value, Element):
+            raise ValueError(f"{self._name} の値は要素ではありません")
+        return value
+
+    def getElementValue(self, name) -> Any:
+        return self.getElement(name).getValue()
+
+    def getElementAsString(self, name) -> str:
+        return self.getElement(name).getValueAsString()
+
+    def getElementAsFloat(self, name) -> float:
+        return self.getElement(name).getValueAsFloat()
+
+    def getElementAsInteger(self, name) -> int:
+        return self.getElement(name).getValueAsInteger()
+
+    getElementAsInt = getElementAsInteger
+
+    def getElementAsBool(self, name) -> bool:
+        return self.getElement(name).getValueAsBool()
+
+    def getElementAsDatetime(self, name):
+        return self.getElement(name).getValueAsDatetime()
+
+    def toPy(self) -> Any:
+        """要素をPythonの値に戻す"""
+        if self._is_array:
+            return [v.toPy() if isinstance(v, Element) else v for v in self._values]
+        if self._children is not None:
+            return {key: child.toPy() for key, child in self._children.items()}
+        return self._value
+
+    def __str__(self) -> str:
+        return f"{self._name} = {self.toPy()!r}"
+
+
+class Message:
+    """blpapi.Message 相当"""
+
+    def __init__(self, message_type: str, body: Any,
+                 correlation_ids: Optional[List[CorrelationId]] = None,
+                 service: Optional["Service"] = None):
+        self._type = Name(message_type)
+        # body はPythonの値（dict）または作成済みの Element
+        self._body = body if isinstance(body, Element) else Element(message_type, body)
+        self._correlation_ids = list(correlation_ids or [])
+        self._service = service
+
+    def messageType(self) -> Name:
+        return self._type
+
+    def correlationIds(self) -> List[CorrelationId]:
+        return self._correlation_ids
+
+    def correlationId(self, index: int = 0) -> Optional[CorrelationId]:
+        return self._correlation_ids[index] if self._correlation_ids else None
+
+    def service(self) -> Optional["Service"]:
+        return self._service
+
+    def asElement(self) -> Element:
+        return self._body
+
+    def hasElement(self, name, excludeNullElements: bool = False) -> bool:
+        return self._body.hasElement(name, excludeNullElements)
+
+    def getElement(self, name) -> Element:
+        return self._body.getElement(name)
+
+    def getElementAsString(self, name) -> str:
+        return self._body.getElementAsString(name)
+
+    def numElements(self) -> int:
+        return self._body.numElements()
+
+    def toPy(self) -> Dict[str, Any]:
+        return self._body.toPy()
+
+    def __str__(self) -> str:
+        return f"{self._type} {self._body.toPy()!r}"
+
+
+class Event:
+    """blpapi.Event 相当"""
+
+    ADMIN = 1
+    SESSION_STATUS = 2
+    SUBSCRIPTION_STATUS = 3
+    REQUEST_STATUS = 4
+    RESPONSE = 5
+    PARTIAL_RESPONSE = 6
+    SUBSCRIPTION_DATA = 8
+    SERVICE_STATUS = 9
+    TIMEOUT = 10
+    AUTHORIZATION_STATUS = 11
+    RESOLUTION_STATUS = 12
+    TOPIC_STATUS = 13
+    TOKEN_STATUS = 14
+    REQUEST = 15
+
+    def __init__(self, event_type: int, messages: Optional[List[Message]] = None):
+        self._type = event_type
+        self._messages = list(messages or [])
+
+    def eventType(self) -> int:
+        return self._type
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages)
+
+
+class _RequestElement:
+    """リクエスト構築用の可変要素"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._fields: Dict[str, Any] = {}
+        self._items: Optional[List[Any]] = None
+
+    def name(self) -> Name:
+        return Name(self._name)
+
+    def set(self, name, value) -> None:
+        self._fields[str(name)] = value
+
+    setElement = set
+
+    def append(self, name, value) -> None:
+        self._fields.setdefault(str(name), []).append(value)
+
+    def appendValue(self, value) -> None:
+        if self._items is None:
+            self._items = []
+        self._items.append(value)
+
+    def appendElement(self) -> "_RequestElement":
+        if self._items is None:
+            self._items = []
+        element = _RequestElement(self._name)
+        self._items.append(element)
+        return element
+
+    def getElement(self, name) -> "_RequestElement":
+        key = str(name)
+        element = self._fields.get(key)
+        if not isinstance(element, _RequestElement):
+            element = _RequestElement(key)
+            self._fields[key] = element
+        return element
+
+    def hasElement(self, name) -> bool:
+        return str(name) in self._fields
+
+    def toPy(self) -> Any:
+        if self._items is not None:
+            return [v.toPy() if isinstance(v, _RequestElement) else v for v in self._items]
+        return {
+            key: value.toPy() if isinstance(value, _RequestElement) else value
+            for key, value in self._fields.items()
+        }
+
+
+class Request(_RequestElement):
+    """blpapi.Request 相当"""
+
+    def __init__(self, service: "Service", operation: str):
+        super().__init__(operation)
+        self._service = service
+        self._operation = operation
+
+    def service(self) -> "Service":
+        return self._service
+
+    def operation(self) -> str:
+        return self._operation
+
+    def asElement(self) -> "_RequestElement":
+        return self
+
+    def __str__(self) -> str:
+        return f"{self._operation} {self.toPy()!r}"
+
+
+_OPERATIONS = {
+    "//blp/refdata": {
+        "ReferenceDataRequest", "HistoricalDataRequest",
+        "IntradayBarRequest", "IntradayTickRequest",
+    },
+    "//blp/apiflds": {
+        "FieldSearchRequest", "FieldInfoRequest", "FieldListRequest",
+        "CategorizedFieldSearchRequest",
+    },
+    "//blp/instruments": {
+        "instrumentListRequest", "curveListRequest", "govtListRequest",
+    },
+    "//blp/mktdata": set(),
+}
+
+
+class Service:
+    """blpapi.Service 相当"""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def name(self) -> str:
+        return self._name
+
+    def createRequest(self, operation: str) -> Request:
+        if operation not in _OPERATIONS.get(self._name, ()):
+            raise ValueError(f"{self._name} に {operation} はありません")
+        return Request(self, operation)
+
+
+class SessionOptions:
+    """blpapi.SessionOptions 相当"""
+
+    def __init__(self):
+        self._host = "localhost"
+        self._port = 8194
+
+    def setServerHost(self, host: str) -> None:
+        self._host = host
+
+    def setServerPort(self, port: int) -> None:
+        self._port = port
+
+    def serverHost(self) -> str:
+        return self._host
+
+    def serverPort(self) -> int:
+        return self._port
+
+
+class SubscriptionList:
+    """blpapi.SubscriptionList 相当"""
+
+    def __init__(self):
+        self._entries = []
+
+    def add(self, topic: str, fields=None, options=None, correlationId=None) -> None:
+        if isinstance(fields, str):
+            fields = [f.strip() for f in fields.split(",") if f.strip()]
+        self._entries.append((topic, list(fields or []), correlationId or CorrelationId()))
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+
+class Session:
+    """
+    blpapi.Session 相当
+
+    eventHandlerを渡すとイベントハンドラモード（専用スレッドからコールバック）、
+    渡さない場合はnextEvent()によるポーリングモードで動作する。
+    """
+
+    def __init__(self, options: Optional[SessionOptions] = None,
+                 eventHandler: Optional[Callable[[Event, "Session"], None]] = None):
+        self._options = options or SessionOptions()
+        self._handler = eventHandler
+        self._queue: "queue.Queue[Event]" = queue.Queue()
+        self._services: Dict[str, Service] = {}
+        self._cancelled = set()
+        self._subscriptions: Dict[Any, tuple] = {}
+        self._started = False
+        self._lock = threading.Lock()
+        self._handler_thread: Optional[threading.Thread] = None
+        self._ticker: Optional[threading.Thread] = None
+
+    # --- イベント配送 ---
+    def _post(self, event: Event) -> None:
+        self._queue.put(event)
+
+    def _handler_loop(self) -> None:
+        while True:
+            event = self._queue.get()
+            if event is None:
+                break
+            try:
+                self._handler(event, self)
+            except Exception:
+                pass
+
+    def nextEvent(self, timeout: int = 0) -> Event:
+        if self._handler is not None:
+            raise RuntimeError("イベントハンドラモードではnextEvent()は使用できません")
+        try:
+            event = self._queue.get(timeout=timeout / 1000 if timeout else None)
+        except queue.Empty:
+            return Event(Event.TIMEOUT)
+        return event if event is not None else Event(Event.TIMEOUT)
+
+    def tryNextEvent(self):
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    # --- ライフサイクル ---
+    def start(self) -> bool:
+        self._started = True
+        if self._handler is not None and self._handler_thread is None:
+            self._handler_thread = threading.Thread(
+                target=self._handler_loop, name="blpapi-emulator", daemon=True
+            )
+            self._handler_thread.start()
+        self._post(Event(Event.SESSION_STATUS, [Message("SessionConnectionUp", {"server": self._options.serverHost()})]))
+        self._post(Event(Event.SESSION_STATUS, [Message("SessionStarted", {})]))
+        return True
+
+    def startAsync(self) -> bool:
+        return self.start()
+
+    def stop(self) -> bool:
+        if not self._started:
+            return True
+        self._started = False
+        self._post(Event(Event.SESSION_STATUS, [Message("SessionTerminated", {})]))
+        if self._handler_thread is not None:
+            self._queue.put(None)
+            if self._handler_thread is not threading.current_thread():
+                self._handler_thread.join(timeout=2)
+            self._handler_thread = None
+        return True
+
+    stopAsync = stop
+
+    def simulateDisconnect(self) -> None:
+        """接続断をエミュレートする（テスト用）"""
+        self._post(Event(Event.SESSION_STATUS, [Message("SessionConnectionDown", {})]))
+        self._started = False
+        self._post(Event(Event.SESSION_STATUS, [Message("SessionTerminated", {})]))
+
+    # --- サービス ---
+    def openService(self, name: str) -> bool:
+        if name not in _OPERATIONS:
+            return False
+        self._services[name] = Service(name)
+        return True
+
+    def openServiceAsync(self, name: str, correlationId: Optional[CorrelationId] = None) -> CorrelationId:
+        correlation_id = correlationId or CorrelationId()
+        ok = self.openService(name)
+
+        def deliver():
+            time.sleep(_settings["latency_ms"] / 1000)
+            message_type = "ServiceOpened" if ok else "ServiceOpenFailure"
+            self._post(Event(Event.SERVICE_STATUS, [Message(message_type, {"serviceName": name}, [correlation_id])]))
+
+        threading.Thread(target=deliver, daemon=True).start()
+        return correlation_id
+
+    def getService(self, name: str) -> Service:
+        if name not in self._services:
+            raise ValueError(f"サービスが開かれていません: {name}")
+        return self._services[name]
+
+    # --- リクエスト ---
+    def sendRequest(self, request: Request, correlationId: Optional[CorrelationId] = None,
+                    identity=None, eventQueue=None, requestLabel: str = "") -> CorrelationId:
+        if not self._started:
+            raise RuntimeError("セッションが開始されていません")
+        correlation_id = correlationId or CorrelationId()
+        worker = threading.Thread(
+            target=self._respond, args=(request, correlation_id), daemon=True
+        )
+        worker.start()
+        return correlation_id
+
+    def cancel(self, correlationId) -> None:
+        ids = correlationId if isinstance(correlationId, list) else [correlationId]
+        with self._lock:
+            for correlation_id in ids:
+                self._cancelled.add(correlation_id.value())
+                self._subscriptions.pop(correlation_id.value(), None)
+
+    def _respond(self, request: Request, correlation_id: CorrelationId) -> None:
+        time.sleep(_settings["latency_ms"] / 1000)
+        try:
+            payloads = list(_generate(request))
+        except Exception as e:
+            self._post(Event(Event.REQUEST_STATUS, [
+                Message("RequestFailure", {"reason": {"message": str(e), "category": "BAD_ARGS"}}, [correlation_id])
+            ]))
+            return
+
+        for index, (message_type, body) in enumerate(payloads):
+            with self._lock:
+                if correlation_id.value() in self._cancelled:
+                    self._cancelled.discard(correlation_id.value())
+                    return
+            last = index == len(payloads) - 1
+            event_type = Event.RESPONSE if last else Event.PARTIAL_RESPONSE
+            self._post(Event(event_type, [Message(message_type, body, [correlation_id], request.service())]))
+
+    # --- 購読 ---
+    def subscribe(self, subscriptionList: SubscriptionList, identity=None, requestLabel: str = "") -> None:
+        with self._lock:
+            for topic, fields, correlation_id in subscriptionList:
+                self._subscriptions[correlation_id.value()] = (topic, fields, correlation_id)
+        for topic, fields, correlation_id in subscriptionList:
+            self._post(Event(Event.SUBSCRIPTION_STATUS, [Message("SubscriptionStarted", {}, [correlation_id])]))
+            self._post(Event(Event.SUBSCRIPTION_DATA, [
+                Message("MarketDataEvents", _market_data(topic, fields), [correlation_id])
+            ]))
+        if self._ticker is None:
+            self._ticker = threading.Thread(target=self._tick, name="blpapi-emulator-ticker", daemon=True)
+            self._ticker.start()
+
+    def unsubscribe(self, subscriptionList: SubscriptionList) -> None:
+        with self._lock:
+            for _, _, correlation_id in subscriptionList:
+                self._subscriptions.pop(correlation_id.value(), None)
+
+    def _tick(self) -> None:
+        while self._started:
+            time.sleep(max(_settings["latency_ms"], 1) / 100)
+            with self._lock:
+                entries = list(self._subscriptions.values())
+            for topic, fields, correlation_id in entries:
+                self._post(Event(Event.SUBSCRIPTION_DATA, [
+                    Message("MarketDataEvents", _market_data(topic, fields), [correlation_id])
+                ]))
+        self._ticker = None
+
+
+# --- 合成データ生成 ---
+
+_BULK_FIELDS = {
+    "INDX_MEMBERS": ("Member Ticker and Exchange Code", "Percentage Weight"),
+    "DVD_HIST_ALL": ("Declared Date", "Ex-Date", "Record Date", "Payable Date", "Dividend Amount", "Dividend Frequency"),
+    "OPT_CHAIN": ("Security Description",),
+    "FUT_CHAIN": ("Security Description",),
+}
+_STRING_FIELDS = {
+    "SECURITY_NAME", "SECURITY_NAME_REALTIME", "NAME", "GICS_SECTOR_NAME", "GICS_INDUSTRY_NAME",
+    "COUNTRY", "CRNCY", "EXCH_CODE", "ID_ISIN", "ID_CUSIP", "INDUSTRY_SECTOR", "EQY_FUND_CRNCY",
+    "TICKER", "SECURITY_TYP",
+}
+_TICKERS = [
+    "AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "BRK/B", "JPM", "V",
+    "UNH", "XOM", "JNJ", "PG", "MA", "HD", "AVGO", "CVX", "MRK", "ABBV",
+]
+
+
+def _noise(*parts) -> float:
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") / 2 ** 64
+
+
+def _scalar(security: str, field: str, salt: Any = "") -> Any:
+    if field in _STRING_FIELDS:
+        return f"{field.title()} of {security.split()[0]}"
+    base = 10 + _noise(security, field) * 490
+    return round(base * (0.9 + 0.2 * _noise(security, field, salt)), 4)
+
+
+def _bulk_rows(security: str, field: str) -> List[Dict[str, Any]]:
+    columns = _BULK_FIELDS[field]
+    rows = []
+    for i in range(_settings["bulk_rows"]):
+        if field == "INDX_MEMBERS":
+            ticker = _TICKERS[i % len(_TICKERS)]
+            if i >= len(_TICKERS):
+                ticker = f"{ticker}{i // len(_TICKERS)}"
+            rows.append({columns[0]: f"{ticker} UW", columns[1]: round(100 / _settings["bulk_rows"], 4)})
+        elif field == "DVD_HIST_ALL":
+            day = datetime.date(2024, 1, 1) - datetime.timedelta(days=91 * i)
+            rows.append({
+                columns[0]: day, columns[1]: day + datetime.timedelta(days=14),
+                columns[2]: day + datetime.timedelta(days=15), columns[3]: day + datetime.timedelta(days=30),
+                columns[4]: round(0.2 + _noise(security, i), 4), columns[5]: "Quarter",
+            })
+        else:
+            rows.append({columns[0]: f"{security.split()[0]} {i:04d} Equity"})
+    return rows
+
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    size = max(1, size)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _reference_data(request: Request):
+    spec = request.toPy()
+    securities = spec.get("securities", [])
+    fields = spec.get("fields", [])
+    overrides = tuple(sorted((o.get("fieldId"), o.get("value")) for o in spec.get("overrides", []) or []))
+    if not securities:
+        yield "ReferenceDataResponse", {"securityData": []}
+        return
+    for sequence, chunk in enumerate(_chunks(securities, _settings["message_size"])):
+        data = []
+        for offset, security in enumerate(chunk):
+            entry = {"security": security, "sequenceNumber": sequence * _settings["message_size"] + offset}
+            if security.startswith("INVALID"):
+                entry["securityError"] = {"category": "BAD_SEC", "message": "Unknown/Invalid security"}
+                entry["fieldData"] = {}
+            else:
+                field_data = {}
+                for field in fields:
+                    if field in _BULK_FIELDS:
+                        field_data[field] = _bulk_rows(security, field)
+                    else:
+                        field_data[field] = _scalar(security, field, overrides)
+                entry["fieldData"] = field_data
+            data.append(entry)
+        yield "ReferenceDataResponse", {"securityData": data}
+
+
+def _dates(start: datetime.date, end: datetime.date, periodicity: str) -> Iterator[datetime.date]:
+    day = start
+    step = {"WEEKLY": 7, "MONTHLY": 30, "QUARTERLY": 91, "YEARLY": 365}.get(periodicity, 1)
+    while day <= end:
+        if step > 1 or day.weekday() < 5:
+            yield day
+        day += datetime.timedelta(days=step)
+
+
+def _historical_data(request: Request):
+    spec = request.toPy()
+    start = datetime.datetime.strptime(spec["startDate"], "%Y%m%d").date()
+    end = datetime.datetime.strptime(spec["endDate"], "%Y%m%d").date()
+    periodicity = spec.get("periodicitySelection", "DAILY")
+    fields = spec.get("fields", [])
+    securities = spec.get("securities", [])
+    for sequence, security in enumerate(securities):
+        entry = {"security": security, "sequenceNumber": sequence}
+        if security.startswith("INVALID"):
+            entry["securityError"] = {"category": "BAD_SEC", "message": "Unknown/Invalid security"}
+            entry["fieldData"] = []
+        else:
+            entry["fieldData"] = [
+                dict({"date": day}, **{field: _scalar(security, field, day) for field in fields})
+                for day in _dates(start, end, periodicity)
+            ]
+        yield "HistoricalDataResponse", {"securityData": entry}
+    if not securities:
+        yield "HistoricalDataResponse", {"securityData": {"security": "", "fieldData": []}}
+
+
+def _field_entry(mnemonic: str, description: str) -> Dict[str, Any]:
+    return {
+        "id": mnemonic,
+        "fieldInfo": {
+            "mnemonic": mnemonic,
+            "description": description,
+            "datatype": "String" if mnemonic in _STRING_FIELDS else "Double",
+            "documentation": f"{description} ({mnemonic})",
+            "categoryName": "Market Activity" if mnemonic.startswith("PX_") else "Fundamentals",
+            "property": "",
+            "ftype": "Character" if mnemonic in _STRING_FIELDS else "Price",
+        },
+    }
+
+
+def _field_catalog() -> List[Dict[str, Any]]:
+    catalog = [_field_entry(m, m.replace("_", " ").title()) for m in sorted(_STRING_FIELDS)]
+    for prefix in ("PX", "EQY", "BEST", "VOLUME", "RETURN", "CUR_MKT"):
+        for i in range(_settings["search_results"] // 6 + 1):
+            mnemonic = f"{prefix}_FIELD_{i:03d}"
+            catalog.append(_field_entry(mnemonic, f"{prefix.title()} synthetic field {i}"))
+    return catalog
+
+
+def _field_search(request: Request):
+    spec = request.toPy()
+    query = str(spec.get("searchSpec", "")).lower()
+    matches = [
+        entry for entry in _field_catalog()
+        if query in entry["id"].lower() or query in entry["fieldInfo"]["description"].lower()
+    ]
+    yield "fieldResponse", {"fieldData": matches[:_settings["search_results"]]}
+
+
+def _field_info(request: Request):
+    spec = request.toPy()
+    ids = spec.get("id", [])
+    yield "fieldResponse", {"fieldData": [_field_entry(i, i.replace("_", " ").title()) for i in ids]}
+
+
+def _field_list(request: Request):
+    catalog = _field_catalog()
+    for chunk in _chunks(catalog, 100):
+        yield "fieldResponse", {"fieldData": chunk}
+
+
+def _instrument_list(request: Request):
+    spec = request.toPy()
+    query = str(spec.get("query", ""))
+    limit = min(int(spec.get("maxResults", 10)), _settings["search_results"])
+    word = query.split()[0].upper() if query.split() else "X"
+    results = []
+    for i in range(limit):
+        suffix = "" if i == 0 else str(i)
+        results.append({
+            "security": f"{word[:4]}{suffix} US<equity>",
+            "description": f"{query} {['Inc', 'Corp', 'Ltd', 'Holdings'][i % 4]} {i}",
+        })
+    yield "InstrumentListResponse", {"results": results}
+
+
+def _parse_datetime(value: Any) -> datetime.datetime:
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(str(value))
+
+
+def _intraday_bars(request: Request):
+    spec = request.toPy()
+    security = spec["security"]
+    interval = int(spec.get("interval", 1))
+    start = _parse_datetime(spec["startDateTime"])
+    end = _parse_datetime(spec["endDateTime"])
+    bars = []
+    moment = start
+    while moment < end:
+        if moment.weekday() < 5 and 13 <= moment.hour < 21:
+            price = _scalar(security, "PX_LAST", moment)
+            bars.append({
+                "time": moment, "open": price, "high": round(price * 1.002, 4),
+                "low": round(price * 0.998, 4), "close": price,
+                "volume": int(_noise(security, moment) * 1e5), "numEvents": 10 + int(_noise(moment) * 90),
+                "value": round(price * 1e5, 2),
+            })
+        moment += datetime.timedelta(minutes=interval)
+    yield "IntradayBarResponse", {"barData": {"eidData": [], "barTickData": bars}}
+
+
+def _intraday_ticks(request: Request):
+    spec = request.toPy()
+    security = spec["security"]
+    event_types = spec.get("eventTypes", ["TRADE"])
+    start = _parse_datetime(spec["startDateTime"])
+    end = _parse_datetime(spec["endDateTime"])
+    step = datetime.timedelta(milliseconds=max(1, _settings["tick_interval_ms"]))
+    moment = start
+    ticks = []
+    while moment < end:
+        for event_type in event_types:
+            ticks.append({
+                "time": moment, "type": event_type,
+                "value": _scalar(security, "PX_LAST", moment), "size": 1 + int(_noise(security, moment) * 500),
+            })
+        moment += step
+        if len(ticks) >= 5000:
+            yield "IntradayTickResponse", {"tickData": {"eidData": [], "tickData": ticks}}
+            ticks = []
+    yield "IntradayTickResponse", {"tickData": {"eidData": [], "tickData": ticks}}
+
+
+def _market_data(topic: str, fields: List[str]) -> Dict[str, Any]:
+    moment = time.time()
+    body = {}
+    for field in fields or ["LAST_PRICE"]:
+        value = _scalar(topic, field, int(moment * 10))
+        body[field] = value
+    return body
+
+
+_GENERATORS = {
+    "ReferenceDataRequest": _reference_data,
+    "HistoricalDataRequest": _historical_data,
+    "FieldSearchRequest": _field_search,
+    "CategorizedFieldSearchRequest": _field_search,
+    "FieldInfoRequest": _field_info,
+    "FieldListRequest": _field_list,
+    "instrumentListRequest": _instrument_list,
+    "IntradayBarRequest": _intraday_bars,
+    "IntradayTickRequest": _intraday_ticks,
+}
+
+
+def _generate(request: Request):
+    generator = _GENERATORS.get(request.operation())
+    if generator is None:
+        raise ValueError(f"未対応のリクエスト: {request.operation()}")
+    return generator(request)
@@ -0,0 +1,120 @@
+"""
+記録したBloombergセッションの再生（blpapi 相当）
+BBG_BACKEND=replay で blpapi の代わりに使われ、BBG_REPLAY_FILE のキャプチャ（capture.py）から
+同じ内容のリクエストに記録どおりの応答を返す
+
+セッション・サービス・リクエストの作成はエミュレータ（blpapi_emulator.py）と共通。
+応答は記録時の間隔を BBG_REPLAY_SPEED 倍の速さで再現する（0の場合は待たずに返す）。
+同じ内容のリクエストが複数回記録されていれば記録順に返し、使い切った後は最後の応答を返す。
+記録にないリクエストには RequestFailure を返す。リアルタイム購読は再生しない。
+"""
+
+import functools
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from blpapi_emulator import *  # noqa: F401,F403
+from blpapi_emulator import CorrelationId, Element, Event, Message, Request
+from blpapi_emulator import Session as _EmulatorSession
+
+import config
+from capture import CapturedEvent, CapturedRequest, Node, read_capture, request_key
+
+
+# 1回分の応答: [(リクエスト送信からの秒数, イベント種別, メッセージ種別, 要素ツリー)]
+Exchange = List[Tuple[float, int, str, Node]]
+
+_RESPONSE_EVENTS = (Event.PARTIAL_RESPONSE, Event.RESPONSE, Event.REQUEST_STATUS)
+
+
+class CaptureLibrary:
+    """キャプチャ内のリクエストごとの応答（リクエストの内容で引く）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._exchanges: Dict[Tuple[str, str, str], List[Exchange]] = defaultdict(list)
+        self._served: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+        requests: List[CapturedRequest] = []
+        responses: Dict[Tuple[int, object], List[Tuple[float, int, str, Node]]] = defaultdict(list)
+        for record in read_capture(path):
+            if isinstance(record, CapturedRequest):
+                requests.append(record)
+            elif isinstance(record, CapturedEvent) and record.event_type in _RESPONSE_EVENTS:
+                for message in record.messages:
+                    for correlation_id in message.correlation_ids:
+                        responses[(record.session, correlation_id)].append(
+                            (record.time, record.event_type, message.message_type, message.body)
+                        )
+        for request in requests:
+            received = responses.get((request.session, request.correlation_id), [])
+            exchange = [
+                (max(0.0, at - request.time), event_type, message_type, body)
+                for at, event_type, message_type, body in received
+            ]
+            self._exchanges[(request.service, request.operation, request.key)].append(exchange)
+
+    def __len__(self) -> int:
+        return sum(len(exchanges) for exchanges in self._exchanges.values())
+
+    def next_exchange(self, service: str, operation: str, key: str) -> Optional[Exchange]:
+        """リクエストに対する次の応答（記録にない場合はNone）"""
+        lookup = (service, operation, key)
+        exchanges = self._exchanges.get(lookup)
+        if not exchanges:
+            return None
+        with self._lock:
+            index = self._served.get(lookup, 0)
+            self._served[lookup] = index + 1
+        return exchanges[min(index, len(exchanges) - 1)]
+
+
+@functools.lru_cache(maxsize=None)
+def library(path: str) -> CaptureLibrary:
+    """キャプチャを読み込む（同じファイルは1回だけ）"""
+    if not path:
+        raise ValueError("BBG_BACKEND=replay の場合は BBG_REPLAY_FILE にキャプチャのパスを指定してください")
+    return CaptureLibrary(path)
+
+
+class Session(_EmulatorSession):
+    """blpapi.Session 相当（キャプチャの応答を返す）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._library = library(config.REPLAY_FILE)
+        self._speed = config.REPLAY_SPEED
+
+    def _respond(self, request: Request, correlation_id: CorrelationId) -> None:
+        service = request.service().name()
+        exchange = self._library.next_exchange(service, request.operation(), request_key(request))
+        if exchange is None:
+            self._post(Event(Event.REQUEST_STATUS, [
+                Message("RequestFailure", {"reason": {
+                    "message": f"キャプチャに記録されていないリクエストです: {request}",
+                    "category": "NOT_CAPTURED",
+                }}, [correlation_id])
+            ]))
+            return
+
+        started = time.monotonic()
+        for offset, event_type, message_type, body in exchange:
+            if self._speed > 0:
+                delay = started + offset / self._speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            with self._lock:
+                if correlation_id.value() in self._cancelled:
+                    self._cancelled.discard(correlation_id.value())
+                    return
+            self._post(Event(event_type, [
+                Message(message_type, Element.from_node(body), [correlation_id], request.service())
+            ]))
+
+    def subscribe(self, subscriptionList, identity=None, requestLabel: str = "") -> None:
+        # 購読は開始の通知のみ（値は配信しない）
+        for _, _, correlation_id in subscriptionList:
+            self._post(Event(Event.SUBSCRIPTION_STATUS, [Message("SubscriptionStarted", {}, [correlation_id])]))
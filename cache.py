@@ -0,0 +1,204 @@
+"""
+Bloomberg MCP Server キャッシュ
+LRU + 有効期限付きのインメモリキャッシュと、参照データ（BDP）用のフィールド単位キャッシュ
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    LRU方式で追い出す、エントリごとに有効期限を持つキャッシュ
+
+    max_entries を超えると最も長く参照されていないエントリから削除する。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """有効なエントリの値を返す（なければdefault）"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def contains(self, key: Hashable) -> bool:
+        """有効なエントリが存在するか"""
+        return self.get(key, _MISSING) is not _MISSING
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """
+        エントリを登録
+
+        Args:
+            key: キー
+            value: 値
+            ttl: 有効期限（秒）。0以下の場合は登録しない
+        """
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def overrides_key(overrides: Optional[Mapping[str, Any]]) -> Tuple[Tuple[str, str], ...]:
+    """オーバーライド指定をキャッシュキー用のタプルに正規化"""
+    if not overrides:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in overrides.items()))
+
+
+class ReferenceDataCache:
+    """
+    参照データを (証券, フィールド, オーバーライド) 単位で保持するキャッシュ
+
+    フィールドごとに有効期限を変えられる（価格は短く、静的属性は長く等）。
+    """
+
+    def __init__(self, max_entries: int, default_ttl: float, field_ttl: Optional[Mapping[str, float]] = None):
+        self.default_ttl = default_ttl
+        self.field_ttl = dict(field_ttl or {})
+        self._cache = TTLCache(max_entries)
+
+    def ttl_for(self, field: str) -> float:
+        """フィールドの有効期限（秒）"""
+        return self.field_ttl.get(field, self.default_ttl)
+
+    def lookup(
+        self,
+        securities: Sequence[str],
+        fields: Sequence[str],
+        overrides: Optional[Mapping[str, Any]] = None,
+    ) -> Tuple[Dict[str, Dict[str, Any]], List[str], List[str]]:
+        """
+        キャッシュを参照し、不足分を求める
+
+        Args:
+            securities: 証券コードのリスト
+            fields: フィールド名のリスト
+            overrides: オーバーライド指定
+
+        Returns:
+            (キャッシュ済みの値 {証券: {フィールド: 値}},
+             取得が必要な証券のリスト, 取得が必要なフィールドのリスト)
+        """
+        okey = overrides_key(overrides)
+        cached: Dict[str, Dict[str, Any]] = {}
+        missing_securities: List[str] = []
+        missing_fields: Dict[str, None] = {}
+
+        for security in securities:
+            values = {}
+            for field in fields:
+                value = self._cache.get((security, field, okey), _MISSING)
+                if value is _MISSING:
+                    missing_fields[field] = None
+                else:
+                    values[field] = value
+            if len(values) < len(fields):
+                missing_securities.append(security)
+            cached[security] = values
+
+        return cached, missing_securities, list(missing_fields)
+
+    def store(self, results: Mapping[str, Mapping[str, Any]], overrides: Optional[Mapping[str, Any]] = None) -> None:
+        """取得結果 {証券: {フィールド: 値}} を登録"""
+        okey = overrides_key(overrides)
+        for security, values in results.items():
+            for field, value in values.items():
+                self._cache.set((security, field, okey), value, self.ttl_for(field))
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        self._cache.clear()
+
+
+def normalize_query(query: str) -> str:
+    """検索語を正規化（小文字化、連続する空白を1つに）"""
+    return " ".join(query.lower().split())
+
+
+def _matches_tokens(tokens: Sequence[str], result: Mapping[str, str]) -> bool:
+    """検索結果の証券コード・説明の語が、すべての検索語に前方一致するか"""
+    words = f"{result.get('security', '')} {result.get('description', '')}".lower().replace("<", " ").split()
+    return all(any(word.startswith(token) for word in words) for token in tokens)
+
+
+class SecuritySearchCache:
+    """
+    証券検索（instrumentListRequest）の結果を検索語単位で保持するキャッシュ
+
+    同じ検索語は要求件数を満たしていれば結果を再利用する。
+    キャッシュ済みの検索語で始まる検索語（"appl" → "apple inc"）は、キャッシュ済みの結果を
+    すべての語に前方一致する候補に絞り込み、元の結果が全件（要求件数未満）であるか
+    絞り込んだ件数が要求件数に達していればその結果を返す。
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.ttl = ttl
+        self._cache = TTLCache(max_entries)
+
+    def lookup(self, query: str, max_results: int) -> Optional[List[Dict[str, str]]]:
+        """
+        キャッシュから検索結果を返す
+
+        Returns:
+            検索結果のリスト（キャッシュから答えられない場合はNone）
+        """
+        key = normalize_query(query)
+        entry = self._cache.get(key)
+        if entry is not None:
+            results, complete = entry
+            if complete or len(results) >= max_results:
+                return results[:max_results]
+
+        # 最も長いキャッシュ済みの前方部分から絞り込む
+        tokens = key.split()
+        for end in range(len(key) - 1, 0, -1):
+            entry = self._cache.get(key[:end])
+            if entry is None:
+                continue
+            results, complete = entry
+            narrowed = [result for result in results if _matches_tokens(tokens, result)]
+            if complete or len(narrowed) >= max_results:
+                return narrowed[:max_results]
+        return None
+
+    def store(self, query: str, max_results: int, results: List[Dict[str, str]]) -> None:
+        """検索結果を登録（要求件数未満なら全件として扱う）"""
+        self._cache.set(normalize_query(query), (results, len(results) < max_results), self.ttl)
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        self._cache.clear()
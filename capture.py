@@ -0,0 +1,429 @@
+"""
+Bloomberg セッションの記録（キャプチャ）形式
+送信したリクエストと受信したイベント（メッセージの要素ツリー）をバイナリのログに記録し、読み出す
+
+BBG_CAPTURE にパスを指定すると BloombergAPI が記録し、BBG_BACKEND=replay で再生する
+（blpapi_replay.py）。本番の応答の形（大きな INDX_MEMBERS、長期間の過去データ等）のまま
+デコード・キャッシュの動作をTerminalなしで調べるためのもの。
+
+ファイルはマジック b"BBGCAP1\\n" の後にレコードが続く。
+    リクエスト: 種別 経過秒 セッション番号 CorrelationId サービス リクエスト種別 リクエストの内容
+    イベント:   種別 経過秒 セッション番号 イベント種別 メッセージ数 {メッセージ種別 CorrelationId... 要素ツリー}
+整数は可変長、要素名等の短い文字列は初出時に表へ登録して以降は番号で参照する。
+要素ツリーはデータ型付きで記録し、再生時に同じデータ型の要素として復元する。
+"""
+
+import datetime
+import json
+import struct
+import sys
+import threading
+import time
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+MAGIC = b"BBGCAP1\n"
+
+REQUEST = 1
+EVENT = 2
+
+# blpapi.DataType.SEQUENCE / CHOICE（子要素を持つ型）
+_SEQUENCE = 15
+_CHOICE = 16
+
+# 値の種別
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_NEW_STRING = 5
+_STRING_REF = 6
+_DATE = 7
+_TIME = 8
+_DATETIME = 9
+_DATETIME_TZ = 10
+_STRING = 11
+
+# 表へ登録する文字列の最大長（長い説明文等はそのまま記録する）
+_MAX_INTERNED = 64
+
+_FLOAT64 = struct.Struct("<d")
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# 要素ツリー: (要素名, データ型, 配列か, 値)
+#   値は 複合型なら子要素のリスト（配列なら子要素のリストのリスト）、それ以外は値（配列なら値のリスト）
+Node = Tuple[str, int, bool, Any]
+
+
+class CapturedRequest(NamedTuple):
+    time: float
+    session: int
+    correlation_id: Any
+    service: str
+    operation: str
+    key: str
+
+
+class CapturedMessage(NamedTuple):
+    message_type: str
+    correlation_ids: List[Any]
+    body: Node
+
+
+class CapturedEvent(NamedTuple):
+    time: float
+    session: int
+    event_type: int
+    messages: List[CapturedMessage]
+
+
+def element_node(element) -> Node:
+    """blpapi.Element を要素ツリーに変換"""
+    datatype = element.datatype()
+    name = str(element.name())
+    if element.isArray():
+        if datatype in (_SEQUENCE, _CHOICE):
+            return name, datatype, True, [_children(value, datatype) for value in element.values()]
+        return name, datatype, True, list(element.values())
+    if datatype in (_SEQUENCE, _CHOICE):
+        return name, datatype, False, _children(element, datatype)
+    if element.isNull():
+        return name, datatype, False, None
+    return name, datatype, False, element.getValue()
+
+
+def _children(element, datatype: int) -> List[Node]:
+    if datatype == _CHOICE:
+        return [element_node(element.getChoice())]
+    return [element_node(child) for child in element.elements()]
+
+
+def element_to_py(element) -> Any:
+    """要素をPythonの値に変換（toPy() のない版のblpapiでは要素を走査する）"""
+    to_py = getattr(element, "toPy", None)
+    if to_py is not None:
+        return to_py()
+    if element.isArray():
+        return [element_to_py(value) if hasattr(value, "elements") else value for value in element.values()]
+    if element.isComplexType():
+        return {str(child.name()): element_to_py(child) for child in element.elements()}
+    return None if element.isNull() else element.getValue()
+
+
+def _canonical(value: Any) -> Any:
+    """リクエストの内容を比較用に正規化（未設定の要素を除き、日時はUTCのnaiveに揃える）"""
+    if isinstance(value, dict):
+        items = {key: _canonical(v) for key, v in value.items()}
+        return {key: v for key, v in items.items() if v not in (None, [], {})}
+    if isinstance(value, list):
+        return [_canonical(v) for v in value]
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return value.isoformat()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def request_key(request) -> str:
+    """リクエストの内容を表す文字列（要素の順序や未設定の要素によらず同じ内容なら同じ文字列）"""
+    return json.dumps(_canonical(element_to_py(request.asElement())), sort_keys=True,
+                      ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _zigzag(value: int) -> int:
+    """符号付き整数を符号なしに変換（絶対値の小さい負数も短く符号化できるように）"""
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+class _Encoder:
+    """レコードの符号化（文字列の表はファイル全体で共有する）"""
+
+    def __init__(self):
+        self._strings: Dict[str, int] = {}
+
+    def varint(self, out: bytearray, value: int) -> None:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    def value(self, out: bytearray, value: Any) -> None:
+        if value is None:
+            out.append(_NONE)
+        elif value is True:
+            out.append(_TRUE)
+        elif value is False:
+            out.append(_FALSE)
+        elif isinstance(value, int):
+            out.append(_INT)
+            self.varint(out, _zigzag(value))
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out += _FLOAT64.pack(value)
+        elif isinstance(value, datetime.datetime):
+            offset = value.utcoffset()
+            naive = value.replace(tzinfo=None)
+            out.append(_DATETIME if offset is None else _DATETIME_TZ)
+            delta = naive - _EPOCH
+            micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+            self.varint(out, _zigzag(micros))
+            if offset is not None:
+                minutes = int(offset.total_seconds() // 60)
+                self.varint(out, _zigzag(minutes))
+        elif isinstance(value, datetime.date):
+            out.append(_DATE)
+            self.varint(out, value.toordinal())
+        elif isinstance(value, datetime.time):
+            out.append(_TIME)
+            self.varint(out, ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + value.microsecond)
+        else:
+            self.string(out, str(value))
+
+    def string(self, out: bytearray, value: str) -> None:
+        index = self._strings.get(value)
+        if index is not None:
+            out.append(_STRING_REF)
+            self.varint(out, index)
+            return
+        data = value.encode("utf-8")
+        if len(value) <= _MAX_INTERNED:
+            self._strings[value] = len(self._strings)
+            out.append(_NEW_STRING)
+        else:
+            out.append(_STRING)
+        self.varint(out, len(data))
+        out += data
+
+    def node(self, out: bytearray, node: Node) -> None:
+        name, datatype, is_array, value = node
+        self.string(out, name)
+        self.varint(out, datatype)
+        out.append(1 if is_array else 0)
+        complex_type = datatype in (_SEQUENCE, _CHOICE)
+        if is_array:
+            self.varint(out, len(value))
+            for item in value:
+                if complex_type:
+                    self.nodes(out, item)
+                else:
+                    self.value(out, item)
+        elif complex_type:
+            self.nodes(out, value)
+        else:
+            self.value(out, value)
+
+    def nodes(self, out: bytearray, nodes: List[Node]) -> None:
+        self.varint(out, len(nodes))
+        for node in nodes:
+            self.node(out, node)
+
+
+class _Decoder:
+    """レコードの復号（_Encoder と同じ順序で文字列の表を作る）"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+        self._strings: List[str] = []
+
+    def byte(self) -> int:
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def varint(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def zigzag(self) -> int:
+        value = self.varint()
+        return (value >> 1) ^ -(value & 1)
+
+    def float64(self) -> float:
+        value, = _FLOAT64.unpack_from(self.data, self.pos)
+        self.pos += 8
+        return value
+
+    def value(self) -> Any:
+        tag = self.byte()
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            return self.zigzag()
+        if tag == _FLOAT:
+            return self.float64()
+        if tag in (_NEW_STRING, _STRING):
+            length = self.varint()
+            value = self.data[self.pos:self.pos + length].decode("utf-8")
+            self.pos += length
+            if tag == _NEW_STRING:
+                self._strings.append(value)
+            return value
+        if tag == _STRING_REF:
+            return self._strings[self.varint()]
+        if tag in (_DATETIME, _DATETIME_TZ):
+            value = _EPOCH + datetime.timedelta(microseconds=self.zigzag())
+            if tag == _DATETIME_TZ:
+                value = value.replace(tzinfo=datetime.timezone(datetime.timedelta(minutes=self.zigzag())))
+            return value
+        if tag == _DATE:
+            return datetime.date.fromordinal(self.varint())
+        if tag == _TIME:
+            micros = self.varint()
+            seconds, microsecond = divmod(micros, 1000000)
+            minutes, second = divmod(seconds, 60)
+            hour, minute = divmod(minutes, 60)
+            return datetime.time(hour, minute, second, microsecond)
+        raise ValueError(f"キャプチャの形式が正しくありません（値の種別 {tag}、位置 {self.pos - 1}）")
+
+    def node(self) -> Node:
+        name = self.value()
+        datatype = self.varint()
+        is_array = self.byte() == 1
+        complex_type = datatype in (_SEQUENCE, _CHOICE)
+        if is_array:
+            count = self.varint()
+            if complex_type:
+                value = [self.nodes() for _ in range(count)]
+            else:
+                value = [self.value() for _ in range(count)]
+        elif complex_type:
+            value = self.nodes()
+        else:
+            value = self.value()
+        return name, datatype, is_array, value
+
+    def nodes(self) -> List[Node]:
+        return [self.node() for _ in range(self.varint())]
+
+
+class CaptureWriter:
+    """
+    キャプチャの書き込み
+
+    record_request / record_event は複数のスレッド（blpapiのイベントハンドラ、イベントループ）
+    から呼ばれる。記録に失敗してもリクエストの処理は止めない。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[IO[bytes]] = open(path, "wb", buffering=1 << 20)
+        self._file.write(MAGIC)
+        self._encoder = _Encoder()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._warned = False
+
+    def _write(self, kind: int, at: float, session: int, body) -> None:
+        out = bytearray((kind,))
+        out += _FLOAT64.pack(at - self._started)
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._encoder.varint(out, session)
+                body(out)
+            except Exception as e:
+                # 文字列の表は符号化できた分だけ進んでいるため、以降のレコードは記録しない
+                self._file.close()
+                self._file = None
+                print(f"警告: キャプチャの記録を中止しました: {e}", file=sys.stderr)
+                return
+            self._file.write(out)
+
+    def record_request(self, session: int, correlation_id: Any, service: str, operation: str,
+                       request, sent: Optional[float] = None) -> None:
+        """
+        送信したリクエストを記録
+
+        Args:
+            session: セッション番号
+            correlation_id: リクエストの CorrelationId
+            service: サービス名
+            operation: リクエスト種別
+            request: blpapi.Request
+            sent: 送信時刻（time.monotonic()、省略時は現在）
+        """
+        def body(out: bytearray) -> None:
+            self._encoder.value(out, correlation_id.value())
+            self._encoder.string(out, service)
+            self._encoder.string(out, operation)
+            self._encoder.string(out, request_key(request))
+
+        self._write(REQUEST, time.monotonic() if sent is None else sent, session, body)
+
+    def record_event(self, session: int, event) -> None:
+        """受信したイベントを記録（blpapiのイベントハンドラから呼ばれる）"""
+        received = time.monotonic()
+
+        def body(out: bytearray) -> None:
+            messages = [
+                (str(msg.messageType()), [cid.value() for cid in msg.correlationIds()], element_node(msg.asElement()))
+                for msg in event
+            ]
+            self._encoder.varint(out, event.eventType())
+            self._encoder.varint(out, len(messages))
+            for message_type, correlation_ids, node in messages:
+                self._encoder.string(out, message_type)
+                self._encoder.varint(out, len(correlation_ids))
+                for value in correlation_ids:
+                    self._encoder.value(out, value)
+                self._encoder.node(out, node)
+
+        self._write(EVENT, received, session, body)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path: str) -> Iterator[Union[CapturedRequest, CapturedEvent]]:
+    """
+    キャプチャのレコードを記録順に返す
+
+    記録の途中で終了した（最後のレコードが欠けた）ファイルは、完全なレコードまでを返す。
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"キャプチャファイルではありません: {path}")
+
+    decoder = _Decoder(data)
+    decoder.pos = len(MAGIC)
+    while decoder.pos < len(data):
+        try:
+            kind = decoder.byte()
+            at = decoder.float64()
+            session = decoder.varint()
+            if kind == REQUEST:
+                record = CapturedRequest(at, session, decoder.value(), decoder.value(), decoder.value(), decoder.value())
+            elif kind == EVENT:
+                event_type = decoder.varint()
+                messages = []
+                for _ in range(decoder.varint()):
+                    message_type = decoder.value()
+                    correlation_ids = [decoder.value() for _ in range(decoder.varint())]
+                    messages.append(CapturedMessage(message_type, correlation_ids, decoder.node()))
+                record = CapturedEvent(at, session, event_type, messages)
+            else:
+                raise ValueError(f"キャプチャの形式が正しくありません（レコードの種別 {kind}）")
+        except (IndexError, struct.error, UnicodeDecodeError):
+            return
+        if decoder.pos > len(data):
+            return
+        yield record
@@ -0,0 +1,155 @@
+"""
+大量証券リクエストの分割送信
+証券リストを一定サイズのチャンクに分け、並行して取得した結果を入力順に統合する
+"""
+
+import asyncio
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from deadlines import DeadlineExceeded, report_partial
+
+
+# チャンク単位の失敗情報 {"securities": [...], "error": "..."}
+# 期限切れの場合は "timed_out": True を含み、securities は結果を受信できなかった証券のみ
+ChunkError = Dict[str, Any]
+
+
+def split_chunks(items: Sequence[str], size: int) -> List[List[str]]:
+    """リストをsize件ずつに分割（sizeが0以下なら分割しない）"""
+    items = list(items)
+    if size <= 0 or len(items) <= size:
+        return [items]
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def gather_chunks(
+    fetch: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    securities: Sequence[str],
+    chunk_size: int,
+) -> Tuple[Dict[str, Any], List[ChunkError]]:
+    """
+    証券リストをチャンクに分けて並行取得し、結果を統合
+
+    Args:
+        fetch: 1チャンク分を取得する関数（{証券: 値} を返す）
+        securities: 証券コードのリスト
+        chunk_size: 1チャンクあたりの証券数
+
+    Returns:
+        (入力順に並べた {証券: 値}, 失敗したチャンクの情報のリスト)
+        すべてのチャンクが失敗した場合は最初の例外を送出する
+    """
+    chunks = split_chunks(securities, chunk_size)
+    outcomes = await asyncio.gather(*[_fetch_chunk(fetch, chunk) for chunk in chunks], return_exceptions=True)
+    return _merge_outcomes(chunks, outcomes, securities)
+
+
+async def pipeline_chunks(
+    fetch: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    securities: AsyncIterable[str],
+    chunk_size: int,
+) -> Tuple[Dict[str, Any], List[ChunkError]]:
+    """
+    証券を受け取りながらチャンクに分け、チャンクがそろった時点で取得を開始
+
+    証券リスト自体を取得中（指数構成銘柄の受信中等）でも、先に届いた証券の取得を
+    並行して進められる。戻り値は gather_chunks と同じ。
+    """
+    order: List[str] = []
+    chunks: List[List[str]] = []
+    tasks: List[asyncio.Future] = []
+    buffer: List[str] = []
+    try:
+        async for security in securities:
+            order.append(security)
+            buffer.append(security)
+            if 0 < chunk_size <= len(buffer):
+                chunks.append(buffer)
+                tasks.append(asyncio.ensure_future(_fetch_chunk(fetch, buffer)))
+                buffer = []
+        if buffer:
+            chunks.append(buffer)
+            tasks.append(asyncio.ensure_future(_fetch_chunk(fetch, buffer)))
+    except BaseException:
+        # 証券リストの受信に失敗した場合は開始済みの取得も中止する
+        for task in tasks:
+            task.cancel()
+        raise
+
+    if not tasks:
+        return {}, []
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    return _merge_outcomes(chunks, outcomes, order)
+
+
+async def _fetch_chunk(fetch: Callable[[List[str]], Awaitable[Dict[str, Any]]], chunk: List[str]) -> Dict[str, Any]:
+    """1チャンクを取得し、受信した結果を共有の取得処理の部分結果として記録（deadlines.report_partial）"""
+    try:
+        result = await fetch(chunk)
+    except DeadlineExceeded as e:
+        report_partial(e.partial or {})
+        raise
+    report_partial(result)
+    return result
+
+
+def _merge_outcomes(
+    chunks: List[List[str]],
+    outcomes: List[Any],
+    securities: Sequence[str],
+) -> Tuple[Dict[str, Any], List[ChunkError]]:
+    """
+    チャンクごとの結果を統合（結果が1件もなくすべて失敗した場合は最初の例外を送出）
+
+    期限切れのチャンクは、期限までに受信した部分結果（DeadlineExceeded.partial）を含める。
+    """
+    merged: Dict[str, Any] = {}
+    errors: List[ChunkError] = []
+    failures = 0
+    first_error = None
+    for chunk, outcome in zip(chunks, outcomes):
+        if isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        if isinstance(outcome, DeadlineExceeded):
+            failures += 1
+            first_error = first_error or outcome
+            partial = outcome.partial or {}
+            merged.update(partial)
+            missing = [security for security in chunk if security not in partial]
+            if missing:
+                errors.append({"securities": missing, "error": str(outcome), "timed_out": True})
+            continue
+        if isinstance(outcome, BaseException):
+            failures += 1
+            first_error = first_error or outcome
+            errors.append({"securities": chunk, "error": str(outcome)})
+            continue
+        merged.update(outcome)
+
+    if failures == len(chunks) and not merged:
+        raise first_error
+
+    # 応答順ではなく入力順に並べる
+    ordered = {security: merged.pop(security) for security in securities if security in merged}
+    ordered.update(merged)
+    return ordered, errors
+
+
+def timed_out_outcome(error: DeadlineExceeded, securities: Sequence[str]) -> Tuple[Dict[str, Any], List[ChunkError]]:
+    """
+    期限切れの部分結果を gather_chunks と同じ形にする
+
+    受信できなかった証券は "timed_out": True の失敗情報にする。部分結果がない場合は例外を送出する。
+    """
+    return _merge_outcomes([list(securities)], [error], securities)
+
+
+def errors_for(errors: Sequence[ChunkError], securities: Sequence[str]) -> List[ChunkError]:
+    """失敗情報のうち、指定された証券に関係する部分のみを返す"""
+    wanted = set(securities)
+    result = []
+    for error in errors:
+        related = [security for security in error["securities"] if security in wanted]
+        if related:
+            result.append({**error, "securities": related})
+    return result
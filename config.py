@@ -0,0 +1,203 @@
+"""
+Bloomberg MCP Server 設定
+各値は環境変数で上書きできる
+"""
+
+import os
+from typing import Dict
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"環境変数 {name} は整数で指定してください: {value}")
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"環境変数 {name} は数値で指定してください: {value}")
+
+
+def _env_float_map(name: str) -> Dict[str, float]:
+    """"KEY=秒,KEY=秒" 形式の環境変数を辞書に変換"""
+    result = {}
+    for item in os.environ.get(name, "").split(","):
+        if not item.strip():
+            continue
+        key, _, value = item.partition("=")
+        try:
+            result[key.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"環境変数 {name} は KEY=秒 のカンマ区切りで指定してください: {item}")
+    return result
+
+
+# Bloomberg APIの実装（blpapi: Bloomberg Terminal / emulator: 合成データを返すエミュレータ /
+# replay: BBG_REPLAY_FILE のキャプチャを再生）
+BACKEND = os.environ.get("BBG_BACKEND", "blpapi")
+
+# 送信したリクエストと受信したイベントを記録するファイル（空の場合は記録しない）
+CAPTURE_PATH = os.environ.get("BBG_CAPTURE", "")
+
+# 再生するキャプチャと再生速度（記録時の間隔の何倍の速さで応答するか、0で待たずに応答）
+REPLAY_FILE = os.environ.get("BBG_REPLAY_FILE", "")
+REPLAY_SPEED = _env_float("BBG_REPLAY_SPEED", 1.0)
+
+# Bloomberg Desktop API接続先
+BBG_HOST = os.environ.get("BBG_HOST", "localhost")
+BBG_PORT = _env_int("BBG_PORT", 8194)
+
+# セッションプール（セッション数と1セッションあたりの同時リクエスト上限）
+SESSION_POOL_SIZE = _env_int("BBG_SESSION_POOL_SIZE", 2)
+MAX_IN_FLIGHT_PER_SESSION = _env_int("BBG_MAX_IN_FLIGHT_PER_SESSION", 32)
+
+# 各セッションで起動時に開くサービス（並行して開く。これ以外のサービスは最初の利用時に開く）
+DEFAULT_SERVICES = ("//blp/refdata", "//blp/apiflds", "//blp/instruments")
+
+# セッション開始・サービスを開く処理の待機秒数
+SESSION_START_TIMEOUT = _env_float("BBG_SESSION_START_TIMEOUT", 30)
+
+# 切断されたセッションの再接続（待機秒数は base * 2^試行回数 を上限 max とした範囲の乱数）
+RECONNECT_BACKOFF_BASE = _env_float("BBG_RECONNECT_BACKOFF_BASE", 0.5)
+RECONNECT_BACKOFF_MAX = _env_float("BBG_RECONNECT_BACKOFF_MAX", 30)
+
+# 接続断で応答が得られなかったリクエストを再送する回数（0で再送しない）
+REPLAY_ATTEMPTS = _env_int("BBG_REPLAY_ATTEMPTS", 2)
+
+# サーバー起動時にバックグラウンドで接続しておく（BBG_PREWARM=0で最初のツール呼び出し時に接続）
+PREWARM_CONNECTION = os.environ.get("BBG_PREWARM", "1") != "0"
+
+# ツールごとの期限（秒、0で無制限）。期限を過ぎたリクエストはBloomberg側でも取り消す
+REQUEST_TIMEOUT = _env_float("BBG_REQUEST_TIMEOUT", 60)
+TOOL_TIMEOUTS = {
+    "search_securities": 30,
+    "search_fields": 30,
+    "get_reference_data": 60,
+    "get_bulk_data": 120,
+    "get_historical_data": 300,
+    "get_universe_data": 300,
+    "get_intraday_bars": 300,
+    "get_intraday_ticks": 600,
+}
+TOOL_TIMEOUTS.update(_env_float_map("BBG_TOOL_TIMEOUTS"))
+
+# 参照データ（BDP）キャッシュ：(証券, フィールド, オーバーライド) 単位、TTLは秒（0で無効）
+REFDATA_CACHE_MAX_ENTRIES = _env_int("BBG_REFDATA_CACHE_MAX_ENTRIES", 100000)
+REFDATA_CACHE_TTL = _env_float("BBG_REFDATA_CACHE_TTL", 60)
+REFDATA_FIELD_TTL = {
+    # 価格系は短く
+    "PX_LAST": 15,
+    "LAST_PRICE": 5,
+    "BID": 5,
+    "ASK": 5,
+    "PX_VOLUME": 15,
+    # 静的属性は長く
+    "SECURITY_NAME": 86400,
+    "GICS_SECTOR_NAME": 86400,
+    "GICS_INDUSTRY_NAME": 86400,
+    "INDUSTRY_SECTOR": 86400,
+    "COUNTRY": 86400,
+    "CRNCY": 86400,
+    "EXCH_CODE": 86400,
+    "ID_ISIN": 86400,
+    "ID_CUSIP": 86400,
+}
+REFDATA_FIELD_TTL.update(_env_float_map("BBG_REFDATA_FIELD_TTL"))
+
+# バルクデータ（BDS）キャッシュ：(証券, フィールド) 単位、TTLは秒（0で無効）
+BULK_CACHE_MAX_ENTRIES = _env_int("BBG_BULK_CACHE_MAX_ENTRIES", 10000)
+BULK_CACHE_TTL = _env_float("BBG_BULK_CACHE_TTL", 3600)
+BULK_FIELD_TTL = {
+    # 指数構成銘柄・配当履歴は日次で更新
+    "INDX_MEMBERS": 86400,
+    "INDX_MWEIGHT": 86400,
+    "DVD_HIST_ALL": 86400,
+    # オプション・先物の銘柄一覧は日中に変わる
+    "OPT_CHAIN": 900,
+    "FUT_CHAIN": 3600,
+}
+BULK_FIELD_TTL.update(_env_float_map("BBG_BULK_FIELD_TTL"))
+
+# 証券検索のキャッシュ（検索語単位、TTLは秒、0で無効）
+SECURITY_SEARCH_CACHE_MAX_ENTRIES = _env_int("BBG_SECURITY_SEARCH_CACHE_MAX_ENTRIES", 10000)
+SECURITY_SEARCH_CACHE_TTL = _env_float("BBG_SECURITY_SEARCH_CACHE_TTL", 3600)
+
+# 過去データ（BDH）のローカルストア（BBG_HISTORY_STORE=0で無効）
+HISTORY_STORE_ENABLED = os.environ.get("BBG_HISTORY_STORE", "1") != "0"
+HISTORY_STORE_DIR = os.environ.get(
+    "BBG_HISTORY_STORE_DIR", os.path.join("~", ".cache", "simple-mcp-server", "history")
+)
+# 部分取得した区間を継ぎ足せる周期のみ保存する（週次・月次は取得期間によって基準日がずれるため対象外）
+HISTORY_STORE_PERIODICITIES = ("DAILY",)
+# 保存するのは何日前までか（取引所の現地日付で直近の営業日は訂正されうるため、
+# 最も進んだタイムゾーンでもこの日数より前になるよう UTC の前日から数える）
+HISTORY_STORE_SETTLE_DAYS = _env_int("BBG_HISTORY_STORE_SETTLE_DAYS", 2)
+# 系列を全期間取得し直すまでの秒数（0で無期限）
+HISTORY_STORE_MAX_AGE = _env_float("BBG_HISTORY_STORE_MAX_AGE", 7 * 86400)
+# 保存済みの区間に継ぎ足す際に重ねて取得する日数（保存済みの値と異なれば系列を取得し直す）
+HISTORY_STORE_OVERLAP_DAYS = _env_int("BBG_HISTORY_STORE_OVERLAP_DAYS", 7)
+
+# 過去データの価格調整（Terminalの既定設定に依存しないよう明示する）
+# normal: 通常配当、abnormal: 特別配当、split: 株式分割等の資本変更
+HISTORY_ADJUSTMENTS = tuple(
+    item.strip().lower()
+    for item in os.environ.get("BBG_HISTORY_ADJUSTMENT", "normal,abnormal,split").split(",")
+    if item.strip()
+)
+_UNKNOWN_ADJUSTMENTS = set(HISTORY_ADJUSTMENTS) - {"normal", "abnormal", "split"}
+if _UNKNOWN_ADJUSTMENTS:
+    raise ValueError(
+        f"環境変数 BBG_HISTORY_ADJUSTMENT は normal / abnormal / split のカンマ区切りで指定してください: "
+        f"{', '.join(sorted(_UNKNOWN_ADJUSTMENTS))}"
+    )
+
+# 日中足のローカルキャッシュ（終了済みの日のみ保存、BBG_INTRADAY_STORE=0で無効）
+INTRADAY_STORE_ENABLED = os.environ.get("BBG_INTRADAY_STORE", "1") != "0"
+INTRADAY_STORE_DIR = os.environ.get(
+    "BBG_INTRADAY_STORE_DIR", os.path.join("~", ".cache", "simple-mcp-server", "intraday")
+)
+
+# 日中ティックのキャプチャ（保存期間は秒、初期容量は件数）
+TICK_CAPTURE_DIR = os.environ.get(
+    "BBG_TICK_CAPTURE_DIR", os.path.join("~", ".cache", "simple-mcp-server", "ticks")
+)
+TICK_CAPTURE_MAX_AGE = _env_float("BBG_TICK_CAPTURE_MAX_AGE", 86400)
+TICK_CAPTURE_INITIAL_CAPACITY = _env_int("BBG_TICK_CAPTURE_INITIAL_CAPACITY", 65536)
+
+# 参照データのマイクロバッチ（時間窓はミリ秒、0で無効）
+REFDATA_BATCH_WINDOW_MS = _env_float("BBG_REFDATA_BATCH_WINDOW_MS", 0)
+REFDATA_BATCH_MAX_SECURITIES = _env_int("BBG_REFDATA_BATCH_MAX_SECURITIES", 200)
+
+# 大量証券リクエストの分割サイズ（1リクエストあたりの証券数、0で分割しない）
+REFDATA_CHUNK_SIZE = _env_int("BBG_REFDATA_CHUNK_SIZE", 200)
+HISTORICAL_CHUNK_SIZE = _env_int("BBG_HISTORICAL_CHUNK_SIZE", 50)
+
+# フィールド辞書のローカル索引（BBG_FIELD_INDEX=0で無効、最大経過時間は秒）
+FIELD_INDEX_ENABLED = os.environ.get("BBG_FIELD_INDEX", "1") != "0"
+FIELD_INDEX_PATH = os.environ.get(
+    "BBG_FIELD_INDEX_PATH", os.path.join("~", ".cache", "simple-mcp-server", "fields.json")
+)
+FIELD_INDEX_MAX_AGE = _env_float("BBG_FIELD_INDEX_MAX_AGE", 86400)
+
+# リアルタイム購読（//blp/mktdata）のラストバリューキャッシュ（BBG_MKTDATA=0で無効）
+MKTDATA_ENABLED = os.environ.get("BBG_MKTDATA", "1") != "0"
+# 購読するフィールド（get_reference_dataでこれらのフィールドは購読中の最新値を返す）
+MKTDATA_FIELDS = tuple(
+    field.strip() for field in os.environ.get("BBG_MKTDATA_FIELDS", "LAST_PRICE,BID,ASK").split(",") if field.strip()
+)
+# 起動時から購読する証券（カンマ区切り）
+MKTDATA_SECURITIES = tuple(
+    security.strip() for security in os.environ.get("BBG_MKTDATA_SECURITIES", "").split(",") if security.strip()
+)
+# 同じ証券のリアルタイムフィールドがこの回数要求されたら購読を開始
+MKTDATA_DEMAND_THRESHOLD = _env_int("BBG_MKTDATA_DEMAND_THRESHOLD", 3)
+MKTDATA_MAX_SECURITIES = _env_int("BBG_MKTDATA_MAX_SECURITIES", 100)
@@ -0,0 +1,192 @@
+"""
+ツール呼び出しごとの期限
+ツールの開始時に期限を設定し、その中で送信したBloombergリクエストは残り時間を超えて待たない
+
+期限はコンテキスト変数で保持するため、ツール内で作成したタスク（チャンクの並行取得等）にも引き継がれる。
+複数の呼び出しが共有する取得処理（singleflight.py）は、合流した呼び出しのうち最も遅い期限（SharedDeadline）で実行する。
+blpapiに依存しないため、サーバー起動時にblpapiを読み込まずに利用できる。
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Mapping, Optional, TypeVar, Union
+
+import config
+
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+class RequestError(Exception):
+    """Bloomberg側でリクエストが失敗した場合の例外"""
+
+
+class SessionLost(RequestError):
+    """応答を受信する前にBloombergセッションが切断・終了した場合の例外（再送できる）"""
+
+
+class DeadlineExceeded(RequestError):
+    """
+    期限までに応答が完了しなかった場合の例外
+
+    messages には期限までに受信したメッセージ、partial には呼び出し側が
+    それらをデコードした部分結果（{証券: 値}）を設定する。
+    """
+
+    def __init__(self, message: str = "期限までにBloombergの応答が完了しませんでした",
+                 messages: Optional[List[Any]] = None):
+        super().__init__(message)
+        self.messages = list(messages or [])
+        self.partial: Optional[Dict[str, Any]] = None
+
+
+# 期限で打ち切られた共有の取得処理が部分結果をまとめて返すのを待つ上限（秒）
+SETTLE_SECONDS = 1.0
+
+
+class SharedDeadline:
+    """
+    複数の呼び出しが共有する取得処理の期限（合流した呼び出しのうち最も遅い期限）
+
+    合流した呼び出しの期限で延びるのみで、呼び出しが離脱しても短くはならない
+    （実行中の待機が延びた期限を見落とさないようにするため）。
+    """
+
+    def __init__(self):
+        self._deadlines: List["_Deadline"] = []
+
+    def join(self, expires_at: "_Deadline") -> None:
+        """呼び出しの期限（current_deadline() の値）を加える"""
+        self._deadlines.append(expires_at)
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        """期限（time.monotonic() の値、Noneは無制限）"""
+        latest = None
+        for expires_at in map(_resolve, self._deadlines):
+            if expires_at is None:
+                return None
+            latest = expires_at if latest is None else max(latest, expires_at)
+        return latest
+
+    @property
+    def expired(self) -> bool:
+        expires_at = self.expires_at
+        return expires_at is not None and expires_at <= time.monotonic()
+
+
+# 期限（time.monotonic() の値、Noneは無制限、共有の取得処理では SharedDeadline）
+_Deadline = Union[float, SharedDeadline, None]
+_deadline: "contextvars.ContextVar[_Deadline]" = contextvars.ContextVar("bbg_deadline", default=None)
+
+
+def _resolve(expires_at: _Deadline) -> Optional[float]:
+    if isinstance(expires_at, SharedDeadline):
+        return expires_at.expires_at
+    return expires_at
+
+
+@contextlib.contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    このブロック内の期限を設定
+
+    Args:
+        seconds: 期限までの秒数（None または0以下の場合は無制限）
+    """
+    expires_at = None if seconds is None or seconds <= 0 else time.monotonic() + seconds
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextlib.contextmanager
+def shared_deadline(shared: SharedDeadline) -> Iterator[None]:
+    """このブロック内（で作成したタスク）の期限を共有の期限にする"""
+    token = _deadline.set(shared)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> _Deadline:
+    """このコンテキストの期限（SharedDeadline.join() に渡す）"""
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """期限までの残り秒数（期限がなければNone、過ぎていれば0）"""
+    expires_at = _resolve(_deadline.get())
+    if expires_at is None:
+        return None
+    return max(expires_at - time.monotonic(), 0.0)
+
+
+async def wait_within_deadline(future: "asyncio.Future") -> bool:
+    """
+    期限まで future の完了を待つ（期限切れ・キャンセル時も future はキャンセルしない）
+
+    共有の期限は待機中に延びることがあるため、期限が来た時点で残り時間を確かめ直す。
+
+    Returns:
+        期限までに完了したか
+    """
+    while not future.done():
+        timeout = remaining()
+        if timeout == 0:
+            return False
+        await asyncio.wait((future,), timeout=timeout)
+    return True
+
+
+class PartialResults:
+    """共有の取得処理がここまでに受信した結果（{証券: 値}）。先に期限切れになった呼び出しへ渡す"""
+
+    def __init__(self):
+        self._results: Dict[str, Any] = {}
+
+    def add(self, results: Mapping[str, Any]) -> None:
+        self._results.update(results)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self._results)
+
+
+_partial: "contextvars.ContextVar[Optional[PartialResults]]" = contextvars.ContextVar("bbg_partial", default=None)
+
+
+@contextlib.contextmanager
+def collect_partial(collector: Optional[PartialResults]) -> Iterator[None]:
+    """
+    このブロック内（で作成したタスク）で report_partial() した結果の記録先を設定
+
+    Args:
+        collector: 記録先（Noneの場合は記録しない）
+    """
+    token = _partial.set(collector)
+    try:
+        yield
+    finally:
+        _partial.reset(token)
+
+
+def report_partial(results: Mapping[str, Any]) -> None:
+    """受信した結果（{証券: 値}）を記録（collect_partial() のブロック外では何もしない）"""
+    collector = _partial.get()
+    if collector is not None:
+        collector.add(results)
+
+
+def with_deadline(func: F) -> F:
+    """ツール関数に期限を設定するデコレータ（秒数は config.TOOL_TIMEOUTS から関数名で引く）"""
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with deadline(config.TOOL_TIMEOUTS.get(func.__name__, config.REQUEST_TIMEOUT)):
+            return await func(*args, **kwargs)
+    return wrapper  # type: ignore[return-value]
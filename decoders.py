@@ -0,0 +1,312 @@
+"""
+Bloomberg 応答メッセージのデコーダ
+(リクエスト種別, フィールドリスト) ごとにデコード手順を一度だけ組み立て、各ツールで共有する
+
+blpapi.Name の作成には文字列のインターン処理が伴うため、メッセージ種別・要素名・
+フィールド名の Name はデコーダの作成時に1回だけ作る。デコード時は子要素を1回走査し、
+Name をキーとした表で出力先を引く（フィールドごとの hasElement / getElement を行わない）。
+値はフィールドごとに判定済みのデータ型の変換関数で取り出す（データ型が変わった場合は判定し直す、utils.FieldTypeCache）。
+"""
+
+import datetime
+import functools
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import blpapi
+
+from utils import FieldTypeCache, format_error_message
+
+
+@functools.lru_cache(maxsize=None)
+def name(value: str) -> blpapi.Name:
+    """要素名の blpapi.Name（同じ名前は1回だけ作成）"""
+    return blpapi.Name(value)
+
+
+_REFERENCE_DATA_RESPONSE = name("ReferenceDataResponse")
+_HISTORICAL_DATA_RESPONSE = name("HistoricalDataResponse")
+_FIELD_RESPONSE = name("fieldResponse")
+_INSTRUMENT_LIST_RESPONSE = name("InstrumentListResponse")
+_INTRADAY_BAR_RESPONSE = name("IntradayBarResponse")
+_INTRADAY_TICK_RESPONSE = name("IntradayTickResponse")
+
+_SECURITY_DATA = name("securityData")
+_SECURITY = name("security")
+_SECURITY_ERROR = name("securityError")
+_FIELD_DATA = name("fieldData")
+_DATE = name("date")
+_RESULTS = name("results")
+_ID = name("id")
+_FIELD_INFO = name("fieldInfo")
+_RESPONSE_ERROR = name("responseError")
+_BAR_DATA = name("barData")
+_BAR_TICK_DATA = name("barTickData")
+_TICK_DATA = name("tickData")
+
+# フィールド（バルクフィールドは (フィールド, 列名)）ごとのデータ型
+field_types = FieldTypeCache()
+
+
+def _string_values(element: blpapi.Element, names: Dict[blpapi.Name, str]) -> Dict[str, str]:
+    """子要素を1回走査し、names に含まれる要素を {出力名: 文字列} で返す（ない要素は空文字）"""
+    values = dict.fromkeys(names.values(), "")
+    for child in element.elements():
+        key = names.get(child.name())
+        if key is not None and not child.isNull():
+            values[key] = child.getValueAsString()
+    return values
+
+
+class ReferenceDataDecoder:
+    """ReferenceDataResponse を {証券: {フィールド: 値}} に変換"""
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        self._names = {name(field): field for field in self.fields}
+
+    def decode(self, msg: blpapi.Message) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        メッセージに含まれる証券ごとの値を返す
+
+        Yields:
+            (証券, {フィールド: 値})。証券エラーの場合は (証券, None)
+        """
+        if msg.messageType() != _REFERENCE_DATA_RESPONSE:
+            return
+        for security_data in msg.getElement(_SECURITY_DATA).values():
+            security = security_data.getElementAsString(_SECURITY)
+            if security_data.hasElement(_SECURITY_ERROR):
+                yield security, None
+                continue
+            values = dict.fromkeys(self.fields)
+            for element in security_data.getElement(_FIELD_DATA).elements():
+                field = self._names.get(element.name())
+                if field is not None and not element.isNull():
+                    values[field] = field_types.convert(field, element)
+            yield security, values
+
+
+class HistoricalDataDecoder:
+    """HistoricalDataResponse（1証券分）を行のリストに変換"""
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        self._columns = ("date",) + self.fields
+        self._names = {name(field): field for field in self.fields}
+
+    def decode(self, msg: blpapi.Message) -> Optional[Tuple[str, Optional[List[Dict[str, Any]]]]]:
+        """
+        Returns:
+            (証券, [行])。証券エラーの場合は (証券, None)、対象外のメッセージならNone
+        """
+        if msg.messageType() != _HISTORICAL_DATA_RESPONSE:
+            return None
+        security_data = msg.getElement(_SECURITY_DATA)
+        security = security_data.getElementAsString(_SECURITY)
+        if security_data.hasElement(_SECURITY_ERROR):
+            return security, None
+
+        rows = []
+        for field_data in security_data.getElement(_FIELD_DATA).values():
+            row = dict.fromkeys(self._columns)
+            for element in field_data.elements():
+                element_name = element.name()
+                if element_name == _DATE:
+                    row["date"] = element.getValueAsString()
+                    continue
+                field = self._names.get(element_name)
+                if field is not None and not element.isNull():
+                    row[field] = field_types.convert(field, element)
+            rows.append(row)
+        return security, rows
+
+
+class BulkDataDecoder:
+    """ReferenceDataResponse のバルクフィールドを {フィールド: [行]} に変換"""
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        self._names = {name(field): field for field in self.fields}
+        # 列名（Name → 文字列）は最初に出現したときに1回だけ変換する
+        self._columns: Dict[blpapi.Name, str] = {}
+
+    def _column(self, element_name: blpapi.Name) -> str:
+        column = self._columns.get(element_name)
+        if column is None:
+            column = self._columns[element_name] = str(element_name)
+        return column
+
+    def decode(self, msg: blpapi.Message) -> Iterator[Tuple[str, Optional[Dict[str, List[Dict[str, Any]]]]]]:
+        """
+        Yields:
+            (証券, {フィールド: [行]})。証券エラーの場合は (証券, None)、値のないフィールドは空リスト
+        """
+        if msg.messageType() != _REFERENCE_DATA_RESPONSE:
+            return
+        for security_data in msg.getElement(_SECURITY_DATA).values():
+            security = security_data.getElementAsString(_SECURITY)
+            if security_data.hasElement(_SECURITY_ERROR):
+                yield security, None
+                continue
+            values = {field: [] for field in self.fields}
+            for bulk_data in security_data.getElement(_FIELD_DATA).elements():
+                field = self._names.get(bulk_data.name())
+                if field is None:
+                    continue
+                rows = values[field]
+                for row_data in bulk_data.values():
+                    row = {}
+                    for element in row_data.elements():
+                        column = self._column(element.name())
+                        row[column] = None if element.isNull() else field_types.convert((field, column), element)
+                    rows.append(row)
+            yield security, values
+
+
+class FieldSearchDecoder:
+    """FieldSearchRequest の fieldResponse をフィールド情報のリストに変換"""
+
+    _FIELD_INFO_NAMES = {
+        name("mnemonic"): "mnemonic",
+        name("description"): "description",
+        name("datatype"): "data_type",
+        name("documentation"): "documentation",
+        name("categoryName"): "category_name",
+        name("property"): "property",
+    }
+
+    def decode(self, msg: blpapi.Message) -> Iterator[Dict[str, str]]:
+        if msg.messageType() != _FIELD_RESPONSE:
+            return
+        for field in msg.getElement(_FIELD_DATA).values():
+            # 基本情報（fieldレベルのid）
+            field_info = {
+                "field_id": field.getElementAsString(_ID) if field.hasElement(_ID) else ""
+            }
+            # fieldInfo要素から詳細情報を取得
+            if field.hasElement(_FIELD_INFO):
+                field_info.update(_string_values(field.getElement(_FIELD_INFO), self._FIELD_INFO_NAMES))
+            yield field_info
+
+
+class InstrumentListDecoder:
+    """instrumentListRequest の InstrumentListResponse を検索結果のリストに変換"""
+
+    _NAMES = {
+        name("security"): "security",
+        name("description"): "description",
+    }
+
+    def decode(self, msg: blpapi.Message) -> Iterator[Dict[str, str]]:
+        if msg.messageType() != _INSTRUMENT_LIST_RESPONSE:
+            return
+        for result in msg.getElement(_RESULTS).values():
+            yield _string_values(result, self._NAMES)
+
+
+def utc_naive(value: datetime.datetime) -> datetime.datetime:
+    """タイムゾーン付きの日時をUTCのnaiveな日時に変換（naiveならそのまま）"""
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class IntradayBarDecoder:
+    """IntradayBarResponse を足のタプル（time, open, high, low, close, volume, numEvents, value）のリストに変換"""
+
+    COLUMNS = ("time", "open", "high", "low", "close", "volume", "numEvents", "value")
+    _NAMES = {name(column): index for index, column in enumerate(COLUMNS)}
+
+    def decode(self, msg: blpapi.Message) -> List[tuple]:
+        """
+        Returns:
+            足のリスト（対象外のメッセージなら空）
+
+        Raises:
+            Exception: responseError を含む場合
+        """
+        if msg.messageType() != _INTRADAY_BAR_RESPONSE:
+            return []
+        if msg.hasElement(_RESPONSE_ERROR):
+            raise Exception(format_error_message(msg.getElement(_RESPONSE_ERROR)))
+
+        bars = []
+        for bar in msg.getElement(_BAR_DATA).getElement(_BAR_TICK_DATA).values():
+            row = [None, float("nan"), float("nan"), float("nan"), float("nan"), 0, 0, float("nan")]
+            for element in bar.elements():
+                index = self._NAMES.get(element.name())
+                if index is None or element.isNull():
+                    continue
+                if index == 0:
+                    row[0] = utc_naive(element.getValueAsDatetime())
+                elif index in (5, 6):
+                    row[index] = element.getValueAsInteger()
+                else:
+                    row[index] = element.getValueAsFloat()
+            bars.append(tuple(row))
+        return bars
+
+
+class IntradayTickDecoder:
+    """IntradayTickResponse を列（time, type, price, size）のリストに変換"""
+
+    _NAMES = {name("time"): 0, name("type"): 1, name("value"): 2, name("size"): 3}
+
+    def decode(self, msg: blpapi.Message) -> Tuple[List[datetime.datetime], List[str], List[float], List[int]]:
+        """
+        Returns:
+            (時刻, イベント種別, 価格, 数量) の列（対象外のメッセージなら空）
+
+        Raises:
+            Exception: responseError を含む場合
+        """
+        columns: Tuple[list, list, list, list] = ([], [], [], [])
+        if msg.messageType() != _INTRADAY_TICK_RESPONSE:
+            return columns
+        if msg.hasElement(_RESPONSE_ERROR):
+            raise Exception(format_error_message(msg.getElement(_RESPONSE_ERROR)))
+
+        times, types, prices, sizes = columns
+        for tick in msg.getElement(_TICK_DATA).getElement(_TICK_DATA).values():
+            row = [None, "", float("nan"), 0]
+            for element in tick.elements():
+                index = self._NAMES.get(element.name())
+                if index is None or element.isNull():
+                    continue
+                if index == 0:
+                    row[0] = utc_naive(element.getValueAsDatetime())
+                elif index == 1:
+                    row[1] = element.getValueAsString()
+                elif index == 2:
+                    row[2] = element.getValueAsFloat()
+                else:
+                    row[3] = element.getValueAsInteger()
+            times.append(row[0])
+            types.append(row[1])
+            prices.append(row[2])
+            sizes.append(row[3])
+        return columns
+
+
+@functools.lru_cache(maxsize=1024)
+def reference_data_decoder(fields: Tuple[str, ...]) -> ReferenceDataDecoder:
+    """フィールドリストごとの ReferenceDataDecoder（作成済みなら再利用）"""
+    return ReferenceDataDecoder(fields)
+
+
+@functools.lru_cache(maxsize=1024)
+def historical_data_decoder(fields: Tuple[str, ...]) -> HistoricalDataDecoder:
+    """フィールドリストごとの HistoricalDataDecoder（作成済みなら再利用）"""
+    return HistoricalDataDecoder(fields)
+
+
+@functools.lru_cache(maxsize=256)
+def bulk_data_decoder(fields: Tuple[str, ...]) -> BulkDataDecoder:
+    """バルクフィールドのリストごとの BulkDataDecoder（作成済みなら再利用）"""
+    return BulkDataDecoder(fields)
+
+
+field_search_decoder = FieldSearchDecoder()
+instrument_list_decoder = InstrumentListDecoder()
+intraday_bar_decoder = IntradayBarDecoder()
+intraday_tick_decoder = IntradayTickDecoder()
@@ -0,0 +1,268 @@
+"""
+Bloomberg API リクエストディスパッチャ
+CorrelationIdでイベントを振り分け、1つのセッション上で複数のリクエストを同時に処理する
+
+セッションはイベントハンドラモードで作成し、blpapiのコールバックスレッドから
+dispatcher.handle_event() が呼ばれる。待機側は wait_async() で応答をまとめて
+受け取るか、iter_messages() で PARTIAL_RESPONSE を到着順に受け取る。期限を過ぎたリクエストや
+呼び出し元がキャンセルしたリクエストは cancel() でBloomberg側でも取り消す。
+"""
+
+import asyncio
+import itertools
+import threading
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import blpapi
+
+from deadlines import DeadlineExceeded, RequestError, SessionLost, remaining, wait_within_deadline
+
+
+class PendingRequest:
+    """
+    送信済みリクエストの応答待ちハンドル
+
+    retain_messages=False の場合は受信したメッセージを保持せず、
+    iter_messages() の利用者へ渡すだけにする（大きな応答のメモリ使用量を抑える）。
+    ただし iter_messages() が読み出しを始める前に届いたメッセージは、それまで保持して引き渡す。
+    """
+
+    def __init__(self, correlation_id: blpapi.CorrelationId, retain_messages: bool = True):
+        self.correlation_id = correlation_id
+        self.messages: List[blpapi.Message] = []
+        self.error: Optional[str] = None
+        self.error_type = RequestError
+        self._retain = retain_messages
+        self._attached = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._done_callbacks: List[Callable[[], None]] = []
+        self._listeners: List[Callable[[Optional[blpapi.Message]], None]] = []
+
+    def add_message(self, message: blpapi.Message) -> None:
+        """PARTIAL_RESPONSE / RESPONSE のメッセージを追加"""
+        with self._lock:
+            if self._retain or not self._attached:
+                self.messages.append(message)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(message)
+
+    def finish(self, error: Optional[str] = None, error_type: type = RequestError) -> None:
+        """応答完了（またはエラー）を通知（待機者には error_type の例外を送出する）"""
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.error = error
+            self.error_type = error_type
+            self._done.set()
+            callbacks, self._done_callbacks = self._done_callbacks, []
+            listeners, self._listeners = self._listeners, []
+        for listener in listeners:
+            listener(None)
+        for callback in callbacks:
+            callback()
+
+    def add_done_callback(self, callback: Callable[[], None]) -> None:
+        """完了時に呼ばれるコールバックを登録（完了済みなら即座に呼ぶ）"""
+        with self._lock:
+            if not self._done.is_set():
+                self._done_callbacks.append(callback)
+                return
+        callback()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    async def wait_async(self) -> List[blpapi.Message]:
+        """
+        最終応答までイベントループをブロックせずに待機する
+
+        期限（deadlines.py）を過ぎると受信済みのメッセージを持つ DeadlineExceeded を送出する。
+
+        Returns:
+            受信したメッセージのリスト
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve():
+            if not future.done():
+                future.set_result(None)
+
+        self.add_done_callback(lambda: loop.call_soon_threadsafe(resolve))
+        if not await wait_within_deadline(future):
+            with self._lock:
+                messages = list(self.messages)
+            raise DeadlineExceeded(messages=messages)
+        return self._result()
+
+    async def iter_messages(self) -> AsyncIterator[blpapi.Message]:
+        """
+        受信したメッセージを到着順に返す（最終応答まで）
+
+        期限（deadlines.py）を過ぎると DeadlineExceeded を送出する。
+
+        Yields:
+            PARTIAL_RESPONSE / RESPONSE のメッセージ
+        """
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Optional[blpapi.Message]]" = asyncio.Queue()
+
+        def listener(message: Optional[blpapi.Message]) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+        with self._lock:
+            backlog = list(self.messages)
+            if not self._retain:
+                # 以降のメッセージはリスナーへ渡すだけにする
+                self.messages = []
+                self._attached = True
+            finished = self._done.is_set()
+            if not finished:
+                self._listeners.append(listener)
+
+        try:
+            for message in backlog:
+                yield message
+            while not finished:
+                try:
+                    message = await asyncio.wait_for(queue.get(), remaining())
+                except asyncio.TimeoutError:
+                    # 共有の期限は待機中に延びることがあるため確かめ直す
+                    if remaining() == 0:
+                        raise DeadlineExceeded() from None
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        if self.error is not None:
+            raise self.error_type(self.error)
+
+    def _result(self) -> List[blpapi.Message]:
+        if self.error is not None:
+            raise self.error_type(self.error)
+        return self.messages
+
+
+class RequestDispatcher:
+    """
+    セッションのイベントをCorrelationIdごとに待機者へ振り分ける
+
+    各リクエストには一意のCorrelationIdを付与するため、
+    同時に実行された複数のツール呼び出しが互いの応答を取り違えることはない。
+    handle_event をセッションのイベントハンドラとして渡して使用する。
+    購読のイベント（SUBSCRIPTION_DATA / SUBSCRIPTION_STATUS）は subscription_handler へ渡す。
+    """
+
+    def __init__(self, session: Optional[blpapi.Session] = None):
+        self.session = session
+        self.subscription_handler: Optional[Callable[[blpapi.Event], None]] = None
+        self._pending: Dict[int, PendingRequest] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def bind(self, session: blpapi.Session) -> None:
+        """リクエスト送信に使うセッションを設定"""
+        self.session = session
+
+    def stop(self) -> None:
+        """未完了のリクエストをすべて失敗させる"""
+        self.fail_all("Bloombergセッションが終了しました")
+
+    def handle_event(self, event: blpapi.Event, session: blpapi.Session) -> None:
+        """blpapiのイベントハンドラ（コールバックスレッドから呼ばれる）"""
+        self.dispatch(event)
+
+    def send(self, request: blpapi.Request, retain_messages: bool = True) -> PendingRequest:
+        """
+        CorrelationIdを付与してリクエストを送信
+
+        Args:
+            request: 送信するリクエスト
+            retain_messages: 受信メッセージをハンドルに保持するか
+
+        Returns:
+            応答待ちハンドル
+        """
+        correlation_id = blpapi.CorrelationId(next(self._ids))
+        pending = PendingRequest(correlation_id, retain_messages)
+        with self._lock:
+            self._pending[correlation_id.value()] = pending
+        try:
+            self.session.sendRequest(request, correlationId=correlation_id)
+        except Exception as e:
+            # 送信できないのはセッションが使えない場合（内容の誤りは応答で返る）なので再送の対象にする
+            with self._lock:
+                self._pending.pop(correlation_id.value(), None)
+            raise SessionLost(f"リクエストを送信できませんでした: {e}") from e
+        return pending
+
+    def cancel(self, pending: PendingRequest, reason: str = "リクエストをキャンセルしました") -> None:
+        """
+        未完了のリクエストをBloomberg側で取り消し、待機者に失敗を通知
+
+        完了済みのリクエストには何もしない。
+        """
+        with self._lock:
+            removed = self._pending.pop(pending.correlation_id.value(), None)
+        if removed is None:
+            return
+        try:
+            self.session.cancel(pending.correlation_id)
+        except Exception:
+            # セッション終了済み等：応答は既に届かないため待機者への通知のみ行う
+            pass
+        pending.finish(reason)
+
+    def dispatch(self, event: blpapi.Event) -> None:
+        """受信したイベントを対応する待機者へ振り分け"""
+        event_type = event.eventType()
+        if event_type in (blpapi.Event.SUBSCRIPTION_DATA, blpapi.Event.SUBSCRIPTION_STATUS):
+            handler = self.subscription_handler
+            if handler is not None:
+                handler(event)
+            return
+        if event_type not in (
+            blpapi.Event.PARTIAL_RESPONSE,
+            blpapi.Event.RESPONSE,
+            blpapi.Event.REQUEST_STATUS,
+        ):
+            return
+
+        for msg in event:
+            for correlation_id in msg.correlationIds():
+                key = correlation_id.value()
+                with self._lock:
+                    pending = self._pending.get(key)
+                    if pending is not None and event_type != blpapi.Event.PARTIAL_RESPONSE:
+                        del self._pending[key]
+                if pending is None:
+                    continue
+
+                if event_type == blpapi.Event.REQUEST_STATUS:
+                    # RequestFailure等：応答は来ないため即座に失敗扱い
+                    pending.finish(f"リクエスト失敗: {msg}")
+                    continue
+
+                pending.add_message(msg)
+                if event_type == blpapi.Event.RESPONSE:
+                    pending.finish()
+
+    def fail_all(self, reason: str) -> None:
+        """
+        未完了のリクエストをすべて SessionLost で失敗させる
+
+        接続断で応答が届かなくなったリクエストの待機者を解放し、再送できるようにする。
+        """
+        with self._lock:
+            pending_list = list(self._pending.values())
+            self._pending.clear()
+        for pending in pending_list:
+            pending.finish(reason, SessionLost)
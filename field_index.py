@@ -0,0 +1,231 @@
+"""
+Bloomberg フィールド辞書のローカル索引
+//blp/apiflds から取得したフィールド一覧をディスクに保存し、search_fields をローカルで検索する
+
+ニーモニック・説明・カテゴリ・ドキュメントをトークンに分割した転置索引を作り、
+完全一致・前方一致・類似語（difflib）の順に照合してスコアの高い順に返す。
+"""
+
+import array
+import bisect
+import difflib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# 属性ごとの重み（一致したトークンの重みの合計がスコアになる）
+_ATTRIBUTE_WEIGHTS = (
+    ("mnemonic", 4.0),
+    ("alias", 3.0),
+    ("description", 2.0),
+    ("category_name", 1.0),
+    ("documentation", 0.5),
+)
+
+# 照合方法ごとの係数
+_EXACT = 1.0
+_PREFIX = 0.6
+_FUZZY = 0.4
+
+# 前方一致で展開するトークン数の上限
+_MAX_PREFIX_EXPANSIONS = 200
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    検索用にトークンへ分割（小文字化、"PX_LAST" は px_last / px / last）
+
+    Args:
+        text: 対象文字列
+
+    Returns:
+        トークンのリスト（重複を含む場合がある）
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if "_" in token:
+            tokens.extend(part for part in token.split("_") if part)
+    return tokens
+
+
+class _Snapshot:
+    """構築済みの索引（作成後は変更しない）"""
+
+    def __init__(self, entries: List[Dict[str, str]], aliases: Dict[str, str]):
+        self.entries = entries
+        # 属性ごとの {トークン: フィールド番号の配列}
+        self.postings: List[Tuple[float, Dict[str, array.array]]] = []
+        vocabulary = set()
+        for attribute, weight in _ATTRIBUTE_WEIGHTS:
+            postings: Dict[str, array.array] = {}
+            for number, entry in enumerate(entries):
+                if attribute == "alias":
+                    text = aliases.get(entry.get("mnemonic", ""), "")
+                else:
+                    text = entry.get(attribute, "")
+                for token in set(tokenize(text)):
+                    postings.setdefault(token, array.array("I")).append(number)
+            self.postings.append((weight, postings))
+            vocabulary.update(postings)
+        self.vocabulary = sorted(vocabulary)
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """クエリのトークンを索引のトークンに展開（完全一致・前方一致、なければ類似語）"""
+        expansions = []
+        lo = bisect.bisect_left(self.vocabulary, token)
+        for candidate in self.vocabulary[lo:lo + _MAX_PREFIX_EXPANSIONS]:
+            if not candidate.startswith(token):
+                break
+            expansions.append((candidate, _EXACT if candidate == token else _PREFIX))
+        if expansions:
+            return expansions
+
+        # 類似語は先頭文字が同じトークンの中から探す
+        lo = bisect.bisect_left(self.vocabulary, token[0])
+        hi = bisect.bisect_left(self.vocabulary, chr(ord(token[0]) + 1))
+        return [
+            (candidate, _FUZZY)
+            for candidate in difflib.get_close_matches(token, self.vocabulary[lo:hi], n=3, cutoff=0.75)
+        ]
+
+    def search(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return []
+
+        totals: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+        for query_token in query_tokens:
+            # クエリのトークンごとに、各フィールドの最も高いスコアのみを数える
+            token_scores: Dict[int, float] = {}
+            for candidate, factor in self._expand(query_token):
+                for weight, postings in self.postings:
+                    numbers = postings.get(candidate)
+                    if numbers is None:
+                        continue
+                    score = weight * factor
+                    for number in numbers:
+                        if token_scores.get(number, 0.0) < score:
+                            token_scores[number] = score
+            for number, score in token_scores.items():
+                totals[number] = totals.get(number, 0.0) + score
+                matched[number] = matched.get(number, 0) + 1
+
+        # すべてのトークンに一致したフィールドを優先
+        ranked = sorted(
+            totals,
+            key=lambda number: (-matched[number], -totals[number], self.entries[number].get("mnemonic", "")),
+        )
+        return [dict(self.entries[number]) for number in ranked[:max_results]]
+
+
+class FieldIndex:
+    """
+    フィールド辞書のローカル索引
+
+    フィールド情報（search_fields の結果と同じ形式の辞書）をJSONファイルに保存し、
+    プロセス起動後の最初の検索時に読み込む。max_age 秒を過ぎた索引は再取得の対象になる
+    （再取得中や失敗時は古い索引のまま検索する）。
+    読み込みと索引の構築はファイル全体を処理するため、イベントループからは
+    load() をスレッドプールで実行してから他のメソッドを呼ぶ。
+    """
+
+    def __init__(self, path: str, max_age: float, aliases: Optional[Dict[str, str]] = None,
+                 retry_interval: float = 300):
+        self.path = os.path.expanduser(path)
+        self.max_age = max_age
+        self.aliases = dict(aliases or {})
+        self.retry_interval = retry_interval
+        self.built_at: Optional[float] = None
+        self._snapshot: Optional[_Snapshot] = None
+        self._loaded = False
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """保存済みの索引の読み込みを終えたか（ファイルがなかった場合も含む）"""
+        return self._loaded
+
+    def load(self) -> None:
+        """保存済みの索引を読み込んで構築する（読み込み済みなら何もしない、ブロックする）"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self._snapshot = _Snapshot(data["fields"], self.aliases)
+                self.built_at = data["built_at"]
+            except (OSError, ValueError, KeyError):
+                pass
+            self._loaded = True
+
+    @property
+    def ready(self) -> bool:
+        """検索できる索引があるか"""
+        self.load()
+        return self._snapshot is not None
+
+    def needs_refresh(self) -> bool:
+        """
+        再取得が必要か（索引がない、または古い場合）
+
+        直近の再取得開始から retry_interval 秒以内は False を返す。
+        """
+        self.load()
+        now = time.time()
+        if now - self._last_attempt < self.retry_interval:
+            return False
+        return self.built_at is None or now - self.built_at > self.max_age
+
+    def mark_refresh_started(self) -> None:
+        """再取得の開始を記録"""
+        self._last_attempt = time.time()
+
+    def replace(self, entries: Iterable[Dict[str, str]]) -> None:
+        """
+        フィールド一覧で索引を作り直し、ファイルへ保存
+
+        Args:
+            entries: フィールド情報のリスト
+        """
+        entries = list(entries)
+        snapshot = _Snapshot(entries, self.aliases)
+        built_at = time.time()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"built_at": built_at, "fields": entries}, f, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+        with self._lock:
+            self._snapshot = snapshot
+            self.built_at = built_at
+            self._loaded = True
+
+    def search(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        """
+        索引からフィールドを検索
+
+        Args:
+            query: 検索キーワード
+            max_results: 最大結果数
+
+        Returns:
+            フィールド情報のリスト（スコアの高い順）
+        """
+        self.load()
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+        return snapshot.search(query, max_results)
@@ -0,0 +1,238 @@
+"""
+Bloomberg 過去データ（BDH）のローカル時系列ストア
+(証券, フィールド, 周期) ごとに日付・値の列をnumpy形式で保存し、メモリマップで読み出す
+
+保存済みの期間は coverage として記録し、リクエスト期間のうち
+未保存の区間だけをBloombergから取得できるようにする。
+系列は最初の保存から max_age 秒で期限切れとなり、全期間を取得し直す
+（配当・分割による遡及調整を古い系列に継ぎ足さないため）。
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+DateRange = Tuple[datetime.date, datetime.date]
+
+_ONE_DAY = datetime.timedelta(days=1)
+
+
+def _merge_ranges(ranges: Sequence[DateRange]) -> List[DateRange]:
+    """重複・隣接する日付区間を統合"""
+    merged: List[DateRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + _ONE_DAY:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_ranges(start: datetime.date, end: datetime.date, covered: Sequence[DateRange]) -> List[DateRange]:
+    """
+    [start, end] のうち covered に含まれない区間を返す
+
+    Args:
+        start: 開始日
+        end: 終了日
+        covered: 保存済みの区間（統合済み）
+
+    Returns:
+        未保存の区間のリスト
+    """
+    gaps: List[DateRange] = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - _ONE_DAY))
+        cursor = max(cursor, covered_end + _ONE_DAY)
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class HistoricalStore:
+    """
+    過去データの列指向ディスクストア
+
+    1系列 = 1ディレクトリ（dates-N.npy / values-N.npy / meta.json）。
+    dates は datetime64[D]、values は整数のみの系列なら int64、それ以外は float64 で、
+    読み出しは np.load(mmap_mode="r") による。
+    更新時は世代番号 N を進めた新しいファイルを書き、meta.json の差し替えで切り替える
+    （メモリマップ中のファイルを上書きしないため）。
+    数値に変換できない系列（文字列フィールド等）は保存しない。
+    variant（価格調整の設定等）が異なる系列は別の系列として保存する。
+    """
+
+    def __init__(self, root: str, variant: str = "", max_age: float = 0):
+        self.root = os.path.expanduser(root)
+        self.variant = variant
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._meta_cache: Dict[Tuple[str, str, str], dict] = {}
+
+    def _series_dir(self, security: str, field: str, periodicity: str) -> str:
+        key = f"{security}|{field}|{periodicity}|{self.variant}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, periodicity.lower(), digest[:2], digest)
+
+    def _load_meta(self, security: str, field: str, periodicity: str) -> Optional[dict]:
+        """有効な meta.json（ない・期限切れ・無効化済みの場合はNone）"""
+        key = (security, field, periodicity)
+        meta = self._meta_cache.get(key)
+        if meta is None:
+            path = os.path.join(self._series_dir(security, field, periodicity), "meta.json")
+            try:
+                with open(path, encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._meta_cache[key] = meta
+        if meta.get("invalid") or (self.max_age > 0 and time.time() - meta.get("created", 0) > self.max_age):
+            return None
+        return meta
+
+    def _write_meta(self, security: str, field: str, periodicity: str, meta: dict) -> None:
+        meta_path = os.path.join(self._series_dir(security, field, periodicity), "meta.json")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        self._meta_cache[(security, field, periodicity)] = meta
+
+    def coverage(self, security: str, field: str, periodicity: str) -> List[DateRange]:
+        """保存済みの日付区間"""
+        meta = self._load_meta(security, field, periodicity)
+        if not meta:
+            return []
+        return [
+            (datetime.date.fromisoformat(start), datetime.date.fromisoformat(end))
+            for start, end in meta["covered"]
+        ]
+
+    def missing_ranges(self, security: str, field: str, periodicity: str,
+                       start: datetime.date, end: datetime.date) -> List[DateRange]:
+        """[start, end] のうち未保存の区間"""
+        return subtract_ranges(start, end, self.coverage(security, field, periodicity))
+
+    def read(self, security: str, field: str, periodicity: str,
+             start: datetime.date, end: datetime.date) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        [start, end] の系列を読み出す
+
+        Returns:
+            (日付配列 datetime64[D], 値配列 int64 または float64)
+        """
+        empty = np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.float64)
+        # 別スレッドの write が旧世代のファイルを削除する前に開く
+        with self._lock:
+            meta = self._load_meta(security, field, periodicity)
+            if not meta:
+                return empty
+            directory = self._series_dir(security, field, periodicity)
+            generation = meta["generation"]
+            try:
+                dates = np.load(os.path.join(directory, f"dates-{generation}.npy"), mmap_mode="r")
+                values = np.load(os.path.join(directory, f"values-{generation}.npy"), mmap_mode="r")
+            except (OSError, ValueError):
+                # 空配列はメモリマップできないため通常読み込み
+                try:
+                    dates = np.load(os.path.join(directory, f"dates-{generation}.npy"))
+                    values = np.load(os.path.join(directory, f"values-{generation}.npy"))
+                except OSError:
+                    return empty
+        lo = np.searchsorted(dates, np.datetime64(start, "D"), side="left")
+        hi = np.searchsorted(dates, np.datetime64(end, "D"), side="right")
+        return dates[lo:hi], values[lo:hi]
+
+    def write(self, security: str, field: str, periodicity: str,
+              start: datetime.date, end: datetime.date,
+              dates: Sequence[datetime.date], values: Sequence[object]) -> bool:
+        """
+        [start, end] の取得結果を保存し、その区間を保存済みとして記録
+
+        Args:
+            dates: 値がある日付のリスト
+            values: 各日付の値
+
+        Returns:
+            保存した場合True（数値以外を含む場合は保存しない）
+        """
+        # 整数フィールド（出来高等）は読み出し時にも整数で返すため int64 で保存する
+        if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+            new_values = np.asarray(values, dtype=np.int64)
+        else:
+            try:
+                new_values = np.asarray([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+            except (TypeError, ValueError):
+                return False
+        new_dates = np.asarray(dates, dtype="datetime64[D]")
+
+        with self._lock:
+            directory = self._series_dir(security, field, periodicity)
+            os.makedirs(directory, exist_ok=True)
+            old_meta = self._load_meta(security, field, periodicity)
+            old_dates, old_values = self.read(security, field, periodicity, datetime.date.min, datetime.date.max)
+
+            # 取得区間内の旧データは新データで置き換える
+            keep = (old_dates < np.datetime64(start, "D")) | (old_dates > np.datetime64(end, "D"))
+            merged_dates = np.concatenate([np.asarray(old_dates)[keep], new_dates])
+            if keep.any():
+                # 旧データと型が異なる場合は float64 になる
+                merged_values = np.concatenate([np.asarray(old_values)[keep], new_values])
+            else:
+                merged_values = new_values
+            order = np.argsort(merged_dates, kind="stable")
+
+            # 期限切れの系列は旧世代のファイルを消すため、ディスク上の世代番号から進める
+            disk_meta = self._meta_cache.get((security, field, periodicity))
+            old_generation = disk_meta["generation"] if disk_meta else None
+            generation = 0 if old_generation is None else old_generation + 1
+            covered = _merge_ranges(self.coverage(security, field, periodicity) + [(start, end)])
+            meta = {
+                "security": security,
+                "field": field,
+                "periodicity": periodicity,
+                "variant": self.variant,
+                "generation": generation,
+                "created": old_meta["created"] if old_meta else time.time(),
+                "covered": [[s.isoformat(), e.isoformat()] for s, e in covered],
+            }
+
+            np.save(os.path.join(directory, f"dates-{generation}.npy"), merged_dates[order])
+            np.save(os.path.join(directory, f"values-{generation}.npy"), merged_values[order])
+            self._write_meta(security, field, periodicity, meta)
+
+            # 旧世代のファイルを削除（他で参照中の場合は次回以降に残る）
+            if old_generation is not None:
+                for name in (f"dates-{old_generation}.npy", f"values-{old_generation}.npy"):
+                    try:
+                        os.remove(os.path.join(directory, name))
+                    except OSError:
+                        pass
+        return True
+
+    def invalidate(self, security: str, field: str, periodicity: str) -> None:
+        """
+        系列を無効化し、次回は全期間を取得し直す
+
+        再取得した値が保存済みの値と一致しない場合（配当・分割による遡及調整等）に使う。
+        ファイルは次の write で世代を進めた際に削除される。
+        """
+        with self._lock:
+            meta = self._load_meta(security, field, periodicity)
+            if meta is not None:
+                self._write_meta(security, field, periodicity, {**meta, "invalid": True})
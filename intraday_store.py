@@ -0,0 +1,121 @@
+"""
+Bloomberg 日中足（IntradayBar）のローカルキャッシュ
+(証券, イベント種別, 足の間隔, 足の区切りの位置) ごとに1日1ファイルのnumpy構造化配列として保存し、メモリマップで読み出す
+
+足はリクエストの開始日時から interval 分ごとに区切られるため、同じ間隔でも開始日時によって
+足の時刻が異なる。日ごとの区間は開始日時を起点とする区切りに揃え、区切りの位置（その日の
+0時からのずれ）ごとに保存する。
+
+保存するのは終了済みの日（UTC）のみ。当日分は確定していないため毎回取得する。
+"""
+
+import datetime
+import hashlib
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+# 1本の足（列名はBloombergの要素名に合わせる）
+BAR_DTYPE = np.dtype([
+    ("time", "datetime64[s]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "i8"),
+    ("numEvents", "i8"),
+    ("value", "f8"),
+])
+
+_ONE_DAY = datetime.timedelta(days=1)
+
+
+def day_shards(start: datetime.datetime, end: datetime.datetime,
+               interval: Optional[int] = None) -> List[Tuple[datetime.date, datetime.datetime, datetime.datetime]]:
+    """
+    [start, end) を日（UTC）ごとの区間に分割
+
+    Args:
+        interval: 足の間隔（分）。指定した場合、2日目以降の区間の開始を start を起点とする
+            足の区切りに揃える（日をまたぐ足は開始した日の区間に含める）
+
+    Returns:
+        (日付, 区間の開始, 区間の終了) のリスト
+    """
+    step = None if interval is None else datetime.timedelta(minutes=interval)
+    shards = []
+    day = start.date()
+    while True:
+        day_start = datetime.datetime.combine(day, datetime.time())
+        day_end = day_start + _ONE_DAY
+        if step is not None:
+            day_start += (start - day_start) % step
+        shard_start, shard_end = max(start, day_start), min(end, day_end)
+        if shard_start >= end:
+            break
+        if shard_start < shard_end:
+            shards.append((day, shard_start, shard_end))
+        day += _ONE_DAY
+    return shards
+
+
+def grid_offset(day: datetime.date, start: datetime.datetime, interval: int) -> int:
+    """start を起点とする足の区切りの、その日の0時からのずれ（秒）"""
+    day_start = datetime.datetime.combine(day, datetime.time())
+    return int(((start - day_start) % datetime.timedelta(minutes=interval)).total_seconds())
+
+
+def bars_to_array(bars: List[tuple]) -> np.ndarray:
+    """デコードした足（BAR_DTYPEの列順のタプル）を構造化配列に変換"""
+    return np.array(bars, dtype=BAR_DTYPE)
+
+
+class IntradayBarStore:
+    """
+    日中足の日別ディスクキャッシュ
+
+    1日分 = 1ファイル（YYYYMMDD.npy）。足がない日（休日等）も空配列として保存し、
+    次回以降は問い合わせない。
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.expanduser(root)
+
+    def _series_dir(self, security: str, event_type: str, interval: int, offset: int) -> str:
+        digest = hashlib.sha1(security.encode("utf-8")).hexdigest()
+        grid = f"{interval}m" if offset == 0 else f"{interval}m+{offset}s"
+        return os.path.join(self.root, grid, event_type.lower(), digest[:2], digest)
+
+    def _path(self, security: str, event_type: str, interval: int, day: datetime.date, offset: int) -> str:
+        return os.path.join(self._series_dir(security, event_type, interval, offset), day.strftime("%Y%m%d") + ".npy")
+
+    def read(self, security: str, event_type: str, interval: int, day: datetime.date,
+             offset: int = 0) -> Optional[np.ndarray]:
+        """
+        保存済みの1日分の足（未保存ならNone）
+
+        Args:
+            offset: 足の区切りの、その日の0時からのずれ（秒、grid_offset()）
+        """
+        path = self._path(security, event_type, interval, day, offset)
+        try:
+            return np.load(path, mmap_mode="r")
+        except OSError:
+            return None
+        except ValueError:
+            # 空配列はメモリマップできないため通常読み込み
+            try:
+                return np.load(path)
+            except (OSError, ValueError):
+                return None
+
+    def write(self, security: str, event_type: str, interval: int, day: datetime.date, bars: np.ndarray,
+              offset: int = 0) -> None:
+        """1日分の足を保存（offset は read() と同じ）"""
+        path = self._path(security, event_type, interval, day, offset)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, np.asarray(bars, dtype=BAR_DTYPE))
+        os.replace(path + ".tmp", path)
@@ -0,0 +1,47 @@
+"""
+重いモジュールの遅延読み込み
+サーバー起動（MCPの initialize 応答）までに blpapi / numpy 等を読み込まないようにする
+
+importlib.util.LazyLoader は Python 3.12 より前ではスレッドセーフでない（読み込み中の
+モジュールを別スレッドが参照できてしまう）ため、属性の参照時に通常の import で読み込む
+代理モジュールを使う。読み込みは import の仕組みがモジュールごとにロックするため、
+接続を開始するスレッドとイベントループから同時に参照してもよい。
+"""
+
+import importlib
+import importlib.util
+import sys
+import types
+from typing import Any
+
+
+class _LazyModule(types.ModuleType):
+    """属性の参照時に実際のモジュールを読み込み、その属性を返す代理モジュール"""
+
+    def __getattr__(self, attr: str) -> Any:
+        # 代理モジュール自身にない属性のみここに来る（読み込み済みなら sys.modules から引くだけ）
+        return getattr(importlib.import_module(self.__name__), attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    最初の属性参照時に読み込まれるモジュールを返す
+
+    読み込み済みの場合はそのモジュールを返す。モジュールが見つからない場合は
+    通常の import と同様に ModuleNotFoundError を送出する。
+
+    Args:
+        name: モジュール名
+
+    Returns:
+        モジュール（未読み込みの場合は遅延読み込みの代理モジュール）
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return _LazyModule(name)
@@ -4,51 +4,86 @@ Bloomberg MCP Server (HTTP/SSE版)
 ホスト・ポート指定でHTTPサーバーとして起動する版
 """
 
-import blpapi
+from __future__ import annotations
+
+import asyncio
 import datetime
-import pandas as pd
-from typing import List, Dict, Any, Optional, Union
-from fastmcp import FastMCP
+import functools
+import json
+import sys
+import threading
+import time
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional, Tuple, Union
+from fastmcp import Context, FastMCP
+
+import config
+from backend import install_backend
+from batching import ReferenceDataBatcher
+from cache import ReferenceDataCache, SecuritySearchCache, normalize_query
+from chunking import ChunkError, gather_chunks, pipeline_chunks, timed_out_outcome
+from deadlines import DeadlineExceeded, SessionLost, collect_partial, deadline, wait_within_deadline, with_deadline
+from lazy import lazy_import
+from singleflight import SingleFlight, fingerprint
+
+# blpapi・numpyと、それらに依存するモジュールは最初のツール呼び出しまで読み込まない
+# （stdioで起動されるたびに initialize 応答までの時間を短くするため）
+install_backend()
+blpapi = lazy_import("blpapi")
+np = lazy_import("numpy")
+decoders = lazy_import("decoders")
+session_pool = lazy_import("session_pool")
+utils = lazy_import("utils")
 
 # MCPサーバーのインスタンスを作成
 mcp = FastMCP("Bloomberg Market Data Server")
 
 
 class BloombergAPI:
-    """Bloomberg API接続管理クラス"""
+    """
+    Bloomberg API接続管理クラス
+    
+    config.CAPTURE_PATH を指定すると、送信したリクエストと受信したイベントをそのファイルへ
+    記録する（capture.py、BBG_BACKEND=replay で再生できる）。
+    """
     
     def __init__(self):
-        self.session = None
-        self.refdata_service = None
-        self.apiflds_service = None
-        self.instruments_service = None
+        self.pool = None
+        self.recorder = None
+    
+    @property
+    def session(self):
+        """代表セッション（未接続の場合はNone）"""
+        if self.pool is None or self.pool.primary is None:
+            return None
+        return self.pool.primary.session
     
     def connect(self):
         """Bloomberg APIに接続"""
         try:
-            # セッションオプションを設定
-            session_options = blpapi.SessionOptions()
-            session_options.setServerHost("localhost")
-            session_options.setServerPort(8194)
-            
-            # セッションを作成・開始
-            self.session = blpapi.Session(session_options)
-            if not self.session.start():
-                raise Exception("Failed to start Bloomberg session")
+            if config.CAPTURE_PATH and self.recorder is None:
+                from capture import CaptureWriter
+                self.recorder = CaptureWriter(config.CAPTURE_PATH)
             
-            # サービスを開く
-            if not self.session.openService("//blp/refdata"):
-                raise Exception("Failed to open refdata service")
+            # セッションプールを作成・開始（各セッションでrefdata/apiflds/instrumentsを開く）
+            pool = session_pool.SessionPool(
+                size=config.SESSION_POOL_SIZE,
+                host=config.BBG_HOST,
+                port=config.BBG_PORT,
+                max_in_flight=config.MAX_IN_FLIGHT_PER_SESSION,
+                service_names=config.DEFAULT_SERVICES,
+                start_timeout=config.SESSION_START_TIMEOUT,
+                backoff_base=config.RECONNECT_BACKOFF_BASE,
+                backoff_max=config.RECONNECT_BACKOFF_MAX,
+                recorder=self.recorder,
+            )
+            try:
+                pool.start()
+            except Exception:
+                pool.stop()
+                raise
             
-            if not self.session.openService("//blp/apiflds"):
-                raise Exception("Failed to open apiflds service") 
-                
-            if not self.session.openService("//blp/instruments"):
-                raise Exception("Failed to open instruments service")
-                
-            self.refdata_service = self.session.getService("//blp/refdata")
-            self.apiflds_service = self.session.getService("//blp/apiflds")
-            self.instruments_service = self.session.getService("//blp/instruments")
+            # サービスの準備が整ってから公開（同時に呼ばれたツールが未完成のセッションを使わないように）
+            self.pool = pool
             
             return True
             
@@ -57,26 +92,291 @@ class BloombergAPI:
     
     def disconnect(self):
         """Bloomberg APIから切断"""
-        if self.session:
-            self.session.stop()
-            self.session = None
+        if self.pool:
+            self.pool.stop()
+            self.pool = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+    
+    def _send(self, bbg_session: session_pool.BloombergSession, service_name: str, operation: str,
+              populate: Callable[[blpapi.Request], None], retain_messages: bool = True):
+        """リクエストを作成して送信し、応答待ちハンドルを返す（記録中はリクエストを記録）"""
+        request = bbg_session.create_request(service_name, operation)
+        populate(request)
+        sent = time.monotonic()
+        pending = bbg_session.dispatcher.send(request, retain_messages)
+        if self.recorder is not None:
+            self.recorder.record_request(bbg_session.index, pending.correlation_id, service_name,
+                                         operation, request, sent)
+        return pending
+    
+    async def _acquire_async(self) -> session_pool.BloombergSession:
+        """セッションを借りる（期限までに空かなければ DeadlineExceeded）"""
+        acquiring = asyncio.ensure_future(self.pool.acquire_async())
+        try:
+            acquired = await wait_within_deadline(acquiring)
+        except asyncio.CancelledError:
+            if acquiring.done() and not acquiring.cancelled() and acquiring.exception() is None:
+                # 借りた直後にキャンセルされた
+                self.pool.release(acquiring.result())
+            else:
+                acquiring.cancel()
+            raise
+        if not acquired:
+            acquiring.cancel()
+            if self.pool.primary is None:
+                raise DeadlineExceeded("期限までにBloombergへ再接続できませんでした")
+            raise DeadlineExceeded("期限までにBloombergセッションが空きませんでした")
+        return acquiring.result()
+    
+    async def send_request_async(self, service_name: str, operation: str,
+                                 populate: Callable[[blpapi.Request], None]) -> List[blpapi.Message]:
+        """
+        最も負荷の低いセッションでリクエストを送信し、イベントループをブロックせずに応答を待つ
+        
+        ツールの期限（deadlines.py）を過ぎた場合や呼び出し元がキャンセルされた場合は
+        Bloomberg側でもリクエストを取り消す。期限切れの場合は受信済みのメッセージを持つ
+        DeadlineExceeded を送出する。
+        接続断で応答が得られなかった場合は、別のセッション（または再接続したセッション）で
+        config.REPLAY_ATTEMPTS 回まで送り直す（送信するのは参照系のリクエストのみで冪等）。
+        
+        Args:
+            service_name: サービス名（例: "//blp/refdata"）
+            operation: リクエスト種別（例: "ReferenceDataRequest"）
+            populate: 作成したリクエストに値を設定する関数
+        
+        Returns:
+            このリクエストに対応するメッセージのリスト
+        """
+        attempt = 0
+        while True:
+            bbg_session = await self._acquire_async()
+            try:
+                await bbg_session.open_service_async(service_name)
+                pending = self._send(bbg_session, service_name, operation, populate)
+                try:
+                    return await pending.wait_async()
+                except (DeadlineExceeded, asyncio.CancelledError):
+                    bbg_session.dispatcher.cancel(pending)
+                    raise
+            except SessionLost:
+                attempt += 1
+                if attempt > config.REPLAY_ATTEMPTS:
+                    raise
+            finally:
+                self.pool.release(bbg_session)
+            # 切断の通知が届いて接続先が切り替わるのを待ってから送り直す
+            await asyncio.sleep(self.pool.backoff(attempt))
+    
+    async def stream_request_async(self, service_name: str, operation: str,
+                                   populate: Callable[[blpapi.Request], None]) -> AsyncIterator[blpapi.Message]:
+        """
+        リクエストを送信し、応答メッセージを到着順に返す（メッセージは保持しない）
+        
+        期限切れ・キャンセル・途中での読み出し終了の場合はBloomberg側でもリクエストを取り消す。
+        接続断の場合は、まだメッセージを1つも返していなければ send_request_async と同様に送り直す。
+        
+        Args:
+            service_name: サービス名（例: "//blp/refdata"）
+            operation: リクエスト種別（例: "HistoricalDataRequest"）
+            populate: 作成したリクエストに値を設定する関数
+        
+        Yields:
+            このリクエストに対応するメッセージ
+        """
+        attempt = 0
+        while True:
+            yielded = False
+            bbg_session = await self._acquire_async()
+            try:
+                await bbg_session.open_service_async(service_name)
+                pending = self._send(bbg_session, service_name, operation, populate, retain_messages=False)
+                try:
+                    async for message in pending.iter_messages():
+                        yielded = True
+                        yield message
+                    return
+                finally:
+                    if not pending.done:
+                        bbg_session.dispatcher.cancel(pending)
+            except SessionLost:
+                attempt += 1
+                if yielded or attempt > config.REPLAY_ATTEMPTS:
+                    raise
+            finally:
+                self.pool.release(bbg_session)
+            await asyncio.sleep(self.pool.backoff(attempt))
 
 
 # グローバルAPI接続インスタンス
 bbg_api = BloombergAPI()
+_connect_lock = threading.Lock()
+
+# 参照データキャッシュ（証券・フィールド・オーバーライド単位）
+refdata_cache = ReferenceDataCache(
+    max_entries=config.REFDATA_CACHE_MAX_ENTRIES,
+    default_ttl=config.REFDATA_CACHE_TTL,
+    field_ttl=config.REFDATA_FIELD_TTL,
+)
+
+# バルクデータのキャッシュ（フィールドごとの有効期限）
+bulk_cache = ReferenceDataCache(
+    max_entries=config.BULK_CACHE_MAX_ENTRIES,
+    default_ttl=config.BULK_CACHE_TTL,
+    field_ttl=config.BULK_FIELD_TTL,
+)
+
+# 実行中の同一リクエストの共有（single-flight）
+inflight = SingleFlight()
+
+# 証券検索のキャッシュ（検索語の前方一致で絞り込み）
+security_search_cache = SecuritySearchCache(
+    max_entries=config.SECURITY_SEARCH_CACHE_MAX_ENTRIES,
+    ttl=config.SECURITY_SEARCH_CACHE_TTL,
+)
+
+# ティックのリソースで1回に返す最大件数
+MAX_TICK_PAGE = 10000
+
+
+# ローカルストア・索引はnumpy等を使うため、最初の利用時に作成する
+@functools.lru_cache(maxsize=None)
+def get_historical_store():
+    """過去データのローカルストア（日次データを列指向で保存、無効ならNone）"""
+    if not config.HISTORY_STORE_ENABLED:
+        return None
+    from historical_store import HistoricalStore
+    # 価格調整の設定が異なる系列は継ぎ足さない
+    variant = "adjustment=" + ",".join(sorted(config.HISTORY_ADJUSTMENTS))
+    return HistoricalStore(config.HISTORY_STORE_DIR, variant, config.HISTORY_STORE_MAX_AGE)
+
+
+@functools.lru_cache(maxsize=None)
+def get_intraday_store():
+    """日中足のローカルキャッシュ（終了済みの日を1日1ファイルで保存、無効ならNone）"""
+    if not config.INTRADAY_STORE_ENABLED:
+        return None
+    from intraday_store import IntradayBarStore
+    return IntradayBarStore(config.INTRADAY_STORE_DIR)
+
+
+@functools.lru_cache(maxsize=None)
+def get_tick_store():
+    """日中ティックのキャプチャ（列ごとのメモリマップ配列）"""
+    from tick_capture import TickCaptureStore
+    return TickCaptureStore(
+        config.TICK_CAPTURE_DIR,
+        max_age=config.TICK_CAPTURE_MAX_AGE,
+        initial_capacity=config.TICK_CAPTURE_INITIAL_CAPACITY,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_field_index():
+    """フィールド辞書のローカル索引（よく使うフィールドは日本語の説明でも検索できる、無効ならNone）"""
+    if not config.FIELD_INDEX_ENABLED:
+        return None
+    from field_index import FieldIndex
+    return FieldIndex(
+        config.FIELD_INDEX_PATH,
+        max_age=config.FIELD_INDEX_MAX_AGE,
+        aliases=utils.get_common_fields(),
+    )
+
+
+_field_index_refresh: Optional[asyncio.Task] = None
+
+# リアルタイム購読のラストバリューキャッシュ（LAST_PRICE/BID/ASK等をリクエストせずに返す）
+# 接続時に作成する
+market_data = None
 
 
 def ensure_connection():
-    """API接続を確認し、必要に応じて接続"""
-    if bbg_api.session is None:
-        bbg_api.connect()
+    """API接続を確認し、必要に応じて接続（切断されたセッションはプールが再接続する）"""
+    if bbg_api.pool is None:
+        with _connect_lock:
+            if bbg_api.pool is None:
+                bbg_api.connect()
+                bbg_api.pool.restart_listeners.append(_reattach_market_data)
+                _attach_market_data()
+
+
+def _attach_market_data():
+    """リアルタイム購読を代表セッションに設定（初回は購読マネージャを作成）"""
+    global market_data
+    if not config.MKTDATA_ENABLED:
+        return
+    if market_data is None:
+        from subscriptions import MarketDataSubscriptions
+        market_data = MarketDataSubscriptions(
+            fields=config.MKTDATA_FIELDS,
+            max_securities=config.MKTDATA_MAX_SECURITIES,
+            demand_threshold=config.MKTDATA_DEMAND_THRESHOLD,
+            securities=config.MKTDATA_SECURITIES,
+        )
+    market_data.attach(bbg_api.pool.primary)
+
+
+def _reattach_market_data(bbg_session):
+    """再接続したセッションで購読し直す（購読に使っていたセッションが再接続した、または正常でない場合）"""
+    if market_data is None:
+        return
+    current = market_data.session
+    if current is None or current is bbg_session or not current.healthy:
+        market_data.attach(bbg_session)
+
+
+def prewarm_connection():
+    """バックグラウンドで接続を開始（接続は維持し、最初のツール呼び出しを待たせない）"""
+    def run():
+        try:
+            ensure_connection()
+            print("Bloomberg API接続成功", file=sys.stderr)
+        except Exception as e:
+            # 最初のツール呼び出し時に再接続を試みる
+            print(f"警告: Bloomberg API接続失敗 - {e}", file=sys.stderr)
+            print("Bloomberg Terminalが起動していることを確認してください", file=sys.stderr)
+    
+    threading.Thread(target=run, name="bloomberg-prewarm", daemon=True).start()
+
+
+async def ensure_connection_async():
+    """API接続を確認し、必要に応じて接続（接続処理はスレッドで実行）"""
+    if bbg_api.pool is None:
+        await asyncio.get_running_loop().run_in_executor(None, ensure_connection)
+
+
+async def _search_securities(query: str, max_results: int) -> List[Dict[str, Any]]:
+    """instrumentListRequestを送信し、検索結果のリストを返す"""
+    await ensure_connection_async()
+    
+    # InstrumentListRequestの内容（正しいサービスを使用）
+    def build_request(request):
+        request.set("query", query)
+        request.set("maxResults", max_results)
+    
+    # リクエストを送信（負荷の低いセッションで送信し、自分宛の応答のみ受信）
+    messages = await bbg_api.send_request_async("//blp/instruments", "instrumentListRequest", build_request)
+    
+    results = []
+    
+    for msg in messages:
+        results.extend(decoders.instrument_list_decoder.decode(msg))
+    
+    security_search_cache.store(query, max_results, results)
+    return results
 
 
 @mcp.tool
-def search_securities(query: str, max_results: int = 20) -> List[Dict[str, Any]]:
+@with_deadline
+async def search_securities(query: str, max_results: int = 20) -> List[Dict[str, Any]]:
     """
     証券をキーワードで検索します。会社名、ティッカー等から候補を見つけます。
     
+    過去の検索結果はキャッシュされ、同じ検索語や、キャッシュ済みの検索語を
+    詳しくした検索語（例: "Appl" → "Apple Inc"）はキャッシュから絞り込んで返します。
+    
     Args:
         query: 検索キーワード（会社名、ティッカー等）
         max_results: 最大結果数（デフォルト: 20）
@@ -85,48 +385,101 @@ def search_securities(query: str, max_results: int = 20) -> List[Dict[str, Any]]
         検索結果のリスト
     """
     try:
-        ensure_connection()
+        cached = security_search_cache.lookup(query, max_results)
+        if cached is not None:
+            return cached
         
-        # InstrumentListRequestを作成（正しいサービスを使用）
-        request = bbg_api.instruments_service.createRequest("instrumentListRequest")
-        request.set("query", query)
-        request.set("maxResults", max_results)
-        
-        # リクエストを送信
-        bbg_api.session.sendRequest(request)
-        
-        results = []
-        done = False
-        
-        while not done:
-            event = bbg_api.session.nextEvent(500)
-            
-            for msg in event:
-                if msg.messageType() == blpapi.Name("InstrumentListResponse"):
-                    results_array = msg.getElement("results")
-                    
-                    for i in range(results_array.numValues()):
-                        result = results_array.getValue(i)
-                        security_info = {
-                            "security": result.getElementAsString("security"),
-                            "description": result.getElementAsString("description") if result.hasElement("description") else ""
-                        }
-                        results.append(security_info)
-                
-                if event.eventType() == blpapi.Event.RESPONSE:
-                    done = True
-        
-        return results
+        # 同じ検索が実行中なら結果を共有
+        key = fingerprint("search_securities", normalize_query(query), max_results)
+        return await inflight.do(key, lambda: _search_securities(query, max_results))
         
     except Exception as e:
         raise Exception(f"証券検索エラー: {str(e)}")
 
 
+async def _search_fields(field_query: str, max_results: int) -> List[Dict[str, Any]]:
+    """FieldSearchRequestを送信し、フィールド情報のリストを返す"""
+    await ensure_connection_async()
+    
+    # FieldSearchRequestの内容
+    def build_request(request):
+        request.set("searchSpec", field_query)
+        
+        # 静的フィールドのみを検索
+        include_element = request.getElement("include")
+        include_element.setElement("fieldType", "Static")
+    
+    # リクエストを送信（負荷の低いセッションで送信し、自分宛の応答のみ受信）
+    messages = await bbg_api.send_request_async("//blp/apiflds", "FieldSearchRequest", build_request)
+    
+    results = []
+    
+    for msg in messages:
+        for field_info in decoders.field_search_decoder.decode(msg):
+            results.append(field_info)
+            if len(results) >= max_results:
+                break
+    
+    return results[:max_results]
+
+
+async def _refresh_field_index() -> None:
+    """FieldListRequest / FieldInfoRequest でフィールド一覧を取得し、ローカル索引を作り直す"""
+    await ensure_connection_async()
+    
+    # 静的フィールドの一覧（search_fieldsの検索対象と同じ）
+    def build_list_request(request):
+        request.set("fieldType", "Static")
+        request.set("returnFieldDocumentation", True)
+    
+    # よく使うフィールドは種別にかかわらず含める
+    def build_info_request(request):
+        for field in utils.get_common_fields():
+            request.append("id", field)
+        request.set("returnFieldDocumentation", True)
+    
+    list_messages, info_messages = await asyncio.gather(
+        bbg_api.send_request_async("//blp/apiflds", "FieldListRequest", build_list_request),
+        bbg_api.send_request_async("//blp/apiflds", "FieldInfoRequest", build_info_request),
+    )
+    
+    entries = {}
+    for msg in list_messages + info_messages:
+        for field_info in decoders.field_search_decoder.decode(msg):
+            # fieldInfoのない要素（fieldError等）は含めない
+            if field_info.get("mnemonic"):
+                entries.setdefault(field_info["field_id"], field_info)
+    
+    if entries:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, get_field_index().replace, list(entries.values()))
+
+
+def _schedule_field_index_refresh() -> None:
+    """索引がない・古い場合にバックグラウンドで再取得を開始"""
+    global _field_index_refresh
+    if _field_index_refresh is not None and not _field_index_refresh.done():
+        return
+    field_index = get_field_index()
+    if not field_index.needs_refresh():
+        return
+    field_index.mark_refresh_started()
+    # 呼び出し元のツールの期限は引き継がない
+    with deadline(None):
+        _field_index_refresh = asyncio.ensure_future(_refresh_field_index())
+    # 失敗しても次回の再取得まで古い索引（またはライブ検索）を使う
+    _field_index_refresh.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+
 @mcp.tool
-def search_fields(field_query: str, max_results: int = 50) -> List[Dict[str, Any]]:
+@with_deadline
+async def search_fields(field_query: str, max_results: int = 50) -> List[Dict[str, Any]]:
     """
     Bloomberg APIのフィールドを検索します。
     
+    フィールド辞書のローカル索引がある場合はBloombergへ問い合わせずに検索します
+    （索引がまだない場合はBloombergで検索し、索引をバックグラウンドで作成します）。
+    
     Args:
         field_query: フィールド検索キーワード（例: "price", "volume", "market cap"）
         max_results: 最大結果数（デフォルト: 50）
@@ -135,88 +488,217 @@ def search_fields(field_query: str, max_results: int = 50) -> List[Dict[str, Any
         フィールド情報のリスト
     """
     try:
-        ensure_connection()
-        
-        # FieldSearchRequestを作成
-        request = bbg_api.apiflds_service.createRequest("FieldSearchRequest")
-        request.set("searchSpec", field_query)
-        
-        # 静的フィールドのみを検索
-        include_element = request.getElement("include")
-        include_element.setElement("fieldType", "Static")
-        
-        # リクエストを送信
-        bbg_api.session.sendRequest(request)
-        
-        results = []
-        done = False
+        field_index = get_field_index()
+        if field_index is not None:
+            if not field_index.loaded:
+                # 保存済みの索引の読み込み・構築中も他のツールを止めない
+                await asyncio.get_running_loop().run_in_executor(None, field_index.load)
+            _schedule_field_index_refresh()
+            if field_index.ready:
+                return field_index.search(field_query, max_results)
         
-        while not done:
-            event = bbg_api.session.nextEvent(500)
-            
-            for msg in event:
-                if msg.messageType() == blpapi.Name("fieldResponse"):
-                    field_data = msg.getElement("fieldData")
-                    
-                    for i in range(field_data.numValues()):
-                        field = field_data.getValue(i)
-                        
-                        # 基本情報（fieldレベルのid）
-                        field_info = {
-                            "field_id": field.getElementAsString("id") if field.hasElement("id") else ""
-                        }
-                        
-                        # fieldInfo要素から詳細情報を取得
-                        if field.hasElement("fieldInfo"):
-                            field_info_element = field.getElement("fieldInfo")
-                            
-                            field_info.update({
-                                "mnemonic": field_info_element.getElementAsString("mnemonic") if field_info_element.hasElement("mnemonic") else "",
-                                "description": field_info_element.getElementAsString("description") if field_info_element.hasElement("description") else "",
-                                "data_type": field_info_element.getElementAsString("datatype") if field_info_element.hasElement("datatype") else "",
-                                "documentation": field_info_element.getElementAsString("documentation") if field_info_element.hasElement("documentation") else "",
-                                "category_name": field_info_element.getElementAsString("categoryName") if field_info_element.hasElement("categoryName") else "",
-                                "property": field_info_element.getElementAsString("property") if field_info_element.hasElement("property") else ""
-                            })
-                        
-                        results.append(field_info)
-                        
-                        if len(results) >= max_results:
-                            break
-                
-                if event.eventType() == blpapi.Event.RESPONSE:
-                    done = True
-        
-        return results[:max_results]
+        # 同じ検索が実行中なら結果を共有
+        key = fingerprint("search_fields", field_query, max_results)
+        return await inflight.do(key, lambda: _search_fields(field_query, max_results))
         
     except Exception as e:
         raise Exception(f"フィールド検索エラー: {str(e)}")
 
 
+async def _request_reference_data(
+    securities: List[str],
+    fields: List[str],
+    overrides: Optional[Dict[str, Any]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """1つのReferenceDataRequestを送信し、{証券: {フィールド: 値}} を返す"""
+    await ensure_connection_async()
+    
+    # ReferenceDataRequestの内容
+    def build_request(request):
+        # 証券を追加
+        for security in securities:
+            request.append("securities", security)
+        
+        # フィールドを追加
+        for field in fields:
+            request.append("fields", field)
+        
+        # オーバーライドを追加
+        if overrides:
+            overrides_element = request.getElement("overrides")
+            for field_id, value in overrides.items():
+                override = overrides_element.appendElement()
+                override.setElement("fieldId", field_id)
+                override.setElement("value", str(value))
+    
+    # リクエストを送信（負荷の低いセッションで送信し、自分宛の応答のみ受信）
+    try:
+        messages = await bbg_api.send_request_async("//blp/refdata", "ReferenceDataRequest", build_request)
+        timeout = None
+    except DeadlineExceeded as e:
+        # 期限までに受信した分をデコードして部分結果として渡す
+        messages, timeout = e.messages, e
+    
+    results = {}
+    decoder = decoders.reference_data_decoder(tuple(fields))
+    
+    for msg in messages:
+        for security, security_results in decoder.decode(msg):
+            # エラーチェック
+            if security_results is None:
+                continue
+            results[security] = security_results
+    
+    if timeout is not None:
+        timeout.partial = results
+        raise timeout
+    
+    return results
+
+
+async def _fetch_reference_data(
+    securities: List[str],
+    fields: List[str],
+    overrides: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Dict[str, Any]], List[ChunkError]]:
+    """
+    参照データを取得（キャッシュを経由しない）
+    
+    証券数がチャンクサイズを超える場合は分割して並行送信する。
+    
+    Returns:
+        ({証券: {フィールド: 値}}, 失敗したチャンクの情報のリスト)
+    """
+    return await gather_chunks(
+        lambda chunk: _request_reference_data(chunk, fields, overrides),
+        securities,
+        config.REFDATA_CHUNK_SIZE,
+    )
+
+
+# 参照データのマイクロバッチ（同時に届いた呼び出しを1リクエストにまとめる）
+refdata_batcher = ReferenceDataBatcher(
+    fetch=_fetch_reference_data,
+    window=config.REFDATA_BATCH_WINDOW_MS / 1000,
+    max_securities=config.REFDATA_BATCH_MAX_SECURITIES,
+) if config.REFDATA_BATCH_WINDOW_MS > 0 else None
+
+
+async def _get_reference_data(
+    securities: List[str],
+    fields: List[str],
+    overrides: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Dict[str, Any]], List[ChunkError]]:
+    """
+    参照データを取得（キャッシュ・購読中の最新値を優先し、不足分のみリクエスト）
+    
+    Returns:
+        ({証券: {フィールド: 値}}, 失敗したチャンクの情報のリスト)
+    """
+    # キャッシュを参照し、不足分のみ取得
+    cached, missing_securities, missing_fields = refdata_cache.lookup(securities, fields, overrides)
+    
+    # 購読中の最新値で足りる証券はリクエストしない（オーバーライド指定時は使わない）
+    if market_data is not None and not overrides and missing_securities:
+        live = market_data.lookup(missing_securities, missing_fields)
+        for security, values in live.items():
+            cached[security].update(values)
+        missing_securities = [
+            security for security in missing_securities
+            if not all(field in cached[security] for field in fields)
+        ]
+        missing_fields = [
+            field for field in fields
+            if any(field not in cached[security] for security in missing_securities)
+        ]
+    if missing_securities:
+        if refdata_batcher is not None:
+            fetched, errors = await refdata_batcher.get(missing_securities, missing_fields, overrides)
+        else:
+            fetched, errors = await _fetch_reference_data(missing_securities, missing_fields, overrides)
+        refdata_cache.store(fetched, overrides)
+    else:
+        fetched, errors = {}, []
+    
+    results = {}
+    for security in securities:
+        if security in fetched:
+            results[security] = {**cached[security], **fetched[security]}
+        elif security not in missing_securities:
+            results[security] = cached[security]
+        else:
+            # 取得できなかった証券（securityError等）は結果に含めない
+            continue
+        results[security] = {field: results[security].get(field) for field in fields}
+    
+    return results, errors
+
+
 @mcp.tool
-def get_reference_data(securities: Union[str, List[str]], fields: Union[str, List[str]]) -> Dict[str, Any]:
+@with_deadline
+async def get_reference_data(
+    securities: Union[str, List[str]],
+    fields: Union[str, List[str]],
+    overrides: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
     """
     現在の参照データを取得します（BDP機能相当）。
     
+    キャッシュ済みの (証券, フィールド) はBloombergへ問い合わせず、
+    不足している証券・フィールドのみをリクエストして結果を統合します。
+    リアルタイム購読中の証券の LAST_PRICE / BID / ASK 等は購読で受信した最新値を返します。
+    
     Args:
         securities: 証券コード（文字列または文字列のリスト）
         fields: フィールド名（文字列または文字列のリスト）
+        overrides: オーバーライド（例: {"BEST_FPERIOD_OVERRIDE": "1BF"}）
     
     Returns:
-        市場データの辞書
+        市場データの辞書（一部の証券の取得に失敗した場合は "_errors" に失敗内容を含む）
     """
     try:
-        ensure_connection()
-        
         # 入力を正規化
         if isinstance(securities, str):
             securities = [securities]
         if isinstance(fields, str):
             fields = [fields]
         
-        # ReferenceDataRequestを作成
-        request = bbg_api.refdata_service.createRequest("ReferenceDataRequest")
+        # キャッシュを参照し、不足分のみ取得
+        results, errors = await _get_reference_data(securities, fields, overrides)
+        
+        # 一部のチャンクが失敗した場合はその証券とエラー内容を添える
+        if errors:
+            results["_errors"] = errors
+        
+        return results
         
+    except Exception as e:
+        raise Exception(f"参照データ取得エラー: {str(e)}")
+
+
+# get_historical_data / get_bulk_data の出力形式
+RESPONSE_FORMATS = ("rows", "columnar")
+
+
+def _check_format(format: str) -> None:
+    if format not in RESPONSE_FORMATS:
+        raise ValueError(f"formatは {' / '.join(RESPONSE_FORMATS)} のいずれかを指定してください: {format}")
+
+
+def _historical_request_builder(
+    securities: List[str],
+    fields: List[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    periodicity: str
+) -> Callable[[blpapi.Request], None]:
+    """HistoricalDataRequestに値を設定する関数を作成"""
+    # 日付をBloomberg形式に変換
+    start_date_bbg = start_date.strftime("%Y%m%d")
+    end_date_bbg = end_date.strftime("%Y%m%d")
+    
+    # HistoricalDataRequestの内容
+    def build_request(request):
         # 証券を追加
         for security in securities:
             request.append("securities", security)
@@ -225,209 +707,949 @@ def get_reference_data(securities: Union[str, List[str]], fields: Union[str, Lis
         for field in fields:
             request.append("fields", field)
         
-        # リクエストを送信
-        bbg_api.session.sendRequest(request)
-        
-        results = {}
-        done = False
+        # 日付設定
+        request.set("startDate", start_date_bbg)
+        request.set("endDate", end_date_bbg)
+        request.set("periodicitySelection", periodicity)
         
-        while not done:
-            event = bbg_api.session.nextEvent(500)
-            
-            for msg in event:
-                if msg.messageType() == blpapi.Name("ReferenceDataResponse"):
-                    security_data_array = msg.getElement("securityData")
-                    
-                    for i in range(security_data_array.numValues()):
-                        security_data = security_data_array.getValue(i)
-                        security = security_data.getElementAsString("security")
-                        
-                        # エラーチェック
-                        if security_data.hasElement("securityError"):
-                            continue
-                        
-                        field_data = security_data.getElement("fieldData")
-                        security_results = {}
-                        
-                        for field in fields:
-                            if field_data.hasElement(field):
-                                value = field_data.getElement(field).getValue()
-                                security_results[field] = value
-                            else:
-                                security_results[field] = None
-                        
-                        results[security] = security_results
-                
-                if event.eventType() == blpapi.Event.RESPONSE:
-                    done = True
+        # 価格調整（ローカルストアに保存した値と調整方法がそろうよう、DPDFの設定に従わない）
+        request.set("adjustmentFollowDPDF", False)
+        request.set("adjustmentNormal", "normal" in config.HISTORY_ADJUSTMENTS)
+        request.set("adjustmentAbnormal", "abnormal" in config.HISTORY_ADJUSTMENTS)
+        request.set("adjustmentSplit", "split" in config.HISTORY_ADJUSTMENTS)
+    
+    return build_request
+
+
+async def _request_historical_data(
+    securities: List[str],
+    fields: List[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    periodicity: str
+) -> Dict[str, List[Dict[str, Any]]]:
+    """1つのHistoricalDataRequestを送信し、{証券: [行]} を返す"""
+    await ensure_connection_async()
+    
+    build_request = _historical_request_builder(securities, fields, start_date, end_date, periodicity)
+    
+    # リクエストを送信（負荷の低いセッションで送信し、自分宛の応答のみ受信）
+    try:
+        messages = await bbg_api.send_request_async("//blp/refdata", "HistoricalDataRequest", build_request)
+        timeout = None
+    except DeadlineExceeded as e:
+        # 期限までに受信した分をデコードして部分結果として渡す
+        messages, timeout = e.messages, e
+    
+    results = {}
+    
+    decoder = decoders.historical_data_decoder(tuple(fields))
+    
+    for msg in messages:
+        decoded = decoder.decode(msg)
+        if decoded is None or decoded[1] is None:
+            continue
+        security, security_results = decoded
+        results[security] = security_results
+    
+    if timeout is not None:
+        timeout.partial = results
+        raise timeout
+    
+    return results
+
+
+async def _fetch_historical_data(
+    securities: List[str],
+    fields: List[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    periodicity: str
+) -> Tuple[Dict[str, List[Dict[str, Any]]], List[ChunkError]]:
+    """
+    過去データを取得（ストアを経由しない）
+    
+    証券数がチャンクサイズを超える場合は分割して並行送信する。
+    
+    Returns:
+        ({証券: [行]}, 失敗したチャンクの情報のリスト)
+    """
+    return await gather_chunks(
+        lambda chunk: _request_historical_data(chunk, fields, start_date, end_date, periodicity),
+        securities,
+        config.HISTORICAL_CHUNK_SIZE,
+    )
+
+
+def _history_store_end(end_date: datetime.date) -> datetime.date:
+    """ローカルストアに保存する最終日（これより後は値が確定していない可能性があるため毎回取得する）"""
+    # UTC の前日はどのタイムゾーンでも現地の当日以前になる
+    utc_today = datetime.datetime.now(datetime.timezone.utc).date()
+    return min(end_date, utc_today - datetime.timedelta(days=1 + config.HISTORY_STORE_SETTLE_DAYS))
+
+
+def _collect_series(
+    series: Dict[str, Dict[str, Dict[str, Any]]],
+    data: Dict[str, List[Dict[str, Any]]],
+    fields: List[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> Dict[Tuple[str, str], Tuple[List[datetime.date], List[Any]]]:
+    """
+    取得結果のうち [start_date, end_date] の値を series（{証券: {日付: {フィールド: 値}}}）へ加える
+    
+    Returns:
+        {(証券, フィールド): (日付のリスト, 値のリスト)}（期間外も含む、ストアへの保存用）
+    """
+    first, last = start_date.isoformat(), end_date.isoformat()
+    collected = {}
+    for security, rows in data.items():
+        security_series = series.setdefault(security, {})
+        for field in fields:
+            dates, values = [], []
+            for row in rows:
+                value = row.get(field)
+                if value is not None:
+                    day = row["date"]
+                    if first <= day <= last:
+                        security_series.setdefault(day, {})[field] = value
+                    dates.append(datetime.date.fromisoformat(day))
+                    values.append(value)
+            collected[(security, field)] = (dates, values)
+    return collected
+
+
+async def _fetch_historical_data_with_store(
+    securities: List[str],
+    fields: List[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    periodicity: str
+) -> Tuple[Dict[str, List[Dict[str, Any]]], List[ChunkError]]:
+    """
+    ローカルストアの未保存区間のみBloombergから取得し、ストアと合わせて返す
+    
+    保存済みの区間に接する未保存区間は HISTORY_STORE_OVERLAP_DAYS 日重ねて取得し、
+    重なった日の値が保存済みの値と異なる系列（配当・分割による遡及調整等）は全期間を取得し直す。
+    ストアの読み書きはイベントループを止めないようスレッドプールで行う。
+    
+    Returns:
+        ({証券: [行]}, 失敗したチャンクの情報のリスト)
+    """
+    historical_store = get_historical_store()
+    loop = asyncio.get_running_loop()
+    
+    # 直近の日付は値が確定していないため保存せず、毎回取得する
+    store_end = _history_store_end(end_date)
+    overlap = datetime.timedelta(days=config.HISTORY_STORE_OVERLAP_DAYS)
+    
+    def plan_gaps() -> Dict[Tuple[datetime.date, datetime.date], Tuple[Dict[str, None], Dict[str, None]]]:
+        """未保存区間ごとに必要な証券・フィールドをまとめる"""
+        gaps = {}
+        if start_date > store_end:
+            return gaps
+        for security in securities:
+            for field in fields:
+                covered = historical_store.coverage(security, field, periodicity)
+                for gap_start, gap_end in historical_store.missing_ranges(security, field, periodicity, start_date, store_end):
+                    if covered:
+                        gap_start, gap_end = gap_start - overlap, min(gap_end + overlap, store_end)
+                    gap_securities, gap_fields = gaps.setdefault((gap_start, gap_end), ({}, {}))
+                    gap_securities[security] = None
+                    gap_fields[field] = None
+        return gaps
+    
+    gaps = await loop.run_in_executor(None, plan_gaps)
+    requests = [
+        (gap_start, gap_end, list(gap_securities), list(gap_fields))
+        for (gap_start, gap_end), (gap_securities, gap_fields) in gaps.items()
+    ]
+    if end_date > store_end:
+        requests.append((max(start_date, store_end + datetime.timedelta(days=1)), end_date, securities, fields))
+    
+    # 区間ごとの結果は期間の一部のため、共有の取得処理の部分結果（deadlines.report_partial）にしない
+    with collect_partial(None):
+        fetched = await asyncio.gather(*[
+            _fetch_historical_data(request_securities, request_fields, request_start, request_end, periodicity)
+            for request_start, request_end, request_securities, request_fields in requests
+        ])
+    
+    # 取得した区間をまとめ、ストアへ保存するものを選ぶ
+    series = {}
+    errors = []
+    writes = []
+    for (request_start, request_end, _, request_fields), (data, request_errors) in zip(requests, fetched):
+        errors.extend(request_errors)
+        collected = _collect_series(series, data, request_fields, start_date, end_date)
+        if request_end <= store_end:
+            writes.extend(
+                (security, field, request_start, request_end, dates, values)
+                for (security, field), (dates, values) in collected.items()
+            )
+    
+    def save(writes) -> List[Tuple[str, str]]:
+        """
+        取得した区間を保存（数値以外のフィールドは保存されず、取得結果をそのまま使う）
         
-        return results
+        Returns:
+            保存済みの値と取得した値が異なり、無効化した (証券, フィールド) のリスト
+        """
+        stale = []
+        for security, field, request_start, request_end, dates, values in writes:
+            stored_dates, stored_values = historical_store.read(security, field, periodicity, request_start, request_end)
+            if len(stored_dates):
+                fetched_values = dict(zip(dates, values))
+                for day, value in zip(stored_dates.tolist(), stored_values.tolist()):
+                    if value == value and fetched_values.get(day) != value:  # NaNは比較しない
+                        historical_store.invalidate(security, field, periodicity)
+                        stale.append((security, field))
+                        break
+                else:
+                    historical_store.write(security, field, periodicity, request_start, request_end, dates, values)
+            else:
+                historical_store.write(security, field, periodicity, request_start, request_end, dates, values)
+        return stale
+    
+    stale = await loop.run_in_executor(None, save, writes)
+    
+    if stale:
+        # 保存済みの値が調整された系列は、保存対象の全期間を取得し直して置き換える
+        stale_securities = list(dict.fromkeys(security for security, _ in stale))
+        stale_fields = list(dict.fromkeys(field for _, field in stale))
+        with collect_partial(None):
+            data, request_errors = await _fetch_historical_data(
+                stale_securities, stale_fields, start_date, store_end, periodicity
+            )
+        errors.extend(request_errors)
+        last = store_end.isoformat()
+        for security, field in stale:
+            security_series = series.get(security, {})
+            for day in [day for day in security_series if day <= last]:
+                security_series[day].pop(field, None)
+                if not security_series[day]:
+                    del security_series[day]
+        collected = _collect_series(series, data, stale_fields, start_date, store_end)
+        writes = [
+            (security, field, start_date, store_end, *collected[(security, field)])
+            for security, field in stale
+            if (security, field) in collected
+        ]
+        await loop.run_in_executor(None, save, writes)
+    
+    def load_stored() -> Dict[str, Dict[str, List[Tuple[str, Any]]]]:
+        """保存済みの [start_date, store_end] を {証券: {フィールド: [(日付, 値)]}} で読み出す"""
+        stored = {}
+        if start_date > store_end:
+            return stored
+        for security in securities:
+            for field in fields:
+                if not historical_store.coverage(security, field, periodicity):
+                    continue
+                dates, values = historical_store.read(security, field, periodicity, start_date, store_end)
+                stored.setdefault(security, {})[field] = [
+                    (day, value)
+                    for day, value in zip(dates.astype(str).tolist(), values.tolist())
+                    if value == value  # NaNを除外
+                ]
+        return stored
+    
+    stored = await loop.run_in_executor(None, load_stored)
+    
+    # ストアの保存済みデータと統合
+    results = {}
+    for security in securities:
+        security_series = series.get(security)
+        for field, pairs in stored.get(security, {}).items():
+            if security_series is None:
+                security_series = series.setdefault(security, {})
+            for day, value in pairs:
+                security_series.setdefault(day, {}).setdefault(field, value)
         
-    except Exception as e:
-        raise Exception(f"参照データ取得エラー: {str(e)}")
+        # Bloombergから応答がなく保存済みデータもない証券（securityError等）は含めない
+        if security_series is None and security not in stored:
+            continue
+        results[security] = [
+            {"date": day, **{field: values.get(field) for field in fields}}
+            for day, values in sorted((security_series or {}).items())
+        ]
+    
+    return results, errors
+
+
+def _progress_token(ctx: Context) -> Any:
+    """クライアントがリクエストに指定した progressToken（ない場合はNone）"""
+    try:
+        meta = ctx.request_context.meta
+    except (AttributeError, ValueError):
+        # リクエストの処理中でない場合
+        return None
+    # fastmcp のバージョンにより、_meta の辞書またはモデルのいずれか
+    if isinstance(meta, dict):
+        return meta.get("progressToken")
+    return getattr(meta, "progressToken", None)
+
+
+async def _stream_historical_data(
+    securities: List[str],
+    fields: List[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    periodicity: str,
+    ctx: Context,
+    format: str = "rows"
+) -> Tuple[Dict[str, Any], List[ChunkError]]:
+    """
+    過去データを証券ごとに進捗通知で送信
+    
+    各 HistoricalDataResponse を受信した時点でデコードし、
+    {"security": 証券, "data": [行]} のJSONを進捗通知のメッセージとして送る。
+    行データは保持しないため、戻り値は証券ごとの行数のみ。
+    
+    Returns:
+        ({証券: 行数}, 失敗したチャンクの情報のリスト)
+    """
+    await ensure_connection_async()
+    
+    total = len(securities)
+    received = 0
+    decoder = decoders.historical_data_decoder(tuple(fields))
+    
+    async def stream_chunk(chunk: List[str]) -> Dict[str, int]:
+        nonlocal received
+        build_request = _historical_request_builder(chunk, fields, start_date, end_date, periodicity)
+        row_counts = {}
+        try:
+            async for msg in bbg_api.stream_request_async("//blp/refdata", "HistoricalDataRequest", build_request):
+                decoded = decoder.decode(msg)
+                if decoded is None:
+                    continue
+                security, rows = decoded
+                received += 1
+                if rows is None:
+                    # 証券エラーは進捗のみ進める
+                    await ctx.report_progress(received, total)
+                    continue
+                row_counts[security] = len(rows)
+                data = utils.rows_to_columns(rows, ["date"] + fields) if format == "columnar" else rows
+                payload = json.dumps({"security": security, "data": data}, ensure_ascii=False, default=str)
+                await ctx.report_progress(received, total, payload)
+        except DeadlineExceeded as e:
+            # 送信済みの証券の行数を部分結果として渡す
+            e.partial = row_counts
+            raise
+        return row_counts
+    
+    return await gather_chunks(stream_chunk, securities, config.HISTORICAL_CHUNK_SIZE)
+
+
+async def _get_historical_data(
+    securities: List[str],
+    fields: List[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    periodicity: str
+) -> Tuple[Dict[str, List[Dict[str, Any]]], List[ChunkError]]:
+    """
+    過去データを取得（ローカルストアを経由し、同じ内容の実行中リクエストとは結果を共有）
+    
+    Returns:
+        ({証券: [行]}, 失敗したチャンクの情報のリスト)。共有結果のため変更しないこと
+    """
+    if get_historical_store() is not None and periodicity in config.HISTORY_STORE_PERIODICITIES:
+        fetch = _fetch_historical_data_with_store
+    else:
+        fetch = _fetch_historical_data
+    
+    # 同じ内容のリクエストが実行中なら結果を共有
+    key = fingerprint("get_historical_data", sorted(set(securities)), sorted(set(fields)), start_date, end_date, periodicity)
+    try:
+        return await inflight.do(key, lambda: fetch(securities, fields, start_date, end_date, periodicity))
+    except DeadlineExceeded as e:
+        # 共有中の取得より先に期限が来た場合は、それまでに受信した証券を返す
+        return timed_out_outcome(e, securities)
 
 
 @mcp.tool
-def get_historical_data(
+@with_deadline
+async def get_historical_data(
     securities: Union[str, List[str]], 
     fields: Union[str, List[str]], 
     start_date: str, 
     end_date: str,
-    periodicity: str = "DAILY"
+    periodicity: str = "DAILY",
+    stream: bool = False,
+    format: str = "rows",
+    ctx: Optional[Context] = None
 ) -> Dict[str, Any]:
     """
     過去データを取得します（BDH機能相当）。
     
+    日次データはローカルストアに保存され、保存済みの期間はBloombergへ問い合わせません。
+    stream=True の場合は証券ごとの結果を受信した順に進捗通知（notifications/progress）の
+    message として送信し、戻り値には証券ごとの行数のみを含めます。
+    クライアントがリクエストに progressToken を指定していない場合は進捗通知を送れないため、
+    stream=False と同じく全結果を返します。
+    format="columnar" の場合は証券ごとに {"date": [...], フィールド: [...]} の列形式で返します
+    （日付・フィールド名を行ごとに繰り返さないため、長い系列では応答が小さくなります）。
+    
     Args:
         securities: 証券コード（文字列または文字列のリスト）
         fields: フィールド名（文字列または文字列のリスト）
         start_date: 開始日（YYYY-MM-DD形式）
         end_date: 終了日（YYYY-MM-DD形式）
         periodicity: 周期（DAILY, WEEKLY, MONTHLY等）
+        stream: 証券ごとに進捗通知で結果を送信するか
+        format: 出力形式（"rows": 行のリスト、"columnar": 列ごとの配列）
     
     Returns:
-        過去データの辞書
+        過去データの辞書（一部の証券の取得に失敗した場合は "_errors" に失敗内容を含む）
+        stream=True（progressToken あり）の場合は {"streamed": True, "row_counts": {証券: 行数}}
     """
     try:
-        ensure_connection()
-        
         # 入力を正規化
         if isinstance(securities, str):
             securities = [securities]
         if isinstance(fields, str):
             fields = [fields]
         
-        # 日付をBloomberg形式に変換
-        start_date_bbg = datetime.datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y%m%d")
-        end_date_bbg = datetime.datetime.strptime(end_date, "%Y-%m-%d").strftime("%Y%m%d")
+        start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+        _check_format(format)
         
-        # HistoricalDataRequestを作成
-        request = bbg_api.refdata_service.createRequest("HistoricalDataRequest")
+        if stream and ctx is not None and _progress_token(ctx) is not None:
+            # 結果は進捗通知で送るため、ストア・結果共有は使わない
+            row_counts, errors = await _stream_historical_data(securities, fields, start, end, periodicity, ctx, format)
+            results = {"streamed": True, "row_counts": row_counts}
+            if errors:
+                results["_errors"] = errors
+            return results
         
-        # 証券を追加
+        results, errors = await _get_historical_data(securities, fields, start, end, periodicity)
+        
+        if format == "columnar":
+            columns = ["date"] + fields
+            results = {security: utils.rows_to_columns(rows, columns) for security, rows in results.items()}
+        
+        # 一部のチャンクが失敗した場合はその証券とエラー内容を添える（共有結果は変更しない）
+        if errors:
+            results = {**results, "_errors": errors}
+        
+        return results
+        
+    except Exception as e:
+        raise Exception(f"過去データ取得エラー: {str(e)}")
+
+
+async def _request_bulk_data(securities: List[str], fields: List[str]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """バルクフィールドのReferenceDataRequestを送信し、{証券: {フィールド: [行]}} を返す"""
+    await ensure_connection_async()
+    
+    # ReferenceDataRequestの内容
+    def build_request(request):
         for security in securities:
             request.append("securities", security)
-        
-        # フィールドを追加
         for field in fields:
             request.append("fields", field)
+    
+    # リクエストを送信（負荷の低いセッションで送信し、自分宛の応答のみ受信）
+    try:
+        messages = await bbg_api.send_request_async("//blp/refdata", "ReferenceDataRequest", build_request)
+        timeout = None
+    except DeadlineExceeded as e:
+        # 期限までに受信した分をデコードして部分結果として渡す
+        messages, timeout = e.messages, e
+    
+    results = {}
+    decoder = decoders.bulk_data_decoder(tuple(fields))
+    
+    for msg in messages:
+        for security, values in decoder.decode(msg):
+            # エラーチェック
+            if values is None:
+                continue
+            results[security] = values
+    
+    if timeout is not None:
+        timeout.partial = results
+        raise timeout
+    
+    return results
+
+
+async def _fetch_bulk_data(
+    securities: List[str],
+    fields: List[str]
+) -> Tuple[Dict[str, Dict[str, List[Dict[str, Any]]]], List[ChunkError]]:
+    """
+    バルクデータを取得してキャッシュに登録
+    
+    証券数がチャンクサイズを超える場合は分割して並行送信する。
+    
+    Returns:
+        ({証券: {フィールド: [行]}}, 失敗したチャンクの情報のリスト)
+    """
+    fetched, errors = await gather_chunks(
+        lambda chunk: _request_bulk_data(chunk, fields),
+        securities,
+        config.REFDATA_CHUNK_SIZE,
+    )
+    bulk_cache.store(fetched)
+    return fetched, errors
+
+
+@mcp.tool
+@with_deadline
+async def get_bulk_data(
+    security: Union[str, List[str]],
+    field: Union[str, List[str]],
+    format: str = "rows"
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    バルクデータを取得します（BDS機能相当）。
+    
+    複数の証券・フィールドは1つのリクエストで取得します。キャッシュ済みの
+    (証券, フィールド) はBloombergへ問い合わせません（INDX_MEMBERS は1日、OPT_CHAIN は15分等、
+    フィールドごとの有効期限で再取得します）。
+    
+    Args:
+        security: 証券コード（文字列または文字列のリスト）
+        field: バルクフィールド名（文字列または文字列のリスト、例: "INDX_MEMBERS", "DVD_HIST_ALL"）
+        format: 出力形式（"rows": 行のリスト、"columnar": {列名: 値の配列}）
+    
+    Returns:
+        証券・フィールドが1つずつの場合はバルクデータのリスト。
+        リストで指定した場合は {証券: {フィールド: バルクデータ}}
+        （一部の証券の取得に失敗した場合は "_errors" に失敗内容を含む）
+    """
+    try:
+        _check_format(format)
         
-        # 日付設定
-        request.set("startDate", start_date_bbg)
-        request.set("endDate", end_date_bbg)
-        request.set("periodicitySelection", periodicity)
+        # 入力を正規化
+        single = isinstance(security, str) and isinstance(field, str)
+        securities = [security] if isinstance(security, str) else list(security)
+        fields = [field] if isinstance(field, str) else list(field)
         
-        # リクエストを送信
-        bbg_api.session.sendRequest(request)
+        # キャッシュを参照し、不足分のみ取得
+        cached, missing_securities, missing_fields = bulk_cache.lookup(securities, fields)
+        if missing_securities:
+            # 同じ証券・フィールドのリクエストが実行中なら結果を共有
+            key = fingerprint("get_bulk_data", sorted(missing_securities), sorted(missing_fields))
+            try:
+                fetched, errors = await inflight.do(key, lambda: _fetch_bulk_data(missing_securities, missing_fields))
+            except DeadlineExceeded as e:
+                # 共有中の取得より先に期限が来た場合は、それまでに受信した証券を返す
+                fetched, errors = timed_out_outcome(e, missing_securities)
+        else:
+            fetched, errors = {}, []
         
-        results = {}
-        done = False
+        results: Dict[str, Any] = {}
+        for sec in securities:
+            if sec in fetched:
+                values = {**cached[sec], **fetched[sec]}
+            elif sec not in missing_securities:
+                values = cached[sec]
+            else:
+                # 取得できなかった証券（securityError等）は結果に含めない
+                continue
+            if format == "columnar":
+                results[sec] = {f: utils.rows_to_columns(values.get(f, [])) for f in fields}
+            else:
+                results[sec] = {f: values.get(f, []) for f in fields}
         
-        while not done:
-            event = bbg_api.session.nextEvent(500)
-            
-            for msg in event:
-                if msg.messageType() == blpapi.Name("HistoricalDataResponse"):
-                    security_data = msg.getElement("securityData")
-                    security = security_data.getElementAsString("security")
-                    
-                    # エラーチェック
-                    if security_data.hasElement("securityError"):
-                        continue
-                    
-                    field_data_array = security_data.getElement("fieldData")
-                    
-                    security_results = []
-                    for i in range(field_data_array.numValues()):
-                        field_data = field_data_array.getValue(i)
-                        
-                        row = {
-                            "date": field_data.getElementAsString("date")
-                        }
-                        
-                        for field in fields:
-                            if field_data.hasElement(field):
-                                value = field_data.getElement(field).getValue()
-                                row[field] = value
-                            else:
-                                row[field] = None
-                        
-                        security_results.append(row)
-                    
-                    results[security] = security_results
-                
-                if event.eventType() == blpapi.Event.RESPONSE:
-                    done = True
+        if single:
+            if security in results:
+                return results[security][field]
+            return utils.rows_to_columns([]) if format == "columnar" else []
+        
+        # 一部のチャンクが失敗した場合はその証券とエラー内容を添える
+        if errors:
+            results["_errors"] = errors
         
         return results
         
     except Exception as e:
-        raise Exception(f"過去データ取得エラー: {str(e)}")
+        raise Exception(f"バルクデータ取得エラー: {str(e)}")
+
+
+async def _stream_universe_members(
+    universes: List[str],
+    member_field: str,
+    yellow_key: str,
+    errors: List[ChunkError]
+) -> AsyncIterator[str]:
+    """
+    ユニバースの構成銘柄を受信した順に返す（完全な証券コードに変換、重複は除く）
+    
+    キャッシュ済みのユニバースはすぐに返し、残りは1つのReferenceDataRequestの応答を
+    メッセージごとにデコードして返す。構成銘柄を取得できなかったユニバースは errors に追加する。
+    """
+    seen = set()
+    
+    def new_members(rows: List[Dict[str, Any]]) -> List[str]:
+        members = []
+        for row in rows:
+            # 先頭の列がティッカー（"Member Ticker and Exchange Code" 等）
+            ticker = next(iter(row.values()), None)
+            security = utils.normalize_security(ticker, yellow_key) if ticker else ""
+            if security and security not in seen:
+                seen.add(security)
+                members.append(security)
+        return members
+    
+    cached, missing, _ = bulk_cache.lookup(universes, [member_field])
+    for universe in universes:
+        if universe not in missing:
+            for security in new_members(cached[universe][member_field]):
+                yield security
+    if not missing:
+        return
+    
+    await ensure_connection_async()
+    
+    def build_request(request):
+        for universe in missing:
+            request.append("securities", universe)
+        request.append("fields", member_field)
+    
+    received = set()
+    decoder = decoders.bulk_data_decoder((member_field,))
+    try:
+        async for msg in bbg_api.stream_request_async("//blp/refdata", "ReferenceDataRequest", build_request):
+            for universe, values in decoder.decode(msg):
+                if values is None:
+                    continue
+                received.add(universe)
+                bulk_cache.store({universe: values})
+                for security in new_members(values[member_field]):
+                    yield security
+    except DeadlineExceeded as e:
+        # 受信済みの構成銘柄の取得は続ける
+        errors.append({
+            "securities": [universe for universe in missing if universe not in received],
+            "error": str(e),
+            "timed_out": True,
+        })
+        return
+    failed = [universe for universe in missing if universe not in received]
+    if failed:
+        errors.append({"securities": failed, "error": f"{member_field} を取得できません"})
 
 
 @mcp.tool
-def get_bulk_data(security: str, field: str) -> List[Dict[str, Any]]:
+@with_deadline
+async def get_universe_data(
+    universe: Union[str, List[str]],
+    fields: Union[str, List[str]],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    periodicity: str = "DAILY",
+    overrides: Optional[Dict[str, str]] = None,
+    member_field: str = "INDX_MEMBERS",
+    yellow_key: str = "Equity",
+    format: str = "rows"
+) -> Dict[str, Any]:
     """
-    バルクデータを取得します（BDS機能相当）。
+    指数等の構成銘柄について、参照データまたは過去データを1回の呼び出しで取得します。
+    
+    構成銘柄（"AAPL UW" 等）を完全な証券コード（"AAPL UW Equity"）に変換し、
+    構成銘柄の受信中からチャンクごとに参照データ（BDP）・過去データ（BDH）のリクエストを開始します。
+    start_date / end_date を指定した場合は過去データ、省略した場合は参照データを取得します。
     
     Args:
-        security: 証券コード
-        field: バルクフィールド名（例: "INDX_MEMBERS", "DVD_HIST_ALL"）
+        universe: 指数等の証券コード（文字列または文字列のリスト、例: "SPX Index"）
+        fields: フィールド名（文字列または文字列のリスト）
+        start_date: 過去データの開始日（YYYY-MM-DD形式）
+        end_date: 過去データの終了日（YYYY-MM-DD形式）
+        periodicity: 過去データの周期（DAILY, WEEKLY, MONTHLY等）
+        overrides: 参照データのオーバーライド
+        member_field: 構成銘柄のバルクフィールド（例: "INDX_MEMBERS"）
+        yellow_key: 構成銘柄のティッカーに付けるイエローキー
+        format: 出力形式（"rows": 行のリスト、"columnar": 列ごとの配列）
     
     Returns:
-        バルクデータのリスト
+        {"members": 構成銘柄のリスト, "data": 全銘柄をまとめた表}
+        表の列は参照データでは security とフィールド、過去データでは security / date とフィールド
+        （一部の取得に失敗した場合は "_errors" に失敗内容を含む）
     """
     try:
-        ensure_connection()
+        # 入力を正規化
+        universes = [universe] if isinstance(universe, str) else list(universe)
+        if isinstance(fields, str):
+            fields = [fields]
+        _check_format(format)
         
-        # ReferenceDataRequestを作成
-        request = bbg_api.refdata_service.createRequest("ReferenceDataRequest")
-        request.append("securities", security)
-        request.append("fields", field)
+        historical = start_date is not None or end_date is not None
+        if historical:
+            if start_date is None or end_date is None:
+                raise ValueError("過去データを取得する場合は start_date と end_date の両方を指定してください")
+            start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+            end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
         
-        # リクエストを送信
-        bbg_api.session.sendRequest(request)
+        # チャンク内の一部の証券の失敗
+        nested_errors: List[ChunkError] = []
         
-        results = []
-        done = False
+        member_list: List[str] = []
         
-        while not done:
-            event = bbg_api.session.nextEvent(500)
-            
-            for msg in event:
-                if msg.messageType() == blpapi.Name("ReferenceDataResponse"):
-                    security_data_array = msg.getElement("securityData")
-                    
-                    for i in range(security_data_array.numValues()):
-                        security_data = security_data_array.getValue(i)
-                        
-                        # エラーチェック
-                        if security_data.hasElement("securityError"):
-                            continue
-                        
-                        field_data = security_data.getElement("fieldData")
-                        
-                        if field_data.hasElement(field):
-                            bulk_data = field_data.getElement(field)
-                            
-                            for j in range(bulk_data.numValues()):
-                                row_data = bulk_data.getValue(j)
-                                row = {}
-                                
-                                # 各要素を辞書に変換
-                                for k in range(row_data.numElements()):
-                                    element = row_data.getElement(k)
-                                    row[element.name()] = element.getValue()
-                                
-                                results.append(row)
-                
-                if event.eventType() == blpapi.Event.RESPONSE:
-                    done = True
+        async def fetch_chunk(chunk: List[str]) -> Dict[str, Any]:
+            member_list.extend(chunk)
+            if historical:
+                data, errors = await _get_historical_data(chunk, fields, start, end, periodicity)
+            else:
+                data, errors = await _get_reference_data(chunk, fields, overrides)
+            nested_errors.extend(errors)
+            return data
+        
+        member_errors: List[ChunkError] = []
+        members = _stream_universe_members(universes, member_field, yellow_key, member_errors)
+        chunk_size = config.HISTORICAL_CHUNK_SIZE if historical else config.REFDATA_CHUNK_SIZE
+        data, errors = await pipeline_chunks(fetch_chunk, members, chunk_size)
+        
+        # 1つの表にまとめる
+        if historical:
+            columns = ["security", "date"] + fields
+            table = [{"security": security, **row} for security, rows in data.items() for row in rows]
+        else:
+            columns = ["security"] + fields
+            table = [{"security": security, **values} for security, values in data.items()]
+        
+        results: Dict[str, Any] = {
+            "members": member_list,
+            "data": utils.rows_to_columns(table, columns) if format == "columnar" else table,
+        }
+        
+        errors = member_errors + errors + nested_errors
+        if errors:
+            results["_errors"] = errors
         
         return results
         
     except Exception as e:
-        raise Exception(f"バルクデータ取得エラー: {str(e)}")
+        raise Exception(f"ユニバースデータ取得エラー: {str(e)}")
+
+
+async def _request_intraday_bars(
+    security: str,
+    event_type: str,
+    interval: int,
+    start: datetime.datetime,
+    end: datetime.datetime
+) -> np.ndarray:
+    """1つのIntradayBarRequestを送信し、足の構造化配列を返す"""
+    await ensure_connection_async()
+    
+    # IntradayBarRequestの内容（日時はUTC）
+    def build_request(request):
+        request.set("security", security)
+        request.set("eventType", event_type)
+        request.set("interval", interval)
+        request.set("startDateTime", start)
+        request.set("endDateTime", end)
+    
+    # リクエストを送信（負荷の低いセッションで送信し、自分宛の応答のみ受信）
+    messages = await bbg_api.send_request_async("//blp/refdata", "IntradayBarRequest", build_request)
+    
+    bars = []
+    for msg in messages:
+        bars.extend(decoders.intraday_bar_decoder.decode(msg))
+    
+    from intraday_store import bars_to_array
+    return bars_to_array(bars)
+
+
+async def _fetch_intraday_shard(
+    security: str,
+    event_type: str,
+    interval: int,
+    day: datetime.date,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    now: datetime.datetime
+) -> np.ndarray:
+    """
+    1日分の区間の足を取得（終了済みの日はキャッシュを使い、なければ1日分を取得して保存）
+    
+    start は足の区切り（day_shards() で揃えた区間の開始）であること。キャッシュする1日分も
+    同じ区切りで取得するため、キャッシュの有無で足の時刻は変わらない。
+    """
+    from intraday_store import grid_offset
+    
+    day_end = datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(days=1)
+    intraday_store = get_intraday_store()
+    if intraday_store is None or day_end > now:
+        return await _request_intraday_bars(security, event_type, interval, start, end)
+    
+    offset = grid_offset(day, start, interval)
+    bars = intraday_store.read(security, event_type, interval, day, offset)
+    if bars is None:
+        async def fetch_day():
+            day_start = datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(seconds=offset)
+            day_bars = await _request_intraday_bars(security, event_type, interval, day_start, day_end)
+            intraday_store.write(security, event_type, interval, day, day_bars, offset)
+            return day_bars
+        
+        # 同じ日を取得中なら結果を共有
+        key = fingerprint("intraday_bars", security, event_type, interval, day, offset)
+        bars = await inflight.do(key, fetch_day)
+    
+    times = bars["time"]
+    lo = np.searchsorted(times, np.datetime64(start, "s"), side="left")
+    hi = np.searchsorted(times, np.datetime64(end, "s"), side="left")
+    return bars[lo:hi]
+
+
+@mcp.tool
+@with_deadline
+async def get_intraday_bars(
+    security: str,
+    start_datetime: str,
+    end_datetime: str,
+    interval: int = 1,
+    event_type: str = "TRADE",
+    format: str = "rows"
+) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
+    """
+    日中足を取得します（IntradayBarRequest）。
+    
+    期間は日（UTC）ごとに分割して並行取得し、終了済みの日はローカルにキャッシュします。
+    
+    Args:
+        security: 証券コード
+        start_datetime: 開始日時（ISO形式、例: "2024-01-02T14:30:00"。タイムゾーン指定なしはUTC）
+        end_datetime: 終了日時（ISO形式、この時刻の足は含まない）
+        interval: 足の間隔（分、1〜1440）
+        event_type: イベント種別（TRADE, BID, ASK等）
+        format: 出力形式（"rows": 行のリスト、"columnar": 列ごとの配列）
+    
+    Returns:
+        足（time, open, high, low, close, volume, numEvents, value）のリスト
+        （format="columnar" の場合は列ごとの配列）
+    """
+    from intraday_store import BAR_DTYPE, day_shards
+    
+    try:
+        _check_format(format)
+        if not 1 <= interval <= 1440:
+            raise ValueError(f"intervalは1〜1440の分数で指定してください: {interval}")
+        
+        start = decoders.utc_naive(datetime.datetime.fromisoformat(start_datetime))
+        end = decoders.utc_naive(datetime.datetime.fromisoformat(end_datetime))
+        if end <= start:
+            raise ValueError("終了日時は開始日時より後を指定してください")
+        
+        # 日ごとに分割して並行取得（区間の開始は start を起点とする足の区切りに揃える）
+        now = decoders.utc_naive(datetime.datetime.now(datetime.timezone.utc))
+        shards = await asyncio.gather(*[
+            _fetch_intraday_shard(security, event_type, interval, day, shard_start, shard_end, now)
+            for day, shard_start, shard_end in day_shards(start, end, interval)
+        ])
+        bars = np.concatenate(shards) if shards else np.empty(0, dtype=BAR_DTYPE)
+        
+        columns = {"time": np.datetime_as_string(bars["time"], unit="s").tolist()}
+        for column in BAR_DTYPE.names[1:]:
+            values = bars[column].tolist()
+            if bars.dtype[column].kind == "f":
+                # NaN（値なし）はNoneにする
+                values = [None if value != value else value for value in values]
+            columns[column] = values
+        
+        if format == "columnar":
+            return columns
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+        
+    except Exception as e:
+        raise Exception(f"日中足取得エラー: {str(e)}")
+
+
+@mcp.tool
+@with_deadline
+async def get_intraday_ticks(
+    security: str,
+    start_datetime: str,
+    end_datetime: str,
+    event_types: Union[str, List[str]] = "TRADE"
+) -> Dict[str, Any]:
+    """
+    日中ティックを取得します（IntradayTickRequest）。
+    
+    ティックは行として返さず、サーバー上のファイル（列ごとのメモリマップ配列）に保存し、
+    キャプチャIDと集計値（件数、期間、イベント種別ごとの価格範囲・出来高・VWAP）を返します。
+    行データはリソース bloomberg://ticks/{capture_id}/rows/{offset}/{limit} で取得できます。
+    
+    Args:
+        security: 証券コード
+        start_datetime: 開始日時（ISO形式、タイムゾーン指定なしはUTC）
+        end_datetime: 終了日時（ISO形式）
+        event_types: イベント種別（文字列または文字列のリスト、例: "TRADE", ["BID", "ASK"]）
+    
+    Returns:
+        キャプチャID・リソースURI・保存先・集計値の辞書
+    """
+    try:
+        if isinstance(event_types, str):
+            event_types = [event_types]
+        
+        start = decoders.utc_naive(datetime.datetime.fromisoformat(start_datetime))
+        end = decoders.utc_naive(datetime.datetime.fromisoformat(end_datetime))
+        if end <= start:
+            raise ValueError("終了日時は開始日時より後を指定してください")
+        
+        await ensure_connection_async()
+        
+        # IntradayTickRequestの内容（日時はUTC）
+        def build_request(request):
+            request.set("security", security)
+            for event_type in event_types:
+                request.append("eventTypes", event_type)
+            request.set("startDateTime", start)
+            request.set("endDateTime", end)
+        
+        from tick_capture import TICK_COLUMNS
+        
+        # 受信したメッセージごとにファイルへ書き込み、メッセージは保持しない
+        tick_store = get_tick_store()
+        capture = tick_store.create(security, event_types, start, end)
+        timed_out = False
+        try:
+            try:
+                async for msg in bbg_api.stream_request_async("//blp/refdata", "IntradayTickRequest", build_request):
+                    capture.append(*decoders.intraday_tick_decoder.decode(msg))
+            except DeadlineExceeded:
+                # 期限までに受信したティックは保存して返す
+                timed_out = True
+                capture.meta["timed_out"] = True
+            capture.close()
+        except BaseException:
+            capture.discard()
+            raise
+        
+        capture_id = capture.capture_id
+        result = {
+            "capture_id": capture_id,
+            "resource_uri": f"bloomberg://ticks/{capture_id}",
+            "rows_uri": f"bloomberg://ticks/{capture_id}/rows/{{offset}}/{{limit}}",
+            "directory": capture.directory,
+            "columns": list(TICK_COLUMNS),
+            "summary": tick_store.summary(capture_id),
+        }
+        if timed_out:
+            result["timed_out"] = True
+        return result
+        
+    except Exception as e:
+        raise Exception(f"日中ティック取得エラー: {str(e)}")
+
+
+@mcp.resource("bloomberg://ticks/{capture_id}")
+def get_tick_capture(capture_id: str) -> Dict[str, Any]:
+    """日中ティックのキャプチャ情報と集計値"""
+    tick_store = get_tick_store()
+    return {**tick_store.load_meta(capture_id), "summary": tick_store.summary(capture_id)}
+
+
+@mcp.resource("bloomberg://ticks/{capture_id}/rows/{offset}/{limit}")
+def get_tick_capture_rows(capture_id: str, offset: int, limit: int) -> Dict[str, List[Any]]:
+    """日中ティックのキャプチャの一部（列形式、最大10000件）"""
+    return get_tick_store().page(capture_id, offset, min(limit, MAX_TICK_PAGE))
 
 
 def main():
@@ -442,27 +1664,18 @@ def main():
     args = parser.parse_args()
     
     if args.stdio:
-        print("Bloomberg MCP サーバーを起動しています (stdio)...")
-        # 起動時に接続テスト
-        try:
-            bbg_api.connect()
-            print("Bloomberg API接続成功")
-            bbg_api.disconnect()
-        except Exception as e:
-            print(f"警告: Bloomberg API接続失敗 - {e}")
-            print("Bloomberg Terminalが起動していることを確認してください")
+        # stdout はMCPのJSON-RPC専用のため、メッセージは stderr へ出力する
+        print("Bloomberg MCP サーバーを起動しています (stdio)...", file=sys.stderr)
+        # 起動時に接続を開始し、セッションを維持する
+        if config.PREWARM_CONNECTION:
+            prewarm_connection()
         
         mcp.run()
     else:
         print(f"Bloomberg MCP サーバーを起動しています (HTTP) - http://{args.host}:{args.port}")
-        # 起動時に接続テスト
-        try:
-            bbg_api.connect()
-            print("Bloomberg API接続成功")
-            bbg_api.disconnect()
-        except Exception as e:
-            print(f"警告: Bloomberg API接続失敗 - {e}")
-            print("Bloomberg Terminalが起動していることを確認してください")
+        # 起動時に接続を開始し、セッションを維持する
+        if config.PREWARM_CONNECTION:
+            prewarm_connection()
         
         # 注意: run_server()メソッドは存在しないため、正しいFastMCP 2.0 APIに修正が必要
         # mcp.run_server(host=args.host, port=args.port)
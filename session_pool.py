@@ -0,0 +1,386 @@
+"""
+Bloomberg セッションプール
+複数のblpapi.Sessionを保持し、最も負荷の低い正常なセッションへリクエストを振り分ける
+終了したセッションはバックオフを挟んで再接続する
+"""
+
+import asyncio
+import random
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import blpapi
+
+from capture import CaptureWriter
+from dispatcher import RequestDispatcher
+
+
+SESSION_DOWN_MESSAGES = ("SessionConnectionDown", "SessionTerminated", "SessionStartupFailure")
+SESSION_UP_MESSAGES = ("SessionConnectionUp", "SessionStarted")
+
+
+class _ServiceOpening:
+    """openServiceAsync の完了待ち"""
+
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: Optional[str] = None
+
+
+class BloombergSession:
+    """
+    プール内の1つのセッション（サービスとディスパッチャを保持）
+
+    セッションは startAsync で開始し、SessionStarted を受信した時点で起動時のサービスを
+    openServiceAsync でまとめて開く（サービスごとの往復を待ち合わせない）。
+    起動時に開かないサービスは最初の利用時に開く。
+
+    接続が切断・終了すると未完了のリクエストを SessionLost で失敗させ、
+    on_status(セッション, メッセージ種別) でプールへ通知する。
+    """
+
+    def __init__(self, index: int, host: str, port: int,
+                 on_status: Optional[Callable[["BloombergSession", str], None]] = None,
+                 recorder: Optional[CaptureWriter] = None):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.on_status = on_status
+        self.recorder = recorder
+        self.session: Optional[blpapi.Session] = None
+        self.dispatcher = RequestDispatcher()
+        self.services: Dict[str, blpapi.Service] = {}
+        self.in_flight = 0
+        self.healthy = False
+        self.ready = False
+        self._stopping = False
+        self._startup_services: Tuple[str, ...] = ()
+        self._started = threading.Event()
+        self._start_error: Optional[str] = None
+        self._opening: Dict[str, _ServiceOpening] = {}
+        self._service_lock = threading.Lock()
+
+    def begin(self, service_names: Sequence[str]) -> None:
+        """セッションの開始を要求（完了は wait_ready() で待つ）"""
+        session_options = blpapi.SessionOptions()
+        session_options.setServerHost(self.host)
+        session_options.setServerPort(self.port)
+
+        self._startup_services = tuple(service_names)
+        self._started.clear()
+        self._start_error = None
+        self._stopping = False
+        self.ready = False
+        session = blpapi.Session(session_options, self.handle_event)
+        self.dispatcher.bind(session)
+        self.session = session
+        if not session.startAsync():
+            self.session = None
+            raise Exception("Failed to start Bloomberg session")
+
+    def wait_ready(self, timeout: Optional[float] = None) -> None:
+        """セッションの開始と起動時のサービスを開き終えるまで待機"""
+        try:
+            if not self._started.wait(timeout):
+                raise Exception("Bloombergセッションの開始がタイムアウトしました")
+            if self._start_error is not None:
+                raise Exception(f"Failed to start Bloomberg session: {self._start_error}")
+            for name in self._startup_services:
+                self.open_service(name, timeout)
+        except Exception:
+            self.stop()
+            raise
+        self.healthy = True
+        self.ready = True
+
+    def start(self, service_names: Sequence[str], timeout: Optional[float] = None) -> None:
+        """セッションを開始し、指定されたサービスを開く"""
+        self.begin(service_names)
+        self.wait_ready(timeout)
+
+    def _request_service(self, name: str) -> _ServiceOpening:
+        """サービスを開く要求を送信（開いている、または要求中なら何もしない）"""
+        with self._service_lock:
+            opening = self._opening.get(name)
+            if opening is not None:
+                return opening
+            opening = self._opening[name] = _ServiceOpening()
+            if name in self.services:
+                opening.done.set()
+                return opening
+            session = self.session
+        if session is None:
+            self._finish_service(name, "Bloombergセッションが開始されていません")
+        else:
+            session.openServiceAsync(name, blpapi.CorrelationId(f"service:{name}"))
+        return opening
+
+    def _finish_service(self, name: str, error: Optional[str] = None) -> None:
+        with self._service_lock:
+            opening = self._opening.get(name)
+            if opening is None:
+                return
+            if error is None and self.session is None:
+                error = "Bloombergセッションが終了しました"
+            if error is None:
+                self.services[name] = self.session.getService(name)
+            else:
+                # 次の利用時に開き直せるよう要求を外す
+                opening.error = error
+                del self._opening[name]
+        opening.done.set()
+
+    def open_service(self, name: str, timeout: Optional[float] = None) -> None:
+        """サービスを開く（開き終えるまで待機）"""
+        if name in self.services:
+            return
+        opening = self._request_service(name)
+        if not opening.done.wait(timeout):
+            raise Exception(f"{name} サービスを開く処理がタイムアウトしました")
+        if opening.error is not None:
+            raise Exception(f"Failed to open {name} service: {opening.error}")
+
+    async def open_service_async(self, name: str) -> None:
+        """サービスを開く（イベントループをブロックせずに待機）"""
+        if name in self.services:
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.open_service, name)
+
+    def stop(self) -> None:
+        """セッションを停止し、未完了のリクエストを失敗させる"""
+        self._stopping = True
+        self.healthy = False
+        self.ready = False
+        self.dispatcher.stop()
+        if self.session is not None:
+            self.session.stop()
+            self.session = None
+        with self._service_lock:
+            self.services = {}
+            self._opening.clear()
+
+    def handle_event(self, event: blpapi.Event, session: blpapi.Session) -> None:
+        """blpapiのイベントハンドラ（セッション・サービスの状態を追跡してディスパッチャへ渡す）"""
+        if session is not self.session:
+            # 再接続で置き換えた古いセッションのイベントは無視する
+            return
+        if self.recorder is not None:
+            self.recorder.record_event(self.index, event)
+        event_type = event.eventType()
+        if event_type == blpapi.Event.SESSION_STATUS:
+            for msg in event:
+                message_type = str(msg.messageType())
+                if message_type in SESSION_DOWN_MESSAGES:
+                    self.healthy = False
+                    if message_type == "SessionStartupFailure":
+                        self._start_error = str(msg)
+                        self._started.set()
+                    elif not self._stopping:
+                        # 応答が届かなくなったリクエストは呼び出し側で再送できるよう失敗させる
+                        self.dispatcher.fail_all(f"Bloombergとの接続が切断されました（{message_type}）")
+                elif message_type in SESSION_UP_MESSAGES and self.services:
+                    self.healthy = True
+                if message_type == "SessionStarted" and not self._started.is_set():
+                    self._started.set()
+                    # 起動時のサービスは応答を待たずにまとめて開く
+                    for name in self._startup_services:
+                        self._request_service(name)
+                if self.on_status is not None and not self._stopping:
+                    self.on_status(self, message_type)
+        elif event_type == blpapi.Event.SERVICE_STATUS:
+            for msg in event:
+                message_type = str(msg.messageType())
+                for correlation_id in msg.correlationIds():
+                    value = correlation_id.value()
+                    if not (isinstance(value, str) and value.startswith("service:")):
+                        continue
+                    name = value[len("service:"):]
+                    if message_type == "ServiceOpened":
+                        self._finish_service(name)
+                    elif message_type == "ServiceOpenFailure":
+                        self._finish_service(name, str(msg))
+        self.dispatcher.handle_event(event, session)
+
+    def create_request(self, service_name: str, operation: str) -> blpapi.Request:
+        """このセッションのサービスからリクエストを作成"""
+        service = self.services.get(service_name)
+        if service is None:
+            raise Exception(f"サービスが開かれていません: {service_name}")
+        return service.createRequest(operation)
+
+
+class SessionPool:
+    """
+    セッションプール
+
+    acquire_async()でセッションを借り、使用後は必ずrelease()で返却する。
+    同時実行数が全セッションで上限に達している場合は空きが出るまで待機する。
+
+    起動済みのセッションが終了すると、専用スレッドで min(backoff_max, backoff_base * 2^n) 秒
+    以内の乱数だけ待ってから開始し直す（失敗するたびに n を増やす）。再接続中は
+    正常なセッションがなくてもacquire_async()は例外にせず、再接続を待つ。
+    再接続したセッションは restart_listeners の各関数に渡される。
+    recorder を指定すると全セッションの受信イベントを記録する（capture.py）。
+    """
+
+    def __init__(self, size: int, host: str, port: int, max_in_flight: int,
+                 service_names: Sequence[str], start_timeout: Optional[float] = None,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 recorder: Optional[CaptureWriter] = None):
+        if size < 1:
+            raise ValueError("セッションプールのサイズは1以上を指定してください")
+        self.max_in_flight = max_in_flight
+        self.service_names = tuple(service_names)
+        self.start_timeout = start_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sessions = [BloombergSession(i, host, port, self._handle_status, recorder) for i in range(size)]
+        self.restart_listeners: List[Callable[[BloombergSession], None]] = []
+        self._lock = threading.Lock()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._closed = threading.Event()
+        self._restarting: Dict[int, threading.Thread] = {}
+
+    @property
+    def primary(self) -> Optional[BloombergSession]:
+        """最初の正常なセッション"""
+        for bbg_session in self.sessions:
+            if bbg_session.healthy:
+                return bbg_session
+        return None
+
+    @property
+    def reconnecting(self) -> bool:
+        """再接続中のセッションがあるか"""
+        return bool(self._restarting)
+
+    def start(self) -> None:
+        """全セッションを並行して開始（1つも開始できなければ例外。開始できなかったセッションは再接続する）"""
+        errors = []
+        begun = []
+        for bbg_session in self.sessions:
+            try:
+                bbg_session.begin(self.service_names)
+                begun.append(bbg_session)
+            except Exception as e:
+                errors.append(str(e))
+        for bbg_session in begun:
+            try:
+                bbg_session.wait_ready(self.start_timeout)
+            except Exception as e:
+                errors.append(str(e))
+        if len(errors) == len(self.sessions):
+            raise Exception(errors[0])
+        for bbg_session in self.sessions:
+            if not bbg_session.ready:
+                self._schedule_restart(bbg_session)
+
+    def stop(self) -> None:
+        """全セッションを停止（再接続も中止する）"""
+        self._closed.set()
+        for bbg_session in self.sessions:
+            bbg_session.stop()
+        self._notify()
+
+    async def acquire_async(self) -> BloombergSession:
+        """最も負荷の低い正常なセッションを借りる（asyncio用）"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                bbg_session = self._pick()
+                if bbg_session is not None:
+                    return bbg_session
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+            await future
+
+    def release(self, bbg_session: BloombergSession) -> None:
+        """借りたセッションを返却"""
+        with self._lock:
+            bbg_session.in_flight -= 1
+        self._notify()
+
+    def _pick(self) -> Optional[BloombergSession]:
+        # ロック取得済みの状態で呼ぶこと
+        healthy = [s for s in self.sessions if s.healthy]
+        if not healthy:
+            recovering = self._restarting or any(s.ready for s in self.sessions)
+            if recovering and not self._closed.is_set():
+                # 接続の回復・再接続を待つ
+                return None
+            raise Exception("正常なBloombergセッションがありません")
+        candidates = [s for s in healthy if s.in_flight < self.max_in_flight]
+        if not candidates:
+            return None
+        bbg_session = min(candidates, key=lambda s: s.in_flight)
+        bbg_session.in_flight += 1
+        return bbg_session
+
+    def _handle_status(self, bbg_session: BloombergSession, message_type: str) -> None:
+        # セッションのイベントハンドラから呼ばれる
+        if message_type in SESSION_UP_MESSAGES:
+            self._notify()
+        elif message_type == "SessionTerminated" and bbg_session.ready:
+            self._schedule_restart(bbg_session)
+
+    def _schedule_restart(self, bbg_session: BloombergSession) -> None:
+        with self._lock:
+            if self._closed.is_set() or bbg_session.index in self._restarting:
+                return
+            thread = threading.Thread(
+                target=self._restart, args=(bbg_session,),
+                name=f"bbg-reconnect-{bbg_session.index}", daemon=True,
+            )
+            self._restarting[bbg_session.index] = thread
+        thread.start()
+
+    def backoff(self, attempt: int) -> float:
+        """attempt 回目の再試行までの待機秒数（full jitter）"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _restart(self, bbg_session: BloombergSession) -> None:
+        """セッションを開始し直す（成功するか、プールが停止されるまで繰り返す）"""
+        attempt = 0
+        try:
+            while True:
+                if self._closed.wait(self.backoff(attempt)):
+                    return
+                attempt += 1
+                # 終了したセッションの停止はイベントハンドラのスレッドの外で行う
+                bbg_session.stop()
+                try:
+                    bbg_session.start(self.service_names, self.start_timeout)
+                    break
+                except Exception as e:
+                    print(f"Bloombergセッション{bbg_session.index}の再接続に失敗しました（{attempt}回目）: {e}",
+                          file=sys.stderr)
+            if self._closed.is_set():
+                bbg_session.stop()
+                return
+            print(f"Bloombergセッション{bbg_session.index}に再接続しました", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._restarting.pop(bbg_session.index, None)
+            self._notify()
+
+        for listener in list(self.restart_listeners):
+            try:
+                listener(bbg_session)
+            except Exception as e:
+                print(f"再接続後の処理に失敗しました: {e}", file=sys.stderr)
+
+    def _notify(self) -> None:
+        with self._lock:
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            # 期限切れ等でキャンセルされた待機者は起こさない（ループが終了している場合がある）
+            if not future.done():
+                loop.call_soon_threadsafe(_wake, future)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
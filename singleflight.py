@@ -0,0 +1,102 @@
+"""
+同一リクエストの重複実行抑止（single-flight）
+同じ内容のリクエストが実行中の場合、後から来た呼び出しは先行する取得結果を共有する
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from deadlines import (
+    SETTLE_SECONDS, DeadlineExceeded, PartialResults, SharedDeadline, collect_partial, current_deadline,
+    shared_deadline, wait_within_deadline,
+)
+
+
+T = TypeVar("T")
+
+
+def fingerprint(*parts: Any) -> str:
+    """リクエスト内容からキーを作成（リスト・辞書はJSONとして正規化）"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("task", "waiters", "deadline", "partial")
+
+    def __init__(self):
+        self.task: Optional["asyncio.Task"] = None
+        self.waiters = 0
+        self.deadline = SharedDeadline()
+        self.partial = PartialResults()
+
+
+class SingleFlight:
+    """
+    キーごとに実行中の取得処理を1つに制限する
+
+    最初の呼び出しが取得処理を開始し、同じキーで同時に来た呼び出しは
+    その完了を待って同じ結果（または例外）を受け取る。結果オブジェクトは
+    呼び出し元の間で共有されるため、変更してはならない。
+
+    取得処理は合流した呼び出しのうち最も遅い期限（deadlines.SharedDeadline）で実行する。
+    期限の最も遅い呼び出しは、取得処理が期限で打ち切られて返す部分結果を受け取る。
+    それより先に期限が来た呼び出し（または打ち切られた取得処理が返るまで待てなかった呼び出し）は、
+    取得処理がそれまでに report_partial() した結果を DeadlineExceeded.partial に持つ
+    DeadlineExceeded を送出する。待機者が全員キャンセル・
+    期限切れでいなくなった場合は取得処理もキャンセルする。
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+
+    @property
+    def in_flight(self) -> List[str]:
+        """実行中のキー"""
+        return list(self._calls)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        キーに対応する取得処理を実行（実行中なら合流）
+
+        Args:
+            key: リクエストのキー（fingerprint()で作成）
+            func: 取得処理（引数なしのコルーチン関数）
+
+        Returns:
+            取得結果
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call()
+            with shared_deadline(call.deadline), collect_partial(call.partial):
+                call.task = asyncio.ensure_future(func())
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.deadline.join(current_deadline())
+        call.waiters += 1
+        try:
+            if not await wait_within_deadline(call.task):
+                if call.deadline.expired:
+                    # 取得処理も同じ期限で打ち切られ、受信済みの部分結果を返すのを待つ
+                    await asyncio.wait((call.task,), timeout=SETTLE_SECONDS)
+                if not call.task.done():
+                    # 期限の遅い呼び出しのために取得を続ける場合は、ここまでの結果を渡して離脱する
+                    error = DeadlineExceeded()
+                    error.partial = call.partial.snapshot()
+                    raise error
+            return call.task.result()
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # 待機者がいなくなった後に失敗した場合の未取得の例外を回収する
+        if not call.task.cancelled():
+            call.task.exception()
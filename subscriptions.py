@@ -0,0 +1,192 @@
+"""
+Bloomberg リアルタイム購読（//blp/mktdata）とラストバリューキャッシュ
+設定された証券、または参照データで繰り返し要求された証券を購読し、最新値をメモリに保持する
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import blpapi
+
+from decoders import field_types, name
+from session_pool import BloombergSession
+
+
+# 購読が終了したことを示すメッセージ
+_SUBSCRIPTION_END_MESSAGES = ("SubscriptionFailure", "SubscriptionTerminated")
+
+# 購読していない証券の要求回数を数える上限（超えたら数え直す）
+_MAX_DEMAND_ENTRIES = 10000
+
+
+class _Topic:
+    """1証券分の購読状態と最新値"""
+
+    __slots__ = ("security", "correlation_id", "active", "values")
+
+    def __init__(self, security: str, correlation_id: blpapi.CorrelationId):
+        self.security = security
+        self.correlation_id = correlation_id
+        self.active = False
+        self.values: Dict[str, Any] = {}
+
+
+class MarketDataSubscriptions:
+    """
+    //blp/mktdata の購読マネージャ
+
+    最新値は SUBSCRIPTION_DATA を受信するたびにblpapiのコールバックスレッドで更新され、
+    lookup() はロックを取って読み出すだけなのでリクエストを発行しない。
+    購読数が max_securities を超えると最も長く参照されていない証券の購読を解除する。
+    購読に使うセッションが正常でない間は最新値を返さない。
+    接続断で終了した購読は登録を残し、再接続後の attach() で購読し直す。
+    """
+
+    def __init__(self, fields: Sequence[str], max_securities: int, demand_threshold: int,
+                 securities: Sequence[str] = ()):
+        self.fields = tuple(fields)
+        self.max_securities = max_securities
+        self.demand_threshold = demand_threshold
+        self.configured = tuple(securities)
+        self._field_set = frozenset(self.fields)
+        self._names = {name(field): field for field in self.fields}
+        self._lock = threading.Lock()
+        self._topics: "OrderedDict[str, _Topic]" = OrderedDict()
+        self._by_id: Dict[int, _Topic] = {}
+        self._demand: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._session: Optional[BloombergSession] = None
+
+    @property
+    def subscribed(self) -> List[str]:
+        """購読中の証券"""
+        with self._lock:
+            return list(self._topics)
+
+    @property
+    def session(self) -> Optional[BloombergSession]:
+        """購読に使っているセッション"""
+        return self._session
+
+    def attach(self, bbg_session: BloombergSession) -> None:
+        """購読に使うセッションを設定し、設定済みの証券と購読中だった証券を購読"""
+        with self._lock:
+            previous, self._session = self._session, bbg_session
+            securities = list(dict.fromkeys(self.configured + tuple(self._topics)))
+            self._topics.clear()
+            self._by_id.clear()
+        if previous is not None and previous is not bbg_session:
+            previous.dispatcher.subscription_handler = None
+        bbg_session.dispatcher.subscription_handler = self.handle_event
+        if securities:
+            self.subscribe(securities)
+
+    def detach(self) -> None:
+        """セッションから切り離し、最新値を破棄"""
+        with self._lock:
+            bbg_session, self._session = self._session, None
+            self._topics.clear()
+            self._by_id.clear()
+        if bbg_session is not None:
+            bbg_session.dispatcher.subscription_handler = None
+
+    def subscribe(self, securities: Sequence[str]) -> None:
+        """証券を購読（購読済みの証券は無視）"""
+        subscriptions = blpapi.SubscriptionList()
+        evicted = blpapi.SubscriptionList()
+        with self._lock:
+            bbg_session = self._session
+            if bbg_session is None or bbg_session.session is None or not bbg_session.healthy:
+                return
+            for security in securities:
+                if security in self._topics:
+                    continue
+                topic = _Topic(security, blpapi.CorrelationId(next(self._ids)))
+                self._topics[security] = topic
+                self._by_id[topic.correlation_id.value()] = topic
+                subscriptions.add(security, list(self.fields), "", topic.correlation_id)
+            while len(self._topics) > self.max_securities:
+                _, topic = self._topics.popitem(last=False)
+                del self._by_id[topic.correlation_id.value()]
+                evicted.add(topic.security, list(self.fields), "", topic.correlation_id)
+
+        if evicted.size():
+            bbg_session.session.unsubscribe(evicted)
+        if subscriptions.size():
+            bbg_session.session.subscribe(subscriptions)
+
+    def lookup(self, securities: Sequence[str], fields: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        購読中の証券について、要求されたリアルタイムフィールドの最新値を返す
+
+        購読していない証券は要求回数を数え、demand_threshold 回に達したら購読を開始する。
+
+        Returns:
+            {証券: {フィールド: 値}}（最新値を受信済みのフィールドのみ）
+        """
+        live_fields = [field for field in fields if field in self._field_set]
+        if not live_fields:
+            return {}
+
+        results = {}
+        wanted = []
+        with self._lock:
+            bbg_session = self._session
+            if bbg_session is None:
+                return {}
+            for security in securities:
+                topic = self._topics.get(security)
+                if topic is None:
+                    count = self._demand.get(security, 0) + 1
+                    if count >= self.demand_threshold:
+                        self._demand.pop(security, None)
+                        wanted.append(security)
+                    else:
+                        if len(self._demand) >= _MAX_DEMAND_ENTRIES:
+                            self._demand.clear()
+                        self._demand[security] = count
+                    continue
+                self._topics.move_to_end(security)
+                if topic.active:
+                    values = {field: topic.values[field] for field in live_fields if field in topic.values}
+                    if values:
+                        results[security] = values
+
+        if wanted:
+            self.subscribe(wanted)
+        if not bbg_session.healthy:
+            return {}
+        return results
+
+    def handle_event(self, event: blpapi.Event) -> None:
+        """SUBSCRIPTION_DATA / SUBSCRIPTION_STATUS を処理（コールバックスレッドから呼ばれる）"""
+        is_data = event.eventType() == blpapi.Event.SUBSCRIPTION_DATA
+        for msg in event:
+            for correlation_id in msg.correlationIds():
+                with self._lock:
+                    topic = self._by_id.get(correlation_id.value())
+                if topic is None:
+                    continue
+
+                if is_data:
+                    values = {}
+                    for element in msg.asElement().elements():
+                        field = self._names.get(element.name())
+                        if field is not None and not element.isNull():
+                            values[field] = field_types.convert(field, element)
+                    with self._lock:
+                        topic.values.update(values)
+                        topic.active = True
+                elif str(msg.messageType()) in _SUBSCRIPTION_END_MESSAGES:
+                    # 購読が終了した証券は次の要求で購読し直せるよう登録を外す
+                    # （接続断による終了は再接続後に購読し直すため登録を残す）
+                    with self._lock:
+                        topic.active = False
+                        topic.values.clear()
+                        if self._session is not None and not self._session.healthy:
+                            continue
+                        if self._topics.get(topic.security) is topic:
+                            del self._topics[topic.security]
+                        self._by_id.pop(correlation_id.value(), None)
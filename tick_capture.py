@@ -0,0 +1,254 @@
+"""
+Bloomberg 日中ティック（IntradayTick）のディスクキャプチャ
+受信したティックを列ごとのメモリマップ配列（time / type / price / size）へ直接書き込む
+
+1回の取得 = 1キャプチャ（ディレクトリ）。結果は行として返さず、キャプチャIDと
+集計値を返し、行データはリソース経由でページ単位に読み出す。
+"""
+
+import datetime
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# 列ごとのデータ型（typeはイベント種別の番号、meta.json の types で名前に対応）
+TICK_COLUMNS = {
+    "time": np.dtype("datetime64[ms]"),
+    "type": np.dtype("u1"),
+    "price": np.dtype("f8"),
+    "size": np.dtype("i8"),
+}
+
+
+def _open_column(path: str, dtype: np.dtype, capacity: int) -> np.memmap:
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(capacity,))
+
+
+def _price(value: float) -> Optional[float]:
+    """価格をJSONで返せる値にする（価格のないティックの NaN は None）"""
+    return None if value != value else float(value)
+
+
+class TickCapture:
+    """
+    書き込み中のキャプチャ
+
+    列ごとに capacity 件分のメモリマップ配列を確保し、満杯になると2倍の容量の
+    ファイルへ移し替える。close() で件数を meta.json に記録する。
+    """
+
+    def __init__(self, directory: str, meta: Dict[str, Any], capacity: int):
+        self.directory = directory
+        self.meta = meta
+        self.count = 0
+        self._type_codes = {name: code for code, name in enumerate(meta["types"])}
+        os.makedirs(directory, exist_ok=True)
+        self._columns = {
+            column: _open_column(os.path.join(directory, f"{column}.npy"), dtype, max(capacity, 1))
+            for column, dtype in TICK_COLUMNS.items()
+        }
+
+    @property
+    def capture_id(self) -> str:
+        return self.meta["capture_id"]
+
+    def _type_code(self, event_type: str) -> int:
+        code = self._type_codes.get(event_type)
+        if code is None:
+            code = self._type_codes[event_type] = len(self.meta["types"])
+            self.meta["types"].append(event_type)
+        return code
+
+    def _grow(self, required: int) -> None:
+        capacity = len(self._columns["time"])
+        while capacity < required:
+            capacity *= 2
+        for column in TICK_COLUMNS:
+            path = os.path.join(self.directory, f"{column}.npy")
+            old = self._columns.pop(column)
+            new = _open_column(path + ".grow", old.dtype, capacity)
+            new[:self.count] = old[:self.count]
+            new.flush()
+            # Windows ではメモリマップ中のファイルを置き換え・改名できないため、
+            # 新旧の配列の参照をすべて外して閉じてから置き換え、開き直す
+            del old, new
+            os.replace(path + ".grow", path)
+            self._columns[column] = np.load(path, mmap_mode="r+")
+
+    def append(self, times: Sequence[datetime.datetime], types: Sequence[str],
+               prices: Sequence[float], sizes: Sequence[int]) -> None:
+        """
+        ティックを追加（各列は同じ長さ）
+
+        Args:
+            times: 時刻（UTC）
+            types: イベント種別
+            prices: 価格
+            sizes: 数量
+        """
+        n = len(times)
+        if n == 0:
+            return
+        end = self.count + n
+        if end > len(self._columns["time"]):
+            self._grow(end)
+        self._columns["time"][self.count:end] = np.asarray(times, dtype="datetime64[ms]")
+        self._columns["type"][self.count:end] = [self._type_code(event_type) for event_type in types]
+        self._columns["price"][self.count:end] = prices
+        self._columns["size"][self.count:end] = sizes
+        self.count = end
+
+    def close(self) -> None:
+        """書き込みを終了し、件数を記録"""
+        for column in self._columns.values():
+            column.flush()
+        self._columns = {}
+        self.meta["count"] = self.count
+        path = os.path.join(self.directory, "meta.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def discard(self) -> None:
+        """書き込みを中止し、ファイルを削除"""
+        self._columns = {}
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class TickCaptureStore:
+    """
+    ティックキャプチャの保存先
+
+    キャプチャは root/<キャプチャID>/ に保存され、max_age 秒を過ぎたものは
+    新しいキャプチャの作成時に削除する。
+    """
+
+    def __init__(self, root: str, max_age: float, initial_capacity: int):
+        self.root = os.path.expanduser(root)
+        self.max_age = max_age
+        self.initial_capacity = initial_capacity
+
+    def create(self, security: str, event_types: Sequence[str],
+               start: datetime.datetime, end: datetime.datetime) -> TickCapture:
+        """新しいキャプチャを作成"""
+        self.purge()
+        capture_id = uuid.uuid4().hex
+        meta = {
+            "capture_id": capture_id,
+            "security": security,
+            "event_types": list(event_types),
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "created": time.time(),
+            "types": list(event_types),
+            "count": 0,
+        }
+        return TickCapture(os.path.join(self.root, capture_id), meta, self.initial_capacity)
+
+    def purge(self) -> None:
+        """期限切れのキャプチャを削除"""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        limit = time.time() - self.max_age
+        for name in names:
+            directory = os.path.join(self.root, name)
+            try:
+                if os.path.getmtime(directory) < limit:
+                    shutil.rmtree(directory, ignore_errors=True)
+            except OSError:
+                pass
+
+    def _directory(self, capture_id: str) -> str:
+        # パス区切り等を含むIDは受け付けない
+        if not capture_id.isalnum():
+            raise ValueError(f"無効なキャプチャID: {capture_id}")
+        return os.path.join(self.root, capture_id)
+
+    def load_meta(self, capture_id: str) -> Dict[str, Any]:
+        """キャプチャの情報（meta.json）"""
+        path = os.path.join(self._directory(capture_id), "meta.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise ValueError(f"キャプチャが見つかりません: {capture_id}")
+
+    def columns(self, capture_id: str) -> Dict[str, np.ndarray]:
+        """キャプチャの列（メモリマップ、件数分のみ）"""
+        meta = self.load_meta(capture_id)
+        directory = self._directory(capture_id)
+        count = meta["count"]
+        return {
+            column: np.load(os.path.join(directory, f"{column}.npy"), mmap_mode="r")[:count]
+            for column in TICK_COLUMNS
+        }
+
+    def summary(self, capture_id: str) -> Dict[str, Any]:
+        """
+        キャプチャの集計値
+
+        Returns:
+            件数・期間・イベント種別ごとの件数と価格・数量の集計
+        """
+        meta = self.load_meta(capture_id)
+        columns = self.columns(capture_id)
+        times, codes, prices, sizes = columns["time"], columns["type"], columns["price"], columns["size"]
+        summary: Dict[str, Any] = {
+            "count": int(meta["count"]),
+            "first_time": str(times[0]) if len(times) else None,
+            "last_time": str(times[-1]) if len(times) else None,
+            "by_type": {},
+        }
+        for code, event_type in enumerate(meta["types"]):
+            mask = codes == code
+            count = int(np.count_nonzero(mask))
+            if count == 0:
+                continue
+            type_sizes = sizes[mask]
+            total_size = int(type_sizes.sum())
+            # 価格の集計は価格のあるティックのみ（NaN はJSONで返せないため None にする）
+            type_prices = prices[mask]
+            priced = ~np.isnan(type_prices)
+            type_prices, priced_sizes = type_prices[priced], type_sizes[priced]
+            priced_size = int(priced_sizes.sum())
+            has_prices = len(type_prices) > 0
+            summary["by_type"][event_type] = {
+                "count": count,
+                "first_price": _price(type_prices[0]) if has_prices else None,
+                "last_price": _price(type_prices[-1]) if has_prices else None,
+                "min_price": _price(type_prices.min()) if has_prices else None,
+                "max_price": _price(type_prices.max()) if has_prices else None,
+                "total_size": total_size,
+                "vwap": _price(np.sum(type_prices * priced_sizes) / priced_size) if priced_size else None,
+            }
+        return summary
+
+    def page(self, capture_id: str, offset: int, limit: int) -> Dict[str, List[Any]]:
+        """
+        キャプチャの一部を列形式で読み出す
+
+        Args:
+            offset: 開始位置
+            limit: 件数
+
+        Returns:
+            {"time": [...], "type": [...], "price": [...], "size": [...]}
+        """
+        meta = self.load_meta(capture_id)
+        columns = self.columns(capture_id)
+        window = slice(max(offset, 0), max(offset, 0) + max(limit, 0))
+        types = meta["types"]
+        return {
+            "time": np.datetime_as_string(columns["time"][window], unit="ms").tolist(),
+            "type": [types[code] for code in columns["type"][window].tolist()],
+            "price": [_price(price) for price in columns["price"][window].tolist()],
+            "size": columns["size"][window].tolist(),
+        }
@@ -3,7 +3,7 @@ Bloomberg MCP Server ユーティリティ関数
 """
 
 import blpapi
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional, Tuple
 import datetime
 
 
@@ -59,6 +59,63 @@ def validate_fields(fields: List[str]) -> List[str]:
     return validated
 
 
+# Bloombergのイエローキー（証券コード末尾の市場区分）
+YELLOW_KEYS = ("Equity", "Index", "Comdty", "Curncy", "Corp", "Govt", "Mtge", "Muni", "Pfd", "M-Mkt")
+_YELLOW_KEY_LOOKUP = {key.lower(): key for key in YELLOW_KEYS}
+
+
+def normalize_security(ticker: str, yellow_key: str = "Equity") -> str:
+    """
+    指数構成銘柄等のティッカー（"AAPL UW"）を完全な証券コード（"AAPL UW Equity"）に変換
+    
+    Args:
+        ticker: ティッカー（末尾にイエローキーがあればそのまま使う）
+        yellow_key: イエローキーがない場合に付けるイエローキー
+    
+    Returns:
+        証券コード（ティッカーが空の場合は空文字列）
+    """
+    parts = str(ticker).split()
+    if not parts:
+        return ""
+    key = _YELLOW_KEY_LOOKUP.get(parts[-1].lower())
+    if key is not None:
+        return " ".join(parts[:-1] + [key])
+    return " ".join(parts + [yellow_key])
+
+
+def _get_value(element: blpapi.Element) -> Any:
+    return element.getValue()
+
+
+def _get_iso_datetime(element: blpapi.Element) -> str:
+    # date / time / datetime をJSONでそのまま使える文字列に変換
+    return element.getValueAsDatetime().isoformat()
+
+
+# データ型ごとの値の取り出し方（表にない型は getValue()）
+_CONVERTERS: Dict[int, Callable[[blpapi.Element], Any]] = {
+    blpapi.DataType.BOOL: blpapi.Element.getValueAsBool,
+    blpapi.DataType.CHAR: blpapi.Element.getValueAsString,
+    blpapi.DataType.STRING: blpapi.Element.getValueAsString,
+    blpapi.DataType.ENUMERATION: blpapi.Element.getValueAsString,
+    blpapi.DataType.BYTE: blpapi.Element.getValueAsInteger,
+    blpapi.DataType.INT32: blpapi.Element.getValueAsInteger,
+    blpapi.DataType.INT64: blpapi.Element.getValueAsInteger,
+    blpapi.DataType.FLOAT32: blpapi.Element.getValueAsFloat,
+    blpapi.DataType.FLOAT64: blpapi.Element.getValueAsFloat,
+    blpapi.DataType.DECIMAL: blpapi.Element.getValueAsFloat,
+    blpapi.DataType.DATE: _get_iso_datetime,
+    blpapi.DataType.TIME: _get_iso_datetime,
+    blpapi.DataType.DATETIME: _get_iso_datetime,
+}
+
+
+def element_converter(datatype: int) -> Callable[[blpapi.Element], Any]:
+    """データ型に対応する値の取り出し関数"""
+    return _CONVERTERS.get(datatype, _get_value)
+
+
 def extract_element_value(element: blpapi.Element) -> Any:
     """
     Bloomberg Elementから値を安全に抽出
@@ -67,38 +124,60 @@ def extract_element_value(element: blpapi.Element) -> Any:
         element: Bloomberg Element
     
     Returns:
-        抽出された値
+        抽出された値（日付・時刻はISO形式の文字列）
     """
     try:
         if element.isNull():
             return None
-        
-        data_type = element.datatype()
-        
-        if data_type == blpapi.DataType.STRING:
-            return element.getValueAsString()
-        elif data_type == blpapi.DataType.INT32:
-            return element.getValueAsInt32()
-        elif data_type == blpapi.DataType.INT64:
-            return element.getValueAsInt64()
-        elif data_type == blpapi.DataType.FLOAT32:
-            return element.getValueAsFloat32()
-        elif data_type == blpapi.DataType.FLOAT64:
-            return element.getValueAsFloat64()
-        elif data_type == blpapi.DataType.BOOL:
-            return element.getValueAsBool()
-        elif data_type == blpapi.DataType.DATE:
-            return str(element.getValueAsDate())
-        elif data_type == blpapi.DataType.TIME:
-            return str(element.getValueAsTime())
-        elif data_type == blpapi.DataType.DATETIME:
-            return str(element.getValueAsDatetime())
-        else:
-            return element.getValue()
+        return _CONVERTERS.get(element.datatype(), _get_value)(element)
     except Exception:
         return None
 
 
+class FieldTypeCache:
+    """
+    フィールドごとの値の取り出し関数のキャッシュ
+    
+    フィールドのデータ型に対応する変換関数を判定済みのデータ型とともに保持し、
+    要素のデータ型が同じ間はそのまま使う。同じフィールドでも証券や応答によって
+    データ型が異なる場合があるため（文字列の変換関数は例外を出さずに値を返してしまう）、
+    データ型が変わった時点でその要素のデータ型で判定し直す。
+    """
+    
+    def __init__(self):
+        self._converters: Dict[Any, Tuple[int, Callable[[blpapi.Element], Any]]] = {}
+    
+    def convert(self, field: Any, element: blpapi.Element) -> Any:
+        """
+        要素の値を変換（NULL要素は呼び出し側で除外する）
+        
+        Args:
+            field: フィールド名（または列名など型を共有するキー）
+            element: 値の要素
+        """
+        datatype = element.datatype()
+        cached = self._converters.get(field)
+        if cached is None or cached[0] != datatype:
+            cached = self._converters[field] = (datatype, element_converter(datatype))
+        return cached[1](element)
+
+
+def rows_to_columns(rows: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> Dict[str, List[Any]]:
+    """
+    行（辞書）のリストを列ごとの配列に変換
+    
+    Args:
+        rows: 行のリスト
+        columns: 列名のリスト（省略時は出現順にすべての列）
+    
+    Returns:
+        {列名: 値の配列}（各配列の長さは行数と同じ、値がない場合はNone）
+    """
+    if columns is None:
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+    return {column: [row.get(column) for row in rows] for column in columns}
+
+
 def format_error_message(error_element: blpapi.Element) -> str:
     """
     Bloomberg APIエラーを整形